@@ -1,162 +1,138 @@
 """
 Simple module for doing a basic checks and cleanup of the scraped data.
 """
+import argparse
 from os import path
-import re
 import time
 
 import ProjUtils
-from cleanup import AddGeo, ComputeLease, ExamineProperty, ReplaceFix, RootJsonFix
-from cleanup.objects.ParsedDate import ParsedDate
-from cleanup.objects.ReplacePair import ReplacePair
+from cleanup import Orchestrator, ProfileProperty
+from dataset.Dataset import Dataset
 from db.mongodb.MongoImporter import MongoImporter
-
-_JSON_LOC = path.join('data', 'json')
-_LOG_LOC = path.join('data', 'cleanup.log')
-
-
-def _null_fix() -> None:
+from db.sqlite.SqliteImporter import SqliteImporter
+from profiling.StepProfiler import StepProfiler
+from storage import DatasetSource
+from storage.DirectorySource import DirectorySource
+from storage.DocumentIO import DocumentIO
+from stream import Stream
+
+_JSON_LOC = path.join('data', 'json')  # or a container, e.g. data/json.zip
+_EXPORT_LOC = path.join('data', 'json (post cleanup).zip')
+_STATE_LOC = path.join('data', 'cleanup.state.json')
+_PROFILE_LOC = path.join('data', 'profile.json')
+_SNAPSHOT_LOC = path.join('data', 'snapshot')
+_REPORT_LOC = path.join('data', 'report')
+_JSON_ENCODING = DocumentIO.COMPACT
+_PREFETCH_DEPTH = 8  # files read ahead and written behind, 0 to disable
+
+
+def _take_snapshot() -> None:
     """
-    Fix[es] to ensure nothing crashes because of a None value
+    Saves a binary snapshot of the cleaned data, for instant reloads by later analyses
     """
-    ReplaceFix.run(_JSON_LOC, _LOG_LOC, ReplacePair(
-        'blocks.apartments.lease_price_list.lease', 'null lease',
-        lambda v: (v is None, '-')))
-
-
-def _expand_address_acronym() -> None:
-    """
-    Expands address acronyms like NTH to NORTH
-    """
-    def expand(acro, expd):
-        ReplaceFix.run(_JSON_LOC, _LOG_LOC, ReplacePair(
-            'blocks.street', acro,
-            lambda v: (acro in v, v.replace(acro, expd))))
-
-    def re_expand(acro, expd):
-        ReplaceFix.run(_JSON_LOC, _LOG_LOC, ReplacePair(
-            'blocks.street', acro,
-            lambda v: (True, re.sub(acro, expd, v))))
-
     curr_time = time.time()
-    expand('BT ', 'BUKIT ')
-    expand("C'WEALTH ", 'COMMONWEALTH ')
-    expand('JLN ', 'JALAN ')
-    re_expand(r'\bLOR ', 'LORONG ')
-    expand('ST. ', 'SAINT ')
-    expand('UPP ', 'UPPER ')
-    re_expand(r' AVE\b', ' AVENUE')
-    re_expand(r' CL\b', ' CLOSE')
-    re_expand(r' CRES\b', ' CRESCENT')
-    expand(' CTRL', ' CENTRAL')
-    re_expand(r' DR\b', ' DRIVE')
-    expand(' GDNS', ' GARDENS')
-    expand(' HTS', ' HEIGHTS')
-    expand(' NTH', ' NORTH')
-    expand(' PK', ' PARK')
-    re_expand(r' PL\b', ' PLACE')
-    expand(' RD', ' ROAD')
-    re_expand(r' ST\b', ' STREET')
-    re_expand(r' TER\b', ' TERRACE')
-    print('Expand Address Acronym: {:.2f} secs'.format(
-        time.time() - curr_time))
-
-
-def _date_to_dict() -> None:
-    """
-    Parses the date attribute into a dictionary
-    """
-    def func(val):
-        to_parse = not isinstance(val, dict)
-        datedict = ParsedDate.parse_date(val).to_dict() if to_parse else val
-        return to_parse, datedict
-
-    def parse_date(prop: str):
-        ReplaceFix.run(_JSON_LOC, _LOG_LOC, ReplacePair(prop, '', func))
-
-    curr_time = time.time()
-    parse_date('blocks.lcd_date')
-    parse_date('blocks.pcd_date')
-    parse_date('blocks.dpd_date')
-    print('Date to Dict: {:.2f} secs'.format(time.time() - curr_time))
+    Dataset.load_cached(_JSON_LOC, _SNAPSHOT_LOC)
+    print('Take Snapshot: {:.2f} secs'.format(time.time() - curr_time))
 
 
-def _change_types() -> None:
-    """
-    Changes the types of some attributes
+def _check_properties(to_run: bool = True) -> None:
     """
-    curr_time = time.time()
+    Checks properties to help make cleaning decisions.
+    All properties are profiled in a single read of the data.
 
-    # blocks.apartments.area from float to int
-    areas = ExamineProperty.retrieve(_JSON_LOC, 'blocks.apartments.area')
-    if all([_ - int(_) == 0 for _ in areas]):
-        ReplaceFix.run(_JSON_LOC, _LOG_LOC, ReplacePair(
-            'blocks.apartments.area', 'to int', lambda v: (True, int(v))))
+    Args:
+        to_run (bool): If False, this function does not run
+    """
+    if to_run:
+        curr_time = time.time()
+        profiles = ProfileProperty.run(_JSON_LOC, _PROFILE_LOC)
+        for name, profile in sorted(profiles.items()):
+            summary = profile.to_dict()
+            print('\n{}:'.format(name))
+            print('\tdistinct={distinct_count} nulls={null_count} types={types} '
+                  'min={min} max={max}'.format(**summary))
+            print('\ttop={}'.format([_['value'] for _ in summary['top_k']]))
 
-    print('Change Types: {:.2f} secs'.format(time.time() - curr_time))
+        print('Check Properties: {:.2f} secs'.format(time.time() - curr_time))
 
 
-def _check_properties(to_run: bool = True) -> None:
+def _export(to_run: bool = True) -> None:
     """
-    Checks properties to help make cleaning decisions
+    Exports the cleaned data into a compressed container
 
     Args:
         to_run (bool): If False, this function does not run
     """
-    def check(prop):
-        return ExamineProperty.check(_JSON_LOC, prop)
-
     if to_run:
         curr_time = time.time()
-        check('blocks.apartments.area')
-        check('blocks.apartments.floor')
-        check('blocks.apartments.is_repurchased')
-        check('blocks.apartments.lease_price_list.price')
-        check('blocks.apartments.lease_price_list.lease')
-        check('blocks.apartments.unit')
-        check('blocks.block_code.block_num')
-        check('blocks.block_code.contract')
-        check('blocks.block_code.neighbourhood')
-        check('blocks.dpd_date')
-        check('blocks.flat_type')
-        check('blocks.lcd_date')
-        check('blocks.pcd_date')
-        check('blocks.quota_chinese')
-        check('blocks.quota_malay')
-        check('blocks.quota_other')
-        check('blocks.street')
-        check('blocks.town')
-
-        # Properties that appear after processing
-        # check('blocks.lat')
-        # check('blocks.long')
-        check('blocks.title')
+        DatasetSource.export(_JSON_LOC, _EXPORT_LOC)
+        print('Export: {:.2f} secs'.format(time.time() - curr_time))
 
-        print('Check Properties: {:.2f} secs'.format(time.time() - curr_time))
+
+def _watch() -> None:
+    """
+    Streams each newly scraped file through cleanup, and into SQLite and MongoDB,
+    until interrupted
+    """
+    sqlite = SqliteImporter()
+    mongo = MongoImporter(_JSON_LOC, _SNAPSHOT_LOC, drop=False)
+    try:
+        Stream.run(_JSON_LOC, sqlite, mongo)
+    finally:
+        sqlite.close()
+        mongo.close()
+
+
+def _parse_args() -> argparse.Namespace:
+    """
+    Returns:
+        argparse.Namespace: `profile`, the profiling modes or None to use the
+                    environment variable CLEANER_PROFILE, and `watch`
+    """
+    parser = argparse.ArgumentParser(prog='cleaner')
+    parser.add_argument('--profile', metavar='MODES',
+                        help='comma-separated profilers to run on each step: '
+                             '{}, {}'.format(StepProfiler.CPROFILE, StepProfiler.TRACEMALLOC))
+    parser.add_argument('--watch', action='store_true',
+                        help='stream newly scraped files through cleanup and import, '
+                             'while the scraper runs')
+    args = parser.parse_args()
+    if args.profile is not None:
+        args.profile = args.profile.split(',')
+    return args
 
 
 def main() -> None:
     """
     Main Function
     """
+    args = _parse_args()
+    profiler = StepProfiler(_REPORT_LOC, args.profile)
     ProjUtils.set_project_cwd()
+    DocumentIO.set_encoding(_JSON_ENCODING)
+    DirectorySource.set_prefetch_depth(_PREFETCH_DEPTH)
+    if args.watch:
+        _watch()
+        return
 
     # Cleaning up
-    RootJsonFix.run(_JSON_LOC, _LOG_LOC)
-    _null_fix()
-    _expand_address_acronym()
-    _date_to_dict()
-    ComputeLease.run(_JSON_LOC, _LOG_LOC)
-    AddGeo.run(_JSON_LOC, _LOG_LOC)
-    _change_types()
+    timeline = Orchestrator.run(_JSON_LOC, _STATE_LOC, profiler=profiler)
+    profiler.add_section('timeline', timeline)
+    with profiler.step('TakeSnapshot'):
+        _take_snapshot()
 
     # Check properties
     to_run = False
-    _check_properties(to_run)
+    with profiler.step('CheckProperties'):
+        _check_properties(to_run)
+    with profiler.step('Export'):
+        _export(to_run)
 
     # Import Data
-    dbimporter = MongoImporter(_JSON_LOC)
-    dbimporter.run()
+    with profiler.step('MongoImporter'):
+        dbimporter = MongoImporter(_JSON_LOC, _SNAPSHOT_LOC)
+        dbimporter.run()
+    print('Saved run report to {}'.format(profiler.save()))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,152 @@
+"""
+Times the cleanup steps and the database importers on synthetic data
+"""
+from contextlib import redirect_stdout
+from datetime import datetime
+import io
+import os
+from os import path
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from cleanup import Orchestrator, Pipeline
+from dataset.Dataset import Dataset
+from db.mongodb.MongoImporter import MongoImporter
+from db.sqlite.SqliteImporter import SqliteImporter
+from . import SyntheticData
+from .FakeMongo import FakeDatabase
+
+_SKIPPED_STEPS = ('AddGeo',)  # needs the online geocoders
+
+
+def run(template_loc: str, scales: Iterable[int], work_loc: Optional[str] = None,
+        verbose: bool = False) -> Dict[str, Any]:
+    """
+    Runs the benchmark at each scale, on a fresh synthetic dataset
+
+    Args:
+        template_loc (str): location of the JSON folder (or container) to replicate
+        scales (Iterable[int]): Multiples of the template's size (e.g. 1, 10, 100)
+        work_loc (Optional[str]): Folder to generate the data in.
+                    The system's temporary folder if not given.
+        verbose (bool): If True, shows the output of the steps
+
+    Returns:
+        Dict[str, Any]: The results, with the timings in secs of each scale
+    """
+    results: Dict[str, Any] = {
+        'created': str(datetime.now()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'skipped': list(_SKIPPED_STEPS),
+        'scales': {}
+    }
+    for scale in scales:
+        scale_loc = tempfile.mkdtemp(prefix='benchmark-', dir=work_loc)
+        try:
+            print('[Benchmark] {}x'.format(scale))
+            results['scales'][str(scale)] = _run_scale(template_loc, scale_loc, scale, verbose)
+        finally:
+            shutil.rmtree(scale_loc, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float = 0.2, min_secs: float = 0.05) \
+        -> List[Tuple[str, str, float, float]]:
+    """
+    Compares the timings of `results` against `baseline`
+
+    Args:
+        results (Dict[str, Any]): Results of `run()`
+        baseline (Dict[str, Any]): Results of an earlier `run()`
+        tolerance (float): Fraction that a timing may be slower by
+        min_secs (float): Timings faster than this in both runs are too noisy to compare
+
+    Returns:
+        List[Tuple[str, str, float, float]]: (scale, timing name, baseline secs, secs)
+                    of each timing that regressed
+    """
+    regressions = []
+    print('{:>6} {:<24} {:>10} {:>10} {:>8}'.format(
+        'scale', 'timing', 'baseline', 'secs', 'ratio'))
+    for scale, scale_result in sorted(results['scales'].items(), key=lambda _: int(_[0])):
+        base_timings = baseline.get('scales', {}).get(scale, {}).get('timings', {})
+        for name, secs in scale_result['timings'].items():
+            if name not in base_timings:
+                continue
+            base_secs = base_timings[name]
+            ratio = secs / base_secs if base_secs else float('inf')
+            is_slower = ratio > 1 + tolerance and max(secs, base_secs) >= min_secs
+            print('{:>6} {:<24} {:>10.3f} {:>10.3f} {:>7.2f}x{}'.format(
+                scale + 'x', name, base_secs, secs, ratio, ' SLOWER' if is_slower else ''))
+            if is_slower:
+                regressions.append((scale, name, base_secs, secs))
+    return regressions
+
+
+def _run_scale(template_loc: str, scale_loc: str, scale: int,
+               verbose: bool) -> Dict[str, Any]:
+    """
+    Generates the data of a scale, then cleans and imports it
+
+    Returns:
+        Dict[str, Any]: Sizes of the data, and the timings
+    """
+    json_loc = path.join(scale_loc, 'json')
+    log_loc = path.join(scale_loc, 'cleanup.log')
+    snapshot_loc = path.join(scale_loc, 'snapshot')
+    sqlite_loc = path.join(scale_loc, 'database.sqlite')
+    timings: Dict[str, float] = {}
+
+    def timed(name: str, func: Callable[[], Any]) -> Any:
+        stream = sys.stdout if verbose else io.StringIO()
+        with redirect_stdout(stream):
+            curr_time = time.perf_counter()
+            result = func()
+            timings[name] = time.perf_counter() - curr_time
+        print('\t{}: {:.3f} secs'.format(name, timings[name]))
+        return result
+
+    sizes = timed('Generate', lambda: SyntheticData.generate(template_loc, json_loc, scale))
+
+    # Cleanup, step by step
+    pipeline_time = time.perf_counter()
+    for name, step in Pipeline.STEPS:
+        if name not in _SKIPPED_STEPS:
+            timed(name, lambda: step(json_loc, log_loc))
+    timings['Pipeline'] = time.perf_counter() - pipeline_time
+    print('\tPipeline: {:.3f} secs'.format(timings['Pipeline']))
+
+    # Cleanup again, as a graph of stages in memory
+    dag_loc = path.join(scale_loc, 'json_dag')
+    with redirect_stdout(io.StringIO()):
+        SyntheticData.generate(template_loc, dag_loc, scale)
+    timed('Orchestrator', lambda: Orchestrator.run(
+        dag_loc, path.join(scale_loc, 'cleanup.state.json'), skip=_SKIPPED_STEPS))
+
+    # The importers need geolocation
+    with redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        SyntheticData.add_geocodes(json_loc)
+    timed('Snapshot', lambda: Dataset.load_cached(json_loc, snapshot_loc))
+
+    def import_sqlite() -> None:
+        importer = SqliteImporter(sqlite_loc, json_loc, snapshot_loc)
+        try:
+            importer.run()
+        finally:
+            importer.close()
+    timed('SqliteImporter', import_sqlite)
+    timed('MongoImporter',
+          lambda: MongoImporter(json_loc, snapshot_loc, FakeDatabase()).run())
+
+    sizes['bytes'] = sum(path.getsize(path.join(root, _))
+                         for root, _dirs, files in os.walk(json_loc) for _ in files)
+    return {'sizes': sizes, 'timings': timings}
@@ -0,0 +1,319 @@
+"""
+Local stand-ins of the geocoding services, serving the buildings of an existing dataset.
+Both have configurable latency, miss rate and rate limit, and count their calls.
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import math
+import random
+from socketserver import ThreadingMixIn
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from cleanup.geo.Geocode import Geocode
+from cleanup.geo.IGeoservice import IGeoservice
+from storage.DatasetSource import open_source
+
+_Building = Tuple[str, str, Geocode]  # (block, street, geocode)
+_EARTH_RADIUS = 6371000.0  # in metres
+
+
+def load_buildings(json_loc: str) -> List[_Building]:
+    """
+    Args:
+        json_loc (str): location of a cleaned JSON folder, or of a container
+
+    Returns:
+        List[Tuple[str, str, Geocode]]: Block number, street and geolocation of each
+                    distinct building that has one
+    """
+    buildings: Dict[str, _Building] = {}
+    for _, data in open_source(json_loc).iter_documents():
+        for blk in data if isinstance(data, list) else data['blocks']:
+            if 'lat' not in blk:
+                continue
+            block = blk['block_code']['block_num'].upper()
+            street = ' '.join(blk['street'].upper().split())
+            buildings[block + ' ' + street] = (block, street, Geocode(
+                blk['title'], blk['lat'], blk['long'], blk['postal']))
+    return list(buildings.values())
+
+
+class _Service(object):
+    """
+    Buildings, misses, latency, rate limit and call counts shared by the stand-ins.
+
+    Attributes:
+        latency (float): Secs that each call takes
+        rate_limit (Optional[int]): Max no. of calls per sec. None for no limit.
+        stats (Dict[str, int]): No. of calls of each kind, and `rate_limited`
+        _by_address (Dict[str, _Building]): Buildings, keyed by block number + street
+        _by_street (Dict[str, List[_Building]]): Buildings of each street
+        _missed (Set[str]): Addresses that are not found by a basic query
+        _window (Tuple[int, int]): Current second, and no. of calls in it
+        _lock (threading.Lock): Guards `stats` and `_window`
+    """
+    latency: float
+    rate_limit: Optional[int]
+    stats: Dict[str, int]
+    _by_address: Dict[str, _Building]
+    _by_street: Dict[str, List[_Building]]
+    _missed: Set[str]
+    _window: Tuple[int, int]
+    _lock: threading.Lock
+
+    def __init__(self, buildings: Iterable[_Building], latency: float, miss_rate: float,
+                 rate_limit: Optional[int], seed: int) -> None:
+        rand = random.Random(seed)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.stats = {'rate_limited': 0}
+        self._by_address = {}
+        self._by_street = {}
+        for bldg in buildings:
+            self._by_address[bldg[0] + ' ' + bldg[1]] = bldg
+            self._by_street.setdefault(bldg[1], []).append(bldg)
+        self._missed = {_ for _ in sorted(self._by_address) if rand.random() < miss_rate}
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+
+    def _call(self, kind: str) -> bool:
+        """
+        Counts a call, and waits out its latency
+
+        Returns:
+            bool: False if the call is over the rate limit
+        """
+        with self._lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+            second, count = self._window
+            now = int(time.monotonic())
+            count = count + 1 if now == second else 1
+            self._window = (now, count)
+            is_allowed = self.rate_limit is None or count <= self.rate_limit
+            if not is_allowed:
+                self.stats['rate_limited'] += 1
+        time.sleep(self.latency)
+        return is_allowed
+
+    def _find(self, query: str) -> Optional[_Building]:
+        """
+        Returns:
+            Optional[_Building]: The building of an address, unless it's missed
+        """
+        query = ' '.join(query.upper().split())
+        return None if query in self._missed else self._by_address.get(query)
+
+    def _centroid(self, street: str) -> Optional[Tuple[float, float]]:
+        bldgs = self._by_street.get(' '.join(street.upper().split()))
+        if not bldgs:
+            return None
+        return (sum(_[2].lat for _ in bldgs) / len(bldgs),
+                sum(_[2].long for _ in bldgs) / len(bldgs))
+
+    def _nearby(self, lat: float, lng: float, buffer: float) -> List[_Building]:
+        """
+        Returns:
+            List[_Building]: Buildings within `buffer` metres, nearest first
+        """
+        dists = ((_distance(lat, lng, _[2].lat, _[2].long), _)
+                 for _ in self._by_address.values())
+        return [bldg for dist, bldg in sorted(dists, key=lambda _: _[0]) if dist <= buffer]
+
+
+class FakeOneMap(_Service):
+    """
+    Local HTTP stand-in of the OneMap API, for `OneMap.set_base_url()` and
+    `OneMapAuth.set_service()`. Serves `search`, `revgeocode` and `getToken`
+    in the same JSON shapes, from a thread per request.
+    Calls over the rate limit get HTTP 429.
+
+    Attributes:
+        base_url (str): Root of the API, once started
+        _server (Optional[HTTPServer]): The server, once started
+    """
+    base_url: str
+    _server: Optional[HTTPServer]
+
+    def __init__(self, buildings: Iterable[_Building], latency: float = 0.0,
+                 miss_rate: float = 0.0, rate_limit: Optional[int] = None,
+                 seed: int = 0) -> None:
+        """
+        Constructor
+
+        Args:
+            buildings (Iterable[_Building]): Block number, street and geolocation
+                        of each building
+            latency (float): Secs that each request takes
+            miss_rate (float): Fraction of the buildings that are not found by `search`,
+                        but only by `revgeocode`
+            rate_limit (Optional[int]): Max no. of requests per sec. None for no limit.
+            seed (int): Seed of the misses
+        """
+        super().__init__(buildings, latency, miss_rate, rate_limit, seed)
+        self.base_url = ''
+        self._server = None
+
+    def start(self) -> 'FakeOneMap':
+        """
+        Starts serving on a free port of localhost
+        """
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                url = urlparse(self.path)
+                query = {key: vals[0] for key, vals in parse_qs(url.query).items()}
+                service.respond(self, url.path, query)
+
+            def do_POST(self) -> None:  # pylint: disable=invalid-name
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                service.respond(self, urlparse(self.path).path, {})
+
+            def log_message(self, *_) -> None:
+                pass
+
+        self._server = _ThreadingServer(('127.0.0.1', 0), Handler)
+        self.base_url = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+        threading.Thread(target=self._server.serve_forever, name='fake-onemap',
+                         daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        """
+        Stops serving
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'FakeOneMap':
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def respond(self, handler: BaseHTTPRequestHandler, url_path: str,
+                query: Dict[str, str]) -> None:
+        """
+        Answers a request
+        """
+        kind = url_path.rsplit('/', 1)[-1]
+        if not self._call(kind):
+            self._send(handler, 429, {'error': 'Too many requests'}, {'Retry-After': '1'})
+        elif kind == 'search':
+            self._send(handler, 200, self._search(query.get('searchVal', '')))
+        elif kind == 'revgeocode':
+            lat, lng = (float(_) for _ in query['location'].split(','))
+            self._send(handler, 200, self._revgeocode(lat, lng, float(query.get('buffer', 0))))
+        elif kind == 'getToken':
+            self._send(handler, 200, {'access_token': 'fake-{}'.format(self.stats[kind]),
+                                      'expiry_timestamp': str(time.time() + 3 * 24 * 3600)})
+        else:
+            self._send(handler, 404, {'error': 'Not found'})
+
+    def _search(self, search_val: str) -> Dict[str, Any]:
+        bldg = self._find(search_val)
+        if bldg is not None:
+            bldgs = [bldg]
+        else:
+            # a street gives its buildings
+            bldgs = self._by_street.get(' '.join(search_val.upper().split()), [])[:10]
+        results = [{
+            'SEARCHVAL': geocode.title,
+            'BLK_NO': block,
+            'ROAD_NAME': street,
+            'BUILDING': geocode.title,
+            'ADDRESS': '{} {} SINGAPORE {}'.format(block, street, geocode.postal),
+            'POSTAL': '{:06d}'.format(geocode.postal),
+            'LATITUDE': str(geocode.lat),
+            'LONGITUDE': str(geocode.long),
+            'LONGTITUDE': str(geocode.long)
+        } for block, street, geocode in bldgs]
+        return {'found': len(results), 'totalNumPages': 1, 'pageNum': 1, 'results': results}
+
+    def _revgeocode(self, lat: float, lng: float, buffer: float) -> Dict[str, Any]:
+        return {'GeocodeInfo': [{
+            'BUILDINGNAME': geocode.title,
+            'BLOCK': block,
+            'ROAD': street,
+            'POSTALCODE': '{:06d}'.format(geocode.postal),
+            'LATITUDE': str(geocode.lat),
+            'LONGITUDE': str(geocode.long)
+        } for block, street, geocode in self._nearby(lat, lng, buffer)]}
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, body: Dict,
+              headers: Optional[Dict[str, str]] = None) -> None:
+        content = json.dumps(body).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(content)))
+        for key, val in (headers or {}).items():
+            handler.send_header(key, val)
+        handler.end_headers()
+        handler.wfile.write(content)
+
+
+class FakeSDirectory(_Service, IGeoservice):
+    """
+    In-process stand-in of Street Directory, for `Geocoding.set_sdirectory()`.
+    A reverse geocode only gives the building nearest to the street, as the site does.
+    Calls over the rate limit are slowed down by `penalty` secs, as the site is.
+
+    Attributes:
+        penalty (float): Extra secs that a call over the rate limit takes
+    """
+    penalty: float
+
+    def __init__(self, buildings: Iterable[_Building], latency: float = 0.0,
+                 miss_rate: float = 0.0, rate_limit: Optional[int] = None,
+                 penalty: float = 1.0, seed: int = 1) -> None:
+        """
+        Constructor
+
+        Args:
+            buildings (Iterable[_Building]): Block number, street and geolocation
+                        of each building
+            latency (float): Secs that each call takes
+            miss_rate (float): Fraction of the buildings that are not found by `geocode()`
+            rate_limit (Optional[int]): Max no. of calls per sec. None for no limit.
+            penalty (float): Extra secs that a call over the rate limit takes
+            seed (int): Seed of the misses
+        """
+        super().__init__(buildings, latency, miss_rate, rate_limit, seed)
+        self.penalty = penalty
+
+    def geocode(self, address: str) -> Optional[Geocode]:
+        self._throttle('geocode')
+        bldg = self._find(address)
+        return None if bldg is None else bldg[2]
+
+    def geocode_reverse(self, block: str, street: str) -> Optional[Geocode]:
+        self._throttle('reverse')
+        centroid = self._centroid(street)
+        if centroid is None:
+            return None
+        nearest = self._nearby(centroid[0], centroid[1], float('inf'))[:1]
+        return nearest[0][2] if nearest and nearest[0][0] == block.upper() else None
+
+    def _throttle(self, kind: str) -> None:
+        if not self._call(kind):
+            time.sleep(self.penalty)
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Returns:
+        float: Distance in metres, by the equirectangular approximation
+    """
+    x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return _EARTH_RADIUS * math.hypot(x, y)
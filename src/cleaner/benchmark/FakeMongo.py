@@ -0,0 +1,68 @@
+import json
+from typing import Any, Dict, Iterable, List
+
+
+class FakeCollection(object):
+    """
+    In-process stand-in of a pymongo Collection.
+    Documents are serialised as they would be for the wire, then counted.
+
+    Attributes:
+        count (int): No. of documents inserted
+        nbytes (int): Size of the serialised documents
+        indices (List[Any]): Keys of the indices created
+    """
+    count: int
+    nbytes: int
+    indices: List[Any]
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.nbytes = 0
+        self.indices = []
+
+    def insert_many(self, documents: Iterable[Dict]) -> None:
+        for doc in documents:
+            self.nbytes += len(json.dumps(doc, separators=(',', ':')))
+            self.count += 1
+
+    def delete_many(self, query: Dict) -> None:
+        pass
+
+    def create_index(self, keys: Any) -> None:
+        self.indices.append(keys)
+
+
+class FakeClient(object):
+    """
+    In-process stand-in of a pymongo MongoClient
+    """
+    def close(self) -> None:
+        pass
+
+
+class FakeDatabase(object):
+    """
+    In-process stand-in of a pymongo Database, for `MongoImporter`.
+
+    Attributes:
+        client (FakeClient): The client
+        _collections (Dict[str, FakeCollection]): Collections, keyed by name
+    """
+    client: FakeClient
+    _collections: Dict[str, FakeCollection]
+
+    def __init__(self) -> None:
+        self.client = FakeClient()
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection()
+        return self._collections[name]
+
+    def collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    def drop_collection(self, name: str) -> None:
+        self._collections.pop(name, None)
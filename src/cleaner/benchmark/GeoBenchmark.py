@@ -0,0 +1,180 @@
+"""
+Times the geocoding of the real address list against local stand-in services
+"""
+from contextlib import redirect_stdout
+from datetime import datetime
+import io
+from os import path
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from cleanup.geo.GeocodeCache import GeocodeCache
+from cleanup.geo.GeocodeStats import GeocodeStats
+from cleanup.geo.Geocoding import Geocoding
+from cleanup.geo.onemap.OneMap import OneMap
+from cleanup.geo.onemap.OneMapAuth import OneMapAuth
+from storage.DatasetSource import open_source
+from .FakeGeo import FakeOneMap, FakeSDirectory, load_buildings
+
+_PASSES = ('cold', 'warm')  # an empty cache, then the cache of the first pass
+_DEPTHS = ('cache', GeocodeCache.GAZETTEER, GeocodeCache.BASIC,  # in the order of query
+           GeocodeCache.NO_ALPHA, GeocodeCache.REVERSE, GeocodeCache.APPROXIMATE)
+_FAKE_AUTH = {'email': 'benchmark@localhost', 'password': 'benchmark'}
+
+
+def run(template_loc: str, work_loc: Optional[str] = None, workers: int = 8,
+        throttle: float = 0.0, hedge_delay: Optional[float] = 1.0,
+        onemap_latency: float = 0.05, onemap_miss_rate: float = 0.1,
+        onemap_rate_limit: Optional[int] = None, sdir_latency: float = 0.5,
+        sdir_miss_rate: float = 0.5, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Geocodes every block of the template, as AddGeo does, against a local OneMap
+    and Street Directory. Both are served from the geolocation of the template.
+    The addresses are geocoded twice: with an empty cache, then with the cache
+    of the first pass.
+
+    Args:
+        template_loc (str): location of the cleaned JSON folder (or container) to replay
+        work_loc (Optional[str]): Folder for the cache. The system's temporary folder
+                    if not given.
+        workers (int): Max no. of addresses in flight
+        throttle (float): Min. secs between the start of two calls to the same service
+        hedge_delay (Optional[float]): Secs to wait for OneMap before also querying
+                    Street Directory. None to query them in sequence.
+        onemap_latency (float): Secs that each OneMap request takes
+        onemap_miss_rate (float): Fraction of the buildings that OneMap's search misses
+        onemap_rate_limit (Optional[int]): Max no. of OneMap requests per sec
+        sdir_latency (float): Secs that each Street Directory query takes
+        sdir_miss_rate (float): Fraction of the buildings that Street Directory misses
+        verbose (bool): If True, shows the output of the geocoding
+
+    Returns:
+        Dict[str, Any]: The settings, and the results of each pass
+    """
+    addresses = [' '.join((blk['block_code']['block_num'], blk['street']))
+                 for _, data in open_source(template_loc).iter_documents()
+                 for blk in (data if isinstance(data, list) else data['blocks'])]
+    buildings = load_buildings(template_loc)
+    results: Dict[str, Any] = {
+        'created': str(datetime.now()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'workers': workers,
+            'throttle': throttle,
+            'hedge_delay': hedge_delay,
+            'onemap_latency': onemap_latency,
+            'onemap_miss_rate': onemap_miss_rate,
+            'onemap_rate_limit': onemap_rate_limit,
+            'sdir_latency': sdir_latency,
+            'sdir_miss_rate': sdir_miss_rate
+        },
+        'addresses': len(addresses),
+        'buildings': len(buildings),
+        'passes': {}
+    }
+
+    cache_loc = tempfile.mkdtemp(prefix='geobenchmark-', dir=work_loc)
+    onemap = FakeOneMap(buildings, onemap_latency, onemap_miss_rate, onemap_rate_limit)
+    sdir = FakeSDirectory(buildings, sdir_latency, sdir_miss_rate)
+    cache = GeocodeCache(path.join(cache_loc, 'Geocoding.sqlite'))
+    try:
+        with onemap:
+            OneMap.set_base_url(onemap.base_url)
+            OneMapAuth.set_service(onemap.base_url, _FAKE_AUTH,
+                                   path.join(cache_loc, 'OneMapToken.key'))
+            Geocoding.set_cache(cache)
+            Geocoding.set_sdirectory(sdir)
+            Geocoding.set_concurrency(workers, throttle)
+            Geocoding.set_hedge_delay(hedge_delay)
+            for name in _PASSES:
+                print('[GeoBenchmark] {}'.format(name))
+                results['passes'][name] = _run_pass(addresses, onemap, sdir, verbose)
+    finally:
+        OneMap.set_base_url(OneMap.BASE_URL)
+        OneMapAuth.set_service(OneMap.BASE_URL)
+        Geocoding.set_cache(None)
+        Geocoding.set_sdirectory(None)
+        cache.close()
+        shutil.rmtree(cache_loc, ignore_errors=True)
+    return results
+
+
+def summarize(results: Dict[str, Any]) -> None:
+    """
+    Prints the results of `run()` as a table
+    """
+    print('{:<6} {:>10} {:>10} {:>10} {:>8} {:>8} {:>8}  {}'.format(
+        'pass', 'secs', 'lookups/s', 'cache hit', 'onemap', 'sdir', '429', 'depths'))
+    for name, result in results['passes'].items():
+        calls = result['calls']
+        print('{:<6} {:>10.3f} {:>10.1f} {:>9.1%} {:>8} {:>8} {:>8}  {}'.format(
+            name, result['secs'], result['lookups_per_sec'], result['cache_hit_ratio'],
+            sum(calls['onemap'].values()) - calls['onemap'].get('rate_limited', 0),
+            sum(calls['sdirectory'].values()) - calls['sdirectory'].get('rate_limited', 0),
+            calls['onemap'].get('rate_limited', 0),
+            ' '.join('{}:{}'.format(key, val) for key, val in result['depths'].items())))
+
+
+def _run_pass(addresses: List[str], onemap: FakeOneMap, sdir: FakeSDirectory,
+              verbose: bool) -> Dict[str, Any]:
+    """
+    Geocodes the addresses once
+
+    Returns:
+        Dict[str, Any]: Timing, lookups by outcome and depth, and calls to each service
+    """
+    stats_before = GeocodeStats.snapshot()
+    onemap_before, sdir_before = dict(onemap.stats), dict(sdir.stats)
+    with redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        curr_time = time.perf_counter()
+        Geocoding.geocode_all(addresses)
+        secs = time.perf_counter() - curr_time
+    stats = _diff(GeocodeStats.snapshot(), stats_before)
+
+    lookups = stats.pop('lookups', 0)
+    depths: Dict[str, int] = {}
+    for outcome, count in stats.items():
+        depth = _depth(outcome)
+        depths[depth] = depths.get(depth, 0) + count
+
+    result = {
+        'secs': secs,
+        'lookups': lookups,
+        'lookups_per_sec': lookups / secs if secs else 0.0,
+        'cache_hit_ratio': (stats.get('cache', 0) + stats.get('cache_missing', 0)) / lookups
+                           if lookups else 0.0,
+        'outcomes': stats,
+        'depths': dict(sorted(depths.items())),
+        'calls': {'onemap': _diff(onemap.stats, onemap_before),
+                  'sdirectory': _diff(sdir.stats, sdir_before)}
+    }
+    print('\t{} lookups in {:.3f} secs'.format(lookups, secs))
+    return result
+
+
+def _depth(outcome: str) -> str:
+    """
+    Returns:
+        str: How deep an outcome of `GeocodeStats` is in the order of query,
+                    e.g. 2_basic for onemap_basic, or missing
+    """
+    if outcome == 'missing':
+        return outcome
+    if outcome.startswith('cache'):
+        method = 'cache'
+    else:
+        method = outcome.split('_', 1)[1]
+        if method in (GeocodeCache.BASIC, GeocodeCache.FUZZY) and \
+                outcome.startswith(GeocodeCache.GAZETTEER):
+            method = GeocodeCache.GAZETTEER
+    return '{}_{}'.format(_DEPTHS.index(method), method)
+
+
+def _diff(after: Dict[str, int], before: Dict[str, int]) -> Dict[str, int]:
+    return {key: val - before.get(key, 0) for key, val in after.items()
+            if val - before.get(key, 0)}
@@ -0,0 +1,169 @@
+"""
+Generates synthetic JSON trees, shaped like the raw output of the scraper,
+by replicating and perturbing the blocks of an existing dataset.
+"""
+import random
+from os import path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from cleanup.Pipeline import STREET_ACRONYMS
+from storage.DatasetSource import open_source
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+           'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_GEO_PROPS = ('title', 'lat', 'long', 'postal')
+_GEO_TITLE = 'SYNTHETIC'
+_PRICE_JITTER = 0.1  # max fraction that prices are moved by
+_ABBREVIATE_CHANCE = 0.9  # chance that an expandable street name is abbreviated
+
+
+def generate(template_loc: str, out_loc: str, scale: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Writes `scale` copies of every template file. Copies after the first are put in
+    numbered towns (e.g. Bedok 2) on numbered streets, so that addresses stay unique.
+
+    The output is shaped like the scraper's: an array root, abbreviated streets,
+    date strings, lease strings, float areas and no geolocation.
+
+    Args:
+        template_loc (str): location of the JSON folder (or container) to replicate.
+                    Both raw and cleaned data can be used.
+        out_loc (str): location to write to. A folder, or a container.
+        scale (int): No. of copies
+        seed (int): Seed of the perturbations
+
+    Returns:
+        Dict[str, int]: No. of files, blocks, apartments and lease prices written
+    """
+    rand = random.Random(seed)
+    templates = list(open_source(template_loc).iter_documents())
+    counts = {'files': 0, 'blocks': 0, 'apartments': 0, 'lease_prices': 0}
+
+    def documents() -> Iterator[Tuple[str, Any]]:
+        for copy in range(scale):
+            for rel_path, data in templates:
+                town_dir, filename = path.split(rel_path)
+                if copy:
+                    town_dir = '{} {}'.format(town_dir, copy + 1)
+                blocks = data if isinstance(data, list) else data['blocks']
+                raw_blocks = [_to_raw_block(_, copy, rand) for _ in blocks]
+
+                counts['files'] += 1
+                counts['blocks'] += len(raw_blocks)
+                for blk in raw_blocks:
+                    counts['apartments'] += len(blk['apartments'])
+                    counts['lease_prices'] += sum(len(_['lease_price_list'])
+                                                  for _ in blk['apartments'])
+                yield path.join(town_dir, filename), raw_blocks
+
+    open_source(out_loc).write_documents(documents())
+    return counts
+
+
+def add_geocodes(json_loc: str, seed: int = 0) -> None:
+    """
+    Adds made-up geolocation to the blocks, in place of the AddGeo step,
+    which needs the online geocoders. Each block gets its own postal code.
+
+    Args:
+        json_loc (str): location of the JSON folder (or container) to modify
+        seed (int): Seed of the coordinates
+    """
+    rand = random.Random(seed)
+    postal = [100000]
+
+    def func(data: Dict) -> Tuple[bool, Dict]:
+        for blk in data['blocks']:
+            postal[0] += 1
+            blk['title'] = _GEO_TITLE
+            blk['lat'] = round(rand.uniform(1.27, 1.45), 6)
+            blk['long'] = round(rand.uniform(103.68, 103.98), 6)
+            blk['postal'] = postal[0]
+        return True, data
+
+    open_source(json_loc).transform(func)
+
+
+def _to_raw_block(block: Dict, copy: int, rand: random.Random) -> Dict:
+    """
+    Returns:
+        Dict: A perturbed copy of `block`, in the scraper's shape
+    """
+    street = block['street'] if not copy else '{} {}'.format(block['street'], copy + 1)
+    raw = {
+        'apartments': [_to_raw_apartment(_, rand) for _ in block['apartments']],
+        'block_code': dict(block['block_code']),
+        'dpd_date': _to_raw_date(block['dpd_date']),
+        'flat_type': block['flat_type'],
+        'lcd_date': _to_raw_date(block['lcd_date']),
+        'pcd_date': _to_raw_date(block['pcd_date']),
+        'quota_chinese': block['quota_chinese'],
+        'quota_malay': block['quota_malay'],
+        'quota_other': block['quota_other'],
+        'street': _abbreviate(street, rand),
+        'town': block['town'] if not copy else '{} {}'.format(block['town'], copy + 1)
+    }
+    # Keep unknown properties, except for those added by the cleanup
+    for key, value in block.items():
+        if key not in raw and key not in _GEO_PROPS:
+            raw[key] = value
+    return raw
+
+
+def _to_raw_apartment(apartment: Dict, rand: random.Random) -> Dict:
+    """
+    Returns:
+        Dict: A perturbed copy of `apartment`. The lease is only given when
+                    there are several lease prices, as on the HDB website.
+    """
+    lease_prices = apartment['lease_price_list']
+    has_lease = len(lease_prices) > 1
+    return {
+        'area': float(apartment['area']),
+        'floor': apartment['floor'],
+        'is_repurchased': apartment['is_repurchased'],
+        'lease_price_list': [{
+            'lease': _to_raw_lease(_['lease']) if has_lease else None,
+            'price': int(_['price'] * rand.uniform(1 - _PRICE_JITTER, 1 + _PRICE_JITTER))
+        } for _ in lease_prices],
+        'unit': apartment['unit']
+    }
+
+
+def _to_raw_lease(lease: Any) -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: The lease, as scraped
+    """
+    if lease is None or isinstance(lease, str):
+        return lease
+    return str(lease)
+
+
+def _to_raw_date(date: Any) -> str:
+    """
+    Returns:
+        str: The date literal that `ParsedDate.parse_date()` reads back into `date`
+    """
+    if isinstance(date, str):
+        return date
+    if not date:
+        return '-'
+    if date['quarter']:
+        return '{}Q/{}'.format(date['quarter'], date['year'])
+    if date['day']:
+        return '{:02d} {} {}'.format(date['day'], _MONTHS[date['month'] - 1], date['year'])
+    return '{:02d}/{}'.format(date['month'], date['year'])
+
+
+def _abbreviate(street: str, rand: random.Random) -> str:
+    """
+    Returns:
+        str: `street` with some of its words abbreviated, the reverse of the cleanup
+    """
+    for acro, expd, is_regex in reversed(STREET_ACRONYMS):
+        literal = acro.replace(r'\b', '') if is_regex else acro
+        if expd in street and rand.random() < _ABBREVIATE_CHANCE:
+            street = street.replace(expd, literal)
+    return street
+
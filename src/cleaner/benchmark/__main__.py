@@ -0,0 +1,109 @@
+"""
+Benchmarks the cleanup and the database importers on synthetic data.
+
+Run from src/cleaner:
+    python -m benchmark --scales 1 10 100
+    python -m benchmark --geocoding
+"""
+import argparse
+import os
+from os import path
+import sys
+
+import ProjUtils
+from storage.DocumentIO import DocumentIO
+from . import Benchmark, GeoBenchmark
+
+_TEMPLATE_LOC = path.join('data', 'json')
+_RESULTS_LOC = path.join('data', 'benchmark', 'results.json')
+_BASELINE_LOC = path.join('data', 'benchmark', 'baseline.json')
+_GEO_RESULTS_LOC = path.join('data', 'benchmark', 'geocoding.json')
+
+
+def main() -> int:
+    """
+    Main Function
+
+    Returns:
+        int: Exit code. 1 if a timing regressed against the baseline.
+    """
+    parser = argparse.ArgumentParser(prog='benchmark', description=__doc__.split('\n')[1])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help='multiples of the template data size (default: 1 10)')
+    parser.add_argument('--template', default=_TEMPLATE_LOC,
+                        help='JSON folder or container to replicate (default: %(default)s)')
+    parser.add_argument('--output', default=_RESULTS_LOC,
+                        help='where to save the results (default: %(default)s)')
+    parser.add_argument('--baseline', default=_BASELINE_LOC,
+                        help='results to compare against (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='also save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction that a timing may be slower by (default: %(default)s)')
+    parser.add_argument('--verbose', action='store_true',
+                        help='show the output of the steps')
+    geo_group = parser.add_argument_group(
+        'geocoding', 'replays the addresses of --template against local stand-in services')
+    geo_group.add_argument('--geocoding', action='store_true',
+                           help='benchmark the geocoding instead, saving to {}'.format(
+                               _GEO_RESULTS_LOC))
+    geo_group.add_argument('--workers', type=int, default=8,
+                           help='max no. of addresses in flight (default: %(default)s)')
+    geo_group.add_argument('--hedge-delay', type=float, default=1.0,
+                           help='secs to wait for OneMap before also querying '
+                                'Street Directory (default: %(default)s)')
+    geo_group.add_argument('--onemap-latency', type=float, default=0.05,
+                           help='secs per OneMap request (default: %(default)s)')
+    geo_group.add_argument('--onemap-miss-rate', type=float, default=0.1,
+                           help='fraction of buildings that OneMap misses (default: %(default)s)')
+    geo_group.add_argument('--onemap-rate-limit', type=int, default=None,
+                           help='max OneMap requests per sec (default: no limit)')
+    geo_group.add_argument('--sdir-latency', type=float, default=0.5,
+                           help='secs per Street Directory query (default: %(default)s)')
+    geo_group.add_argument('--sdir-miss-rate', type=float, default=0.5,
+                           help='fraction of buildings that Street Directory misses '
+                                '(default: %(default)s)')
+    args = parser.parse_args()
+
+    ProjUtils.set_project_cwd()
+    if args.geocoding:
+        return _run_geocoding(args)
+    results = Benchmark.run(args.template, args.scales, verbose=args.verbose)
+    for loc in (args.output, args.baseline):
+        if path.dirname(loc) and not path.exists(path.dirname(loc)):
+            os.makedirs(path.dirname(loc))
+    DocumentIO.dump(args.output, results, DocumentIO.PRETTY)
+    print('Saved results to {}'.format(args.output))
+
+    regressions = []
+    if path.exists(args.baseline):
+        regressions = Benchmark.compare(results, DocumentIO.load(args.baseline), args.tolerance)
+    if args.save_baseline:
+        DocumentIO.dump(args.baseline, results, DocumentIO.PRETTY)
+        print('Saved baseline to {}'.format(args.baseline))
+    return 1 if regressions else 0
+
+
+def _run_geocoding(args: argparse.Namespace) -> int:
+    """
+    Benchmarks the geocoding
+
+    Returns:
+        int: Exit code
+    """
+    results = GeoBenchmark.run(
+        args.template, workers=args.workers, hedge_delay=args.hedge_delay,
+        onemap_latency=args.onemap_latency, onemap_miss_rate=args.onemap_miss_rate,
+        onemap_rate_limit=args.onemap_rate_limit, sdir_latency=args.sdir_latency,
+        sdir_miss_rate=args.sdir_miss_rate, verbose=args.verbose)
+    GeoBenchmark.summarize(results)
+    output = args.output if args.output != _RESULTS_LOC else _GEO_RESULTS_LOC
+    if path.dirname(output) and not path.exists(path.dirname(output)):
+        os.makedirs(path.dirname(output))
+    DocumentIO.dump(output, results, DocumentIO.PRETTY)
+    print('Saved results to {}'.format(output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Adds the nearest amenities of each category to the blocks, e.g. MRT stations,
+schools and hawker centres, from a local file of points of interest
+"""
+from os import path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from storage.DatasetSource import open_source
+from .geo.PointsOfInterest import PointsOfInterest
+from .objects.CleanupLog import CleanupLog
+
+_PROCESS_NAME = 'AddAmenity'
+POI_LOC = path.join('data', 'amenities.csv')
+""" Points of interest, as CSV or GeoJSON. See `PointsOfInterest` """
+_K = 3  # amenities of each category per block
+
+
+def run(json_loc: str, log_loc: str) -> None:
+    """
+    Adds the nearest amenities to the blocks.
+    Skipped, and not logged as done, if there is no file of points of interest.
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+    """
+    if CleanupLog.has_done(_PROCESS_NAME, log_loc):
+        print('Skipping {}'.format(_PROCESS_NAME))
+        return
+    if not path.exists(POI_LOC):
+        print('Skipping {}, as there is no {}'.format(_PROCESS_NAME, POI_LOC))
+        return
+
+    print('--------------------------------')
+    print('[AddAmenity]')
+    source = open_source(json_loc)
+    documents = list(source.iter_documents())
+    if add_amenities(data for _, data in documents):
+        source.write_documents(documents)
+    CleanupLog.log_done(_PROCESS_NAME, log_loc)
+
+
+def add_amenities(documents: Iterable[Dict]) -> int:
+    """
+    Adds the nearest amenities to the geolocated blocks of the files, in memory.
+    All blocks are measured against each category in one vectorized pass.
+    Each block gets `amenities`, a list of category, name and distance in metres,
+    with up to `_K` of each category, nearest first.
+
+    Args:
+        documents (Iterable[Dict]): The JSON of each file
+
+    Returns:
+        int: No. of files changed
+    """
+    if not path.exists(POI_LOC):
+        print('No points of interest at {}'.format(POI_LOC))
+        return 0
+    pois = PointsOfInterest.load(POI_LOC)
+
+    documents = list(documents)
+    blocks = [(i, blk) for i, data in enumerate(documents)
+              for blk in data['blocks'] if 'lat' in blk]
+    lat = np.array([blk['lat'] for _, blk in blocks], dtype=np.float64)
+    lng = np.array([blk['long'] for _, blk in blocks], dtype=np.float64)
+    by_category: List[Tuple[str, List[List[str]], List[List[int]]]] = []
+    names = np.array(pois.names, dtype=object)
+    for category in pois.categories:
+        ids, dists = pois.nearest_many(category, lat, lng, _K)
+        # only padded if the category has fewer than _K points, the same for every block
+        count = int((ids[0] >= 0).sum()) if len(ids) else 0
+        by_category.append((category, names[ids[:, :count]].tolist(),
+                            np.rint(dists[:, :count]).astype(np.int64).tolist()))
+
+    changed = set()
+    for row, (i, blk) in enumerate(blocks):
+        blk_amenities = [{'category': category, 'name': name, 'distance': dist}
+                         for category, cat_names, cat_dists in by_category
+                         for name, dist in zip(cat_names[row], cat_dists[row])]
+        if blk.get('amenities') != blk_amenities:
+            blk['amenities'] = blk_amenities
+            changed.add(i)
+    print('Added {} categories of {} amenities to {} blocks'.format(
+        len(pois.categories), len(pois), len(blocks)))
+    return len(changed)
@@ -1,11 +1,10 @@
 """
 Adds geolocation data to the blocks
 """
-import json
-import os
-from os import path
-from typing import Dict
+from typing import Dict, Iterable, List, Tuple
 
+from storage.DatasetSource import open_source
+from .geo.AddressNotFoundException import AddressNotFoundException
 from .geo.Geocoding import Geocoding
 from .objects.CleanupLog import CleanupLog
 
@@ -15,62 +14,89 @@ _PROCESS_NAME = 'AddGeo'
 def run(json_loc: str, log_loc: str) -> None:
     """
     Adds details to the blocks, such as geolocation, etc.
+    The blocks that are found are saved even if others are not.
 
     Args:
-        json_loc (str): The JSON string to modify
+        json_loc (str): location of JSON folder, or of a container
         log_loc (str): location of cleaning log
+
+    Raises:
+        AddressNotFoundException: If an address is not found, after the files are saved.
+                    It's not logged as done, so the next run retries the missing blocks.
     """
     if CleanupLog.has_done(_PROCESS_NAME, log_loc):
         print('Skipping {}'.format(_PROCESS_NAME))
         return
 
-    # Iterate through all files
+    # All files are geocoded at once, so each building is only looked up once.
+    # Results are cached as they come, so a run that fails resumes quickly
     print('--------------------------------')
     print('[AddGeo]')
-    for root, _, filenames in os.walk(json_loc):
-        if filenames:
-            print('Running directory {}'.format(root))
-
-            for filename in filenames:
-                filepath = path.join(root, filename)
-
-                # Open the file
-                data: Dict
-                with open(filepath, 'r') as fstream:
-                    data = json.load(fstream)
-                    fstream.close()
-
-                if _add_geo(data):
-                    # Resave the file
-                    with open(filepath, 'w') as fstream:
-                        json.dump(data, fstream, indent=4)
+    source = open_source(json_loc)
+    documents = list(source.iter_documents())
+    changed, missing = _add_geo(data for _, data in documents)
+    if changed:
+        source.write_documents(documents)
+    if missing:
+        raise AddressNotFoundException(missing[0])
     CleanupLog.log_done(_PROCESS_NAME, log_loc)
 
 
-def _add_geo(data: Dict) -> bool:
+def add_geo(documents: Iterable[Dict]) -> int:
     """
-    Adds geolocation to the blocks
+    Adds geolocation to the blocks of the files, in memory.
+    The distinct addresses of all files are gathered and geocoded once,
+    then the results are copied to every block of that address.
+    Blocks whose address is not found are reported, and left without a location.
 
     Args:
-        data (Dict): The JSON of a file
+        documents (Iterable[Dict]): The JSON of each file
+
+    Returns:
+        int: No. of files changed
+    """
+    return _add_geo(documents)[0]
+
+
+def _add_geo(documents: Iterable[Dict]) -> Tuple[int, List[str]]:
+    """
+    See `add_geo()`
 
     Returns:
-        bool: Whether any changes were made
+        Tuple[int, List[str]]: No. of files changed, and the addresses not found
+    """
+    # skip blocks where it's already done, e.g. those geocoded before an interruption
+    to_geocode = [_ for _ in documents if any('lat' not in blk for blk in _['blocks'])]
+    geocodes = Geocoding.geocode_all(_address(blk) for data in to_geocode
+                                     for blk in data['blocks'] if 'lat' not in blk)
+
+    missing: List[str] = []
+    changed = 0
+    for data in to_geocode:
+        is_changed = False
+        for blk in data['blocks']:
+            if 'lat' in blk:
+                continue
+            geocode = geocodes[Geocoding.normalize(_address(blk))]
+            if geocode is None:
+                missing.append(_address(blk))
+                continue
+            blk['title'] = geocode.title
+            blk['lat'] = geocode.lat
+            blk['long'] = geocode.long
+            blk['postal'] = geocode.postal
+            is_changed = True
+        changed += is_changed
+    print('Geocoded {} distinct addresses for {} files'.format(len(geocodes), len(to_geocode)))
+    if missing:
+        print('[Warning] {} blocks not found, left without a location: {}'.format(
+            len(missing), ', '.join(sorted(set(missing)))))
+    return changed, missing
+
+
+def _address(blk: Dict) -> str:
+    """
+    Returns:
+        str: Block number + Street
     """
-    # skip if it's already done
-    if 'lat' in data['blocks'][0]:
-        return False
-
-    # bulk process is faster
-    addresses = [' '.join((blk['block_code']['block_num'], blk['street']))
-                 for blk in data['blocks']]
-    geocodes = Geocoding.geocode(*addresses)
-
-    # manually iterate again
-    for i, blk in enumerate(data['blocks']):
-        geocode = geocodes[i]
-        blk['title'] = geocode.title
-        blk['lat'] = geocode.lat
-        blk['long'] = geocode.long
-        blk['postal'] = geocode.postal
-    return True
+    return ' '.join((blk['block_code']['block_num'], blk['street']))
@@ -1,14 +1,15 @@
 """
 Fixes the lease on lease_price_list
 """
-import json
-import os
-from os import path
-from typing import Dict
+from typing import Any, Dict, Iterable, List, Tuple
 
+import numpy as np
+
+from dataset.Dataset import Dataset
 from .objects.CleanupLog import CleanupLog
 
 _PROCESS_NAME = 'ComputeLease'
+_DATE_PROPS = ('lcd_date', 'pcd_date', 'dpd_date')
 
 
 def run(json_loc: str, log_loc: str) -> None:
@@ -22,6 +23,9 @@ def run(json_loc: str, log_loc: str) -> None:
         * If lcd, pcd, dpd dates are before May'17, remaining lease is below 99 years
         * If lcd, pcd, dpd dates are after May'17, 99 lease begins on latest date
 
+    All lease prices of all files are computed at once.
+    Only files with unprocessed lease prices are saved.
+
     Args:
         json_loc (str): location of JSON folder
         log_loc (str): location of cleaning log
@@ -30,79 +34,139 @@ def run(json_loc: str, log_loc: str) -> None:
         print('Skipping {}'.format(_PROCESS_NAME))
         return
 
-    # Iterate through all files
     print('--------------------------------')
     print('[ComputeLease]')
-    for root, _, filenames in os.walk(json_loc):
-        print('Running directory {}'.format(root))
-
-        for filename in filenames:
-            filepath = path.join(root, filename)
-
-            # Open the file
-            data: Dict
-            with open(filepath) as fstream:
-                data = json.load(fstream)
-                fstream.close()
-
-            if _compute_lease(data):  # if modified
-                # Save the file
-                with open(filepath, 'w') as fstream:
-                    json.dump(data, fstream, indent=4)
+    dataset = Dataset.load(json_loc)
+    changed_files = _compute_dataset(dataset)
+    print('Saving {} files'.format(len(changed_files)))
+    dataset.save(json_loc, changed_files)
     CleanupLog.log_done(_PROCESS_NAME, log_loc)
 
 
-def _compute_lease(data: Dict) -> bool:
+def compute_leases(months_since: np.ndarray, months_valid: np.ndarray,
+                   lease_blocks: np.ndarray, lease_strs: np.ndarray,
+                   is_done: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batch lease engine. Computes the lease of all lease prices at once.
+
+    Args:
+        months_since (np.ndarray): (blocks, 3) lcd, pcd, dpd `months_since` of each block
+        months_valid (np.ndarray): (blocks, 3) whether each date is not null
+        lease_blocks (np.ndarray): Index of the block of each lease price
+        lease_strs (np.ndarray): Unprocessed lease of each lease price. Null is ''.
+        is_done (np.ndarray): Whether each lease price is already processed
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The lease of each lease price,
+                    and whether it has to be written back
+    """
+    lease_left = _precompute_remaining_lease(months_since, months_valid)
+
+    # Numeric strings are taken as is
+    lease_strs = lease_strs.astype(np.str_)
+    is_digit = np.char.isdigit(lease_strs)
+    digits = np.where(is_digit, lease_strs, '0').astype(np.int64)
+
+    leases = np.where(is_digit, digits, lease_left[lease_blocks])
+    return leases, ~is_done
+
+
+def _compute_dataset(dataset: Dataset) -> List[int]:
     """
-    Computes the remaining lease.
+    Computes the remaining lease of every unprocessed lease price in the dataset
 
     Args:
-        data (dict): Dictionary (aka JSON)
+        dataset (Dataset): The dataset. Modified in place.
 
     Returns:
-        bool: Whether a change was made to `data`
+        List[int]: Indices of the files that were modified
     """
-    for block in data['blocks']:
-        lease_left = _precompute_remaining_lease(block)
+    blocks = dataset.blocks
+    months_since = np.stack([blocks[_ + '_months_since'] for _ in _DATE_PROPS], axis=1)
+    months_valid = np.stack([blocks[_ + '_kind'] == Dataset.PARSED for _ in _DATE_PROPS], axis=1)
+    if any((blocks[_ + '_kind'] == Dataset.RAW).any() for _ in _DATE_PROPS):
+        raise ValueError('Dates have to be parsed before computing the lease')
 
-        for apt in block['apartments']:
-            for lease_price in apt['lease_price_list']:
-                lease = lease_price['lease']
+    lease_kind = dataset.leases['lease_kind']
+    is_done = lease_kind == Dataset.PARSED
+    lease_strs = dataset.strings.decode_array(dataset.leases['lease_raw'])
+    lease_strs[lease_kind != Dataset.RAW] = ''
 
-                # early termination. already processed
-                if isinstance(lease, int):
-                    return False
+    leases, to_write = compute_leases(months_since, months_valid, dataset.lease_blocks(),
+                                      lease_strs, is_done)
 
-                if lease.isdigit():
-                    lease_price['lease'] = int(lease)
-                else:
-                    lease_price['lease'] = lease_left
-    return True
+    # Scatter back in one go
+    rows = np.flatnonzero(to_write)
+    dataset.leases['lease'][rows] = leases[rows]
+    dataset.leases['lease_kind'][rows] = Dataset.PARSED
+    dataset.leases['lease_raw'][rows] = -1
 
+    changed_blocks = dataset.lease_blocks()[rows]
+    return np.unique(blocks['file'][changed_blocks]).tolist()
 
-def _precompute_remaining_lease(block: Dict) -> int:
+
+def compute_documents(documents: Iterable[Dict]) -> int:
     """
-    Computes the lease remaining, based on lcd, pcd, and dpd dates
+    Computes the remaining lease of all files, in memory, with a single batch.
+    Lease prices that are already processed are left untouched.
 
     Args:
-        block (Dict): Dictionary containing the block
+        documents (Iterable[Dict]): The JSON of each file
 
+    Returns:
+        int: No. of files changed
+    """
+    # Gather the columns of all files
+    months_since: List[List[int]] = []
+    months_valid: List[List[bool]] = []
+    lease_blocks: List[int] = []
+    lease_prices: List[Dict] = []
+    lease_files: List[int] = []
+    for file_index, data in enumerate(documents):
+        for block in data['blocks']:
+            dates: List[Any] = [block[_] for _ in _DATE_PROPS]
+            months_since.append([_['months_since'] if _ else 0 for _ in dates])
+            months_valid.append([bool(_) for _ in dates])
+
+            for apt in block['apartments']:
+                for lease_price in apt['lease_price_list']:
+                    lease_blocks.append(len(months_since) - 1)
+                    lease_prices.append(lease_price)
+                    lease_files.append(file_index)
+    if not lease_prices:
+        return 0
+
+    is_done = np.array([isinstance(_['lease'], int) for _ in lease_prices])
+    lease_strs = np.array([_['lease'] if isinstance(_['lease'], str) else ''
+                           for _ in lease_prices])
+    leases, to_write = compute_leases(np.array(months_since, dtype=np.int64).reshape(-1, 3),
+                                      np.array(months_valid).reshape(-1, 3),
+                                      np.array(lease_blocks), lease_strs, is_done)
+
+    # Scatter back
+    rows = np.flatnonzero(to_write).tolist()
+    for i in rows:
+        lease_prices[i]['lease'] = int(leases[i])
+    return len(set(lease_files[i] for i in rows))
+
+
+def _precompute_remaining_lease(months_since: np.ndarray, months_valid: np.ndarray) -> np.ndarray:
+    """
+    Computes the lease remaining of each block, based on lcd, pcd, and dpd dates
+
+    Args:
+        months_since (np.ndarray): (blocks, 3) lcd, pcd, dpd `months_since` of each block
+        months_valid (np.ndarray): (blocks, 3) whether each date is not null
 
     Returns:
-        int: Remaining lease in years
+        np.ndarray: Remaining lease in years, of each block
     """
-    months = []
-    if block['lcd_date']:
-        months.append(block['lcd_date']['months_since'])
-    if block['pcd_date']:
-        months.append(block['pcd_date']['months_since'])
-    if block['dpd_date']:
-        months.append(block['dpd_date']['months_since'])
-    longest_months = max(months) if months else 0
-
-    lease_left: int
-    if longest_months >= 0:
-        lease_left = 99
-    else:
-        lease_left = 99 - abs(round(longest_months / 12.0))
-    return lease_left
+    # Blocks without any dates take 0
+    months_since = months_since.astype(np.int64)
+    masked = np.where(months_valid, months_since, np.iinfo(np.int64).min)
+    longest_months = masked.max(axis=1)
+    longest_months[~months_valid.any(axis=1)] = 0
+
+    # round() is half-to-even, same as numpy's
+    lease_left = 99 - np.abs(np.round(longest_months / 12.0))
+    return np.where(longest_months >= 0, 99, lease_left).astype(np.int64)
@@ -1,43 +1,58 @@
 """
 This module helps create a list of all distinct values of a given property.
+Alternatively, it sketches the values approximately in constant memory.
 """
-import json
-import os
+from itertools import groupby
 from os import path
-from typing import Any, Dict, List, Union, Set
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, Set
 
+from dataset.Dataset import Dataset
+from storage.DatasetSource import open_source
+from .objects.PropertySketch import PropertySketch
 
-def check(json_loc: str, prop_name: str) -> None:
+
+def check(json_loc: str, prop_name: str, as_sketch: bool = False,
+          dataset: Optional[Dataset] = None) -> None:
     """
     Extracts the given `prop_name` from all files
 
     Args:
-        json_loc (str): location of JSON folder
+        json_loc (str): location of JSON folder, or of a container
         prop_name (str): object-oriented, dot-delimited attribute
+        as_sketch (bool): If True, prints approximate statistics instead of all values
+        dataset (Optional[Dataset]): If given, values are taken from its columns instead
     """
-    result_list = retrieve(json_loc, prop_name)
+    result: Any
+    if as_sketch:
+        result = sketch(json_loc, prop_name).to_dict()
+    else:
+        result = retrieve(json_loc, prop_name, dataset)
     print('\n{}:'.format(prop_name))
-    print(result_list)
+    print(result)
 
 
-def retrieve(json_loc: str, prop_name: str) -> Any:
+def retrieve(json_loc: str, prop_name: str, dataset: Optional[Dataset] = None) -> Any:
     """
     Extracts the given `prop_name` from all files
 
     Args:
-        json_loc (str): location of JSON folder
+        json_loc (str): location of JSON folder, or of a container
         prop_name (str): object-oriented, dot-delimited attribute
+        dataset (Optional[Dataset]): If given, values are taken from its columns instead.
+                    Only leaf properties are supported.
 
     Returns:
         Any: The aggregated property
     """
+    if dataset:
+        return dataset.distinct(prop_name)
+
     prop_arr = prop_name.split('.')
 
     # Iterate through all files
     dir_results = []
-    for dir_ in os.listdir(json_loc):
-        abs_dir = path.join(json_loc, dir_)
-        dir_results.append(_retrieve_dir(abs_dir, prop_arr))
+    for _, documents in _iter_dirs(json_loc):
+        dir_results.append(_retrieve_dir(documents, prop_arr))
 
     # Aggregate results
     result_hash: Set = set()
@@ -52,7 +67,44 @@ def retrieve(json_loc: str, prop_name: str) -> Any:
     return result_list
 
 
-def _retrieve_dir(abs_dir: str, prop_arr: List[str]) -> Set:
+def sketch(json_loc: str, prop_name: str) -> PropertySketch:
+    """
+    Sketches the given `prop_name` from all files, in constant memory
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        prop_name (str): object-oriented, dot-delimited attribute
+
+    Returns:
+        PropertySketch: Approximate distinct count, heavy hitters and quantiles
+    """
+    prop_arr = prop_name.split('.')
+
+    # Iterate through all files, merging the sketches of each directory
+    result = PropertySketch(prop_name)
+    for _, documents in _iter_dirs(json_loc):
+        result.merge(_retrieve_dir(documents, prop_arr, as_sketch=True))
+    return result
+
+
+def _iter_dirs(json_loc: str) -> Iterator[Tuple[str, Iterator[Dict]]]:
+    """
+    Groups the documents by their directory
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+
+    Returns:
+        Iterator[Tuple[str, Iterator[Dict]]]: Relative directory, and its documents
+    """
+    groups = groupby(open_source(json_loc).iter_documents(),
+                     key=lambda _: path.dirname(_[0]))
+    for rel_dir, group in groups:
+        yield rel_dir, (data for _, data in group)
+
+
+def _retrieve_dir(documents: Iterable[Dict], prop_arr: List[str],
+                  as_sketch: bool = False) -> Union[Set, PropertySketch]:
     """
     Runs property retrieval on the files within a directory.
     Suitable for parallelisation.
@@ -60,26 +112,27 @@ def _retrieve_dir(abs_dir: str, prop_arr: List[str]) -> Set:
     Note: Do not multiprocess. Time needed to spin up the process is too slow.
 
     Args:
-        abs_dir (str): location of directory of JSON files
+        documents (Iterable[Dict]): The JSON files of a directory
         prop_name (str): object-oriented, dot-delimited attribute
+        as_sketch (bool): If True, values are streamed into a sketch instead of a set
 
     Returns:
         Any: The aggregated property
     """
+    result_sketch = PropertySketch('.'.join(prop_arr))
     result_hash: Set = set()
-    for file in os.listdir(abs_dir):
-        abs_file = path.join(abs_dir, file)
-
-        # Open the file
-        with open(abs_file) as fstream:
-            data = json.load(fstream)
+    for data in documents:
+        if as_sketch:
+            for value in _iter_file(data, prop_arr):
+                result_sketch.add(value)
+            continue
 
-            result = _check_file(data, prop_arr)
-            if isinstance(result, set):
-                result_hash |= result
-            else:
-                result_hash.add(result)
-    return result_hash
+        result = _check_file(data, prop_arr)
+        if isinstance(result, set):
+            result_hash |= result
+        else:
+            result_hash.add(result)
+    return result_sketch if as_sketch else result_hash
 
 
 def _check_file(data: Dict, prop_arr: List[str]) -> Union[Set[Any], Any]:
@@ -118,3 +171,30 @@ def _check_file(data: Dict, prop_arr: List[str]) -> Union[Set[Any], Any]:
                 combi.add(sub_result)
         return combi
     return _check_file(value, prop_arr)
+
+
+def _iter_file(data: Dict, prop_arr: List[str]) -> Iterator[Any]:
+    """
+    Digs into a file to yield every value of the desired property,
+    without gathering them into a set
+
+    Args:
+        data (dict): Dictionary (aka JSON)
+        prop_arr (list): Array of object-oriented attributes,
+                    where the first element is the top-level attribute
+
+    Returns:
+        Iterator[Any]: Values of `prop_name`, including duplicates
+    """
+    value = data[prop_arr[0]]
+
+    # stop if finished the targeted properties
+    if len(prop_arr) == 1:
+        vtype = type(value)
+        yield str(value) if vtype is list or vtype is dict else value
+        return
+
+    # Note: This doesn't handle list in list. But we don't have that anyway.
+    children = value if isinstance(value, list) else [value]
+    for child in children:
+        yield from _iter_file(child, prop_arr[1:])
@@ -0,0 +1,164 @@
+"""
+Runs the cleanup stages on all files in memory, as a graph of dependencies.
+Stages that don't depend on each other run at the same time, so the network-bound
+geocoding overlaps with the other stages. A stage is skipped if the properties
+that it reads and writes are the same as at the end of the last run.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import hashlib
+import json
+from os import path
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from profiling.StepProfiler import StepProfiler
+from storage.DatasetSource import open_source
+from storage.DocumentIO import DocumentIO
+from . import Pipeline, RootJsonFix
+from .objects.Stage import Stage
+
+_STEP_COSTS = ('cpu', 'files_read', 'bytes_read', 'files_written', 'bytes_written')  # to timeline
+
+
+def run(json_loc: str, state_loc: str, stages: Optional[List[Stage]] = None,
+        skip: Iterable[str] = (), workers: int = 4,
+        profiler: Optional[StepProfiler] = None) -> Dict[str, Any]:
+    """
+    Loads all files, runs the stages, and saves the files that changed.
+    Loading, saving and each stage are profiled as steps. A stage is profiled on
+    the thread that runs it, and its CPU time and I/O are also in the timeline.
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        state_loc (str): location of the fingerprints of the stages' properties
+        stages (Optional[List[Stage]]): Stages, in the order that they are declared.
+                    Defaults to `Pipeline.STAGES`.
+        skip (Iterable[str]): Names of the stages not to run
+        workers (int): Max no. of stages running at the same time
+        profiler (Optional[StepProfiler]): Profiler of the steps. If not given,
+                    they're only timed.
+
+    Returns:
+        Dict[str, Any]: The timeline of the run
+    """
+    print('--------------------------------')
+    print('[Orchestrator]')
+    stages = [_ for _ in (stages or Pipeline.STAGES) if _.name not in set(skip)]
+    profiler = profiler or StepProfiler('', ())
+    run_start = time.perf_counter()
+
+    # Load all files
+    source = open_source(json_loc)
+    rel_paths: List[str] = []
+    documents: List[Dict] = []
+    with profiler.step('LoadDocuments'):
+        for rel_path, data in source.iter_documents():
+            rel_paths.append(rel_path)
+            documents.append(RootJsonFix.fix_root(data)[1])
+    load_secs = time.perf_counter() - run_start
+
+    state: Dict[str, str] = DocumentIO.load(state_loc) if path.exists(state_loc) else {}
+    deps = _build_graph(stages)
+    timeline: List[Dict[str, Any]] = []
+
+    def run_stage(index: int) -> None:
+        stage = stages[index]
+        record: Dict[str, Any] = {
+            'name': stage.name,
+            'after': [stages[_].name for _ in sorted(deps[index])],
+            'thread': threading.current_thread().name,
+            'start': time.perf_counter() - run_start
+        }
+        with profiler.step(stage.name, per_thread=True) as step:
+            fingerprint = _fingerprint(documents, stage.props, stage.sources)
+            record['skipped'] = state.get(stage.name) == fingerprint
+            if record['skipped']:
+                print('Skipping {}'.format(stage.name))
+            else:
+                print('Running {}'.format(stage.name))
+                stage.func(documents)
+        record['end'] = time.perf_counter() - run_start
+        record.update((key, step[key]) for key in _STEP_COSTS)
+        timeline.append(record)
+
+    # Run each stage once the stages it depends on are done
+    done: Set[int] = set()
+    running: Dict[Future, int] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stage') as pool:
+        while len(done) < len(stages):
+            for i in range(len(stages)):
+                if i not in done and i not in running.values() and deps[i] <= done:
+                    running[pool.submit(run_stage, i)] = i
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                future.result()
+                done.add(running.pop(future))
+
+    # Save the files that changed, and the fingerprints of the end result,
+    # which running the stages again would not change
+    save_start = time.perf_counter()
+    with profiler.step('SaveDocuments'):
+        if not all(_['skipped'] for _ in timeline):
+            source.write_documents(zip(rel_paths, documents))
+        for stage in stages:
+            state[stage.name] = _fingerprint(documents, stage.props, stage.sources)
+        DocumentIO.dump(state_loc, state, DocumentIO.PRETTY)
+
+    result = {'load': load_secs,
+              'save': time.perf_counter() - save_start,
+              'wall': time.perf_counter() - run_start,
+              'stages': sorted(timeline, key=lambda _: _['start'])}
+    print('Orchestrator: {:.2f} secs'.format(result['wall']))
+    return result
+
+
+def _build_graph(stages: List[Stage]) -> List[Set[int]]:
+    """
+    Returns:
+        List[Set[int]]: Indices of the stages that each stage has to wait for
+    """
+    return [{j for j in range(i) if stage.depends_on(stages[j])}
+            for i, stage in enumerate(stages)]
+
+
+def _fingerprint(documents: List[Dict], props: Iterable[str],
+                 sources: Iterable[str] = ()) -> str:
+    """
+    Hashes the values of the properties of all files, and the content of the sources.
+    Properties and sources that don't exist yet are hashed as null.
+
+    Returns:
+        str: Hex digest
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for prop in props:
+        prop_arr = prop.split('.')
+        hasher.update(prop.encode('utf-8'))
+        for data in documents:
+            values = list(_iter_values(data, prop_arr))
+            hasher.update(json.dumps(values, sort_keys=True).encode('utf-8'))
+    for source_loc in sources:
+        hasher.update(source_loc.encode('utf-8'))
+        if path.exists(source_loc):
+            with open(source_loc, 'rb') as fstream:
+                hasher.update(fstream.read())
+        else:
+            hasher.update(b'null')
+    return hasher.hexdigest()
+
+
+def _iter_values(data: Any, prop_arr: List[str]) -> Iterator[Any]:
+    """
+    Digs into a file to yield every value of the desired property.
+    Lists are transparent, similar to ExamineProperty.
+    """
+    if isinstance(data, list):
+        for _ in data:
+            yield from _iter_values(_, prop_arr)
+        return
+    value = data.get(prop_arr[0]) if isinstance(data, dict) else None
+    if len(prop_arr) == 1:
+        yield value
+    elif value is not None:
+        yield from _iter_values(value, prop_arr[1:])
@@ -0,0 +1,181 @@
+"""
+The cleanup steps of the scraped data, in the order that they are run
+"""
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from dataset.Dataset import Dataset
+from . import AddAmenity, AddGeo, ComputeLease, ReplaceFix, RootJsonFix
+from .objects.ParsedDate import ParsedDate
+from .objects.ReplacePair import ReplacePair
+from .objects.Stage import Stage
+from .objects.StreetName import StreetName
+
+STREET_ACRONYMS: List[Tuple[str, str, bool]] = StreetName.ACRONYMS
+""" Street acronyms, also used by the geocoding gazetteer. See `StreetName.ACRONYMS` """
+
+
+_LEASE = 'blocks.apartments.lease_price_list.lease'
+_DATES = ('blocks.lcd_date', 'blocks.pcd_date', 'blocks.dpd_date')
+_AREA = 'blocks.apartments.area'
+
+
+def null_fix(json_loc: str, log_loc: str) -> None:
+    """
+    Fix[es] to ensure nothing crashes because of a None value
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+    """
+    for replace_pair in _null_fix_pairs():
+        ReplaceFix.run(json_loc, log_loc, replace_pair)
+
+
+def expand_address_acronym(json_loc: str, log_loc: str) -> None:
+    """
+    Expands address acronyms like NTH to NORTH
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+    """
+    curr_time = time.time()
+    for replace_pair in _acronym_pairs():
+        ReplaceFix.run(json_loc, log_loc, replace_pair)
+    print('Expand Address Acronym: {:.2f} secs'.format(
+        time.time() - curr_time))
+
+
+def date_to_dict(json_loc: str, log_loc: str) -> None:
+    """
+    Parses the date attribute into a dictionary
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+    """
+    curr_time = time.time()
+    for replace_pair in _date_pairs():
+        ReplaceFix.run(json_loc, log_loc, replace_pair)
+    print('Date to Dict: {:.2f} secs'.format(time.time() - curr_time))
+
+
+def change_types(json_loc: str, log_loc: str) -> None:
+    """
+    Changes the types of some attributes
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+    """
+    curr_time = time.time()
+    dataset = Dataset.load(json_loc)
+
+    # blocks.apartments.area from float to int
+    areas, _ = dataset.column(_AREA)
+    if np.all(areas == np.floor(areas)):
+        ReplaceFix.run(json_loc, log_loc, _area_pair())
+
+    print('Change Types: {:.2f} secs'.format(time.time() - curr_time))
+
+
+def _null_fix_pairs() -> List[ReplacePair]:
+    return [ReplacePair(_LEASE, 'null lease', lambda v: (v is None, '-'))]
+
+
+def _acronym_pairs() -> List[ReplacePair]:
+    def expand(acro, expd):
+        return ReplacePair('blocks.street', acro,
+                           lambda v: (acro in v, v.replace(acro, expd)))
+
+    def re_expand(acro, expd):
+        return ReplacePair('blocks.street', acro,
+                           lambda v: (True, re.sub(acro, expd, v)))
+
+    return [re_expand(acro, expd) if is_regex else expand(acro, expd)
+            for acro, expd, is_regex in STREET_ACRONYMS]
+
+
+def _date_pairs() -> List[ReplacePair]:
+    def func(val):
+        # None is a date that's parsed already, as empty
+        to_parse = val is not None and not isinstance(val, dict)
+        datedict = ParsedDate.parse_date(val).to_dict() if to_parse else val
+        return to_parse, datedict
+
+    return [ReplacePair(prop, '', func) for prop in _DATES]
+
+
+def _area_pair() -> ReplacePair:
+    return ReplacePair(_AREA, 'to int', lambda v: (True, int(v)))
+
+
+def _replace_all(replace_pairs: List[ReplacePair]) -> Callable[[List[Dict]], None]:
+    """
+    Returns:
+        Callable[[List[Dict]], None]: Applies the pairs on all files in memory
+    """
+    def func(documents: List[Dict]) -> None:
+        for replace_pair in replace_pairs:
+            for data in documents:
+                ReplaceFix.apply(data, replace_pair)
+    return func
+
+
+def _change_types_all(documents: List[Dict]) -> None:
+    """
+    Changes the types of some attributes, of all files in memory
+    """
+    # blocks.apartments.area from float to int
+    areas = [apt['area'] for data in documents
+             for blk in data['blocks'] for apt in blk['apartments']]
+    if all(_ == int(_) for _ in areas):
+        _replace_all([_area_pair()])(documents)
+
+
+STEPS: List[Tuple[str, Callable[[str, str], None]]] = [
+    ('RootJsonFix', RootJsonFix.run),
+    ('NullFix', null_fix),
+    ('ExpandAddressAcronym', expand_address_acronym),
+    ('DateToDict', date_to_dict),
+    ('ComputeLease', ComputeLease.run),
+    ('AddGeo', AddGeo.run),
+    ('AddAmenity', AddAmenity.run),
+    ('ChangeTypes', change_types)
+]
+""" (name, step) of every cleanup step, in order """
+
+STAGES: List[Stage] = [
+    Stage('NullFix', (_LEASE,), (_LEASE,), _replace_all(_null_fix_pairs())),
+    Stage('ExpandAddressAcronym', ('blocks.street',), ('blocks.street',),
+          _replace_all(_acronym_pairs())),
+    Stage('DateToDict', _DATES, _DATES, _replace_all(_date_pairs())),
+    Stage('ComputeLease', _DATES + (_LEASE,), (_LEASE,), ComputeLease.compute_documents),
+    Stage('AddGeo', ('blocks.street', 'blocks.block_code.block_num'),
+          ('blocks.title', 'blocks.lat', 'blocks.long', 'blocks.postal'), AddGeo.add_geo),
+    Stage('AddAmenity', ('blocks.lat', 'blocks.long'), ('blocks.amenities',),
+          AddAmenity.add_amenities, (AddAmenity.POI_LOC,)),
+    Stage('ChangeTypes', (_AREA,), (_AREA,), _change_types_all)
+]
+""" The cleanup steps as stages that work in memory, in order.
+    RootJsonFix is not a stage, as it's done when the files are loaded. """
+
+
+def run(json_loc: str, log_loc: str, skip: Iterable[str] = ()) -> None:
+    """
+    Runs the cleanup steps in order. Steps that are logged as done are skipped.
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        log_loc (str): location of cleaning log
+        skip (Iterable[str]): Names of the steps not to run
+    """
+    skip = set(skip)
+    for name, step in STEPS:
+        if name in skip:
+            continue
+        step(json_loc, log_loc)
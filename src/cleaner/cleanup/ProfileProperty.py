@@ -0,0 +1,68 @@
+"""
+Profiles every property of the JSON files in a single pass.
+"""
+import time
+from typing import Any, Dict
+
+from storage.DatasetSource import open_source
+from storage.DocumentIO import DocumentIO
+from .objects.PropertyProfile import PropertyProfile
+
+
+def run(json_loc: str, report_loc: str) -> Dict[str, PropertyProfile]:
+    """
+    Reads every file once, and profiles all properties at the same time.
+    The machine-readable report is saved at `report_loc`.
+
+    Args:
+        json_loc (str): location of JSON folder, or of a container
+        report_loc (str): location of the profile report
+
+    Returns:
+        Dict[str, PropertyProfile]: Profiles keyed by the dot-delimited property name
+    """
+    curr_time = time.time()
+    profiles: Dict[str, PropertyProfile] = {}
+
+    # Iterate through all files
+    file_count = 0
+    for _, data in open_source(json_loc).iter_documents():
+        _profile_value(data, '', profiles)
+        file_count += 1
+
+    # Save the report
+    report = {'files': file_count,
+              'elapsed': time.time() - curr_time,
+              'properties': {name: profiles[name].to_dict()
+                             for name in sorted(profiles)}}
+    DocumentIO.dump(report_loc, report, DocumentIO.PRETTY)
+    return profiles
+
+
+def _profile_value(value: Any, prop_name: str, profiles: Dict[str, PropertyProfile]) -> None:
+    """
+    Recursively adds a value and its nested properties to the profiles
+
+    Args:
+        value (Any): The JSON value
+        prop_name (str): object-oriented, dot-delimited attribute of `value`
+        profiles (Dict[str, PropertyProfile]): Profiles to add to
+    """
+    # Lists are transparent, similar to ExamineProperty
+    # Note: This doesn't handle list in list. But we don't have that anyway.
+    if isinstance(value, list):
+        for _ in value:
+            _profile_value(_, prop_name, profiles)
+        return
+
+    # The root of the document is not a property
+    if prop_name:
+        profile = profiles.get(prop_name)
+        if not profile:
+            profile = profiles[prop_name] = PropertyProfile(prop_name)
+        profile.add(value)
+
+    if isinstance(value, dict):
+        prefix = prop_name + '.' if prop_name else ''
+        for key, sub_value in value.items():
+            _profile_value(sub_value, prefix + key, profiles)
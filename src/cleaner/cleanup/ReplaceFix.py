@@ -1,13 +1,9 @@
 """
 For a given property, finds matching values to replace with another value
 """
+from typing import Dict
 
-import json
-import os
-from os import path
-#import threading
-from typing import Dict, List
-
+from storage.DatasetSource import open_source
 from .objects.CleanupLog import CleanupLog
 from .objects.ReplacePair import ReplacePair
 
@@ -19,7 +15,7 @@ def run(json_loc: str, log_loc: str, replace_pair: ReplacePair) -> None:
     For a given property, finds matching values to replace with another value
 
     Args:
-        json_loc (str): Location of the JSON folder
+        json_loc (str): Location of the JSON folder, or of a container
         log_loc (str): location of cleaning log
         replace_pair (ReplacePair): Tuple to specify how and what to replace
     """
@@ -33,46 +29,22 @@ def run(json_loc: str, log_loc: str, replace_pair: ReplacePair) -> None:
     print('--------------------------------')
     print('[ReplaceFix] {}'.format(replace_pair.prop_arr))
 
-    #thread_list = []
-    for root, _, filenames in os.walk(json_loc):
-        if filenames:
-            _run_directory(root, filenames, replace_pair)
-    #        # Benchmarked: No visible benefits, if not slower
-    #        # PS 1: We run on directory, otherwise there's too many threads
-    #        # PS 2: Can't use multiprocessing, because ReplacePair contains
-    #        # a local lambda that is non-serialisable without using dill,
-    #        # which is a slower pickle
-    #        thr = threading.Thread(target=_run_directory, name=root,
-    #                               args=(root, filenames, replace_pair))
-    #        thr.start()
-    #        thread_list.append(thr)
-
-    # for thr in thread_list:
-    #    thr.join()
+    open_source(json_loc).transform(lambda data: (_clean_file(data, replace_pair), data))
     CleanupLog.log_done(process_name, log_loc)
 
 
-def _run_directory(root: str, filenames: List[str], replace_pair: ReplacePair) -> None:
+def apply(data: Dict, replace_pair: ReplacePair) -> bool:
     """
-    Runs on a single directory
+    Replaces the matching values of a single file, in memory
 
     Args:
-        filepath (str): The absolute filepath to run on
+        data (dict): Dictionary (aka JSON)
+        replace_pair (ReplacePair): Tuple to specify how and what to replace
+
+    Returns:
+        bool: Whether a change was made to `data`
     """
-    print('Running directory {}'.format(root))
-    for filename in filenames:
-        filepath = path.join(root, filename)
-
-        # Open the file
-        data: Dict
-        with open(filepath, 'r') as fstream:
-            data = json.load(fstream)
-            fstream.close()
-
-        if _clean_file(data, replace_pair):  # if modified
-            # Save the file
-            with open(filepath, 'w') as fstream:
-                json.dump(data, fstream, indent=4)
+    return _clean_file(data, replace_pair)
 
 
 def _clean_file(data: Dict, replace_pair: ReplacePair) -> bool:
@@ -2,11 +2,9 @@
 Fixes the fact that the root element is an array.
 Changes it to a JSON instead
 """
-import json
-import os
-from os import path
-from typing import Dict
+from typing import Any, Tuple
 
+from storage.DatasetSource import open_source
 from .objects.CleanupLog import CleanupLog
 
 _PROCESS_NAME = 'RootJsonFix'
@@ -17,7 +15,7 @@ def run(json_loc: str, log_loc: str) -> None:
     Changes root element from array to JSON
 
     Args:
-        json_loc (str): location of JSON folder
+        json_loc (str): location of JSON folder, or of a container
         log_loc (str): location of cleaning log
     """
     if CleanupLog.has_done(_PROCESS_NAME, log_loc):
@@ -27,23 +25,20 @@ def run(json_loc: str, log_loc: str) -> None:
     # Iterate through all files
     print('--------------------------------')
     print('[RootJsonFix]')
-    for root, _, filenames in os.walk(json_loc):
-        if filenames:
-            print('Running directory {}'.format(root))
+    open_source(json_loc).transform(fix_root)
+    CleanupLog.log_done(_PROCESS_NAME, log_loc)
 
-            for filename in filenames:
-                filepath = path.join(root, filename)
 
-                # Open the file
-                data: Dict
-                with open(filepath, 'r') as fstream:
-                    data = json.load(fstream)
-                    fstream.close()
+def fix_root(data: Any) -> Tuple[bool, Any]:
+    """
+    Wraps an array root in a JSON
 
-                if isinstance(data, list):
-                    # Resave the file
-                    root_data = {'blocks': data}
-                    with open(filepath, 'w') as fstream:
-                        json.dump(root_data, fstream, indent=4)
+    Args:
+        data (Any): The document
 
-    CleanupLog.log_done(_PROCESS_NAME, log_loc)
+    Returns:
+        Tuple[bool, Any]: Whether a change was made, and the document
+    """
+    if isinstance(data, list):
+        return True, {'blocks': data}
+    return False, data
@@ -0,0 +1,215 @@
+import threading
+from typing import ClassVar, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from dataset.SpatialIndex import SpatialIndex
+from ..objects.StreetName import StreetName
+from .Geocode import Geocode
+
+
+class Gazetteer(object):
+    """
+    Local index of the buildings that have been geocoded before, to resolve
+    addresses without going to the network. Buildings are indexed by postal code,
+    by (block, canonical street), and by the character n-grams of the street names.
+
+    An address is matched exactly on its canonical street first, so acronym variants
+    (BT BATOK WEST AVE 2 vs BUKIT BATOK WEST AVENUE 2) are the same. Otherwise the
+    known streets that share its n-grams are scored by Dice similarity, and the best
+    street with that block number is taken, if it's similar enough.
+    Only spelling may differ: streets of a different `StreetName.shape()`, i.e.
+    no. of words, directions, types or numbers, never match (e.g. AVENUE 2 vs
+    AVENUE 3, JURONG WEST vs JURONG EAST, LORONG 1 vs LORONG 1A, YISHUN ROAD vs
+    YISHUN RING ROAD).
+
+    Like a reverse geocode, `lookup_nearby()` finds the block among the buildings
+    around the known buildings of its street, with a spatial index that's rebuilt
+    once buildings are added. The block it finds is on another street (else `lookup()`
+    would have found it), so it's only an approximate location, for a last resort.
+
+    It's safe to share between threads.
+
+    Class Attributes:
+        _N (int): Length of the n-grams
+        _MIN_SIMILARITY (float): Min. Dice similarity of a fuzzy match
+        _RADIUS (float): Metres around a street to look for its block,
+                    as OneMap's reverse geocode
+
+    Attributes:
+        _by_postal (Dict[int, Geocode]): Building of each postal code
+        _by_address (Dict[Tuple[str, str], Geocode]): Building of each
+                    (block, canonical street)
+        _by_gram (Dict[str, Set[str]]): Canonical streets of each n-gram
+        _grams (Dict[str, Set[str]]): N-grams of each canonical street
+        _by_street (Dict[str, List[Geocode]]): Buildings of each canonical street
+        _entries (List[Tuple[str, Geocode]]): Block and building of each address
+        _index (Optional[SpatialIndex]): Index of `_entries`, or None if it's stale
+        _lock (threading.Lock): Guards the indexes
+    """
+    _N: ClassVar[int] = 3
+    _MIN_SIMILARITY: ClassVar[float] = 0.8
+    _RADIUS: ClassVar[float] = 500.0
+
+    _by_postal: Dict[int, Geocode]
+    _by_address: Dict[Tuple[str, str], Geocode]
+    _by_gram: Dict[str, Set[str]]
+    _grams: Dict[str, Set[str]]
+    _by_street: Dict[str, List[Geocode]]
+    _entries: List[Tuple[str, Geocode]]
+    _index: Optional[SpatialIndex]
+    _lock: threading.Lock
+
+    def __init__(self, entries: Iterable[Tuple[str, Geocode]] = ()) -> None:
+        """
+        Constructor
+
+        Args:
+            entries (Iterable[Tuple[str, Geocode]]): Address, and its geocode result
+        """
+        self._by_postal = {}
+        self._by_address = {}
+        self._by_gram = {}
+        self._grams = {}
+        self._by_street = {}
+        self._entries = []
+        self._index = None
+        self._lock = threading.Lock()
+        for address, geocode in entries:
+            self.add(address, geocode)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._by_address)
+
+    def add(self, address: str, geocode: Geocode) -> None:
+        """
+        Indexes a building
+
+        Args:
+            address (str): Block number + Street
+            geocode (Geocode): Its geocode result
+        """
+        parsed = self._parse(address)
+        if parsed is None:
+            return
+        block, street = parsed
+        with self._lock:
+            if (block, street) not in self._by_address:
+                self._by_street.setdefault(street, []).append(geocode)
+                self._entries.append((block, geocode))
+                self._index = None
+            self._by_address[(block, street)] = geocode
+            if geocode.postal:
+                self._by_postal[geocode.postal] = geocode
+            if street not in self._grams:
+                grams = self._ngrams(street)
+                self._grams[street] = grams
+                for gram in grams:
+                    self._by_gram.setdefault(gram, set()).add(street)
+
+    def lookup(self, address: str) -> Tuple[Optional[Geocode], bool]:
+        """
+        Finds the building of an address
+
+        Args:
+            address (str): Block number + Street
+
+        Returns:
+            Tuple[Optional[Geocode], bool]: The building, or None if it's not known,
+                        and whether it was a fuzzy match
+        """
+        parsed = self._parse(address)
+        if parsed is None:
+            return None, False
+        block, street = parsed
+        with self._lock:
+            geocode = self._by_address.get((block, street))
+            if geocode is not None:
+                return geocode, False
+
+            match = self._match_street(block, street)
+            if match is None:
+                return None, False
+            return self._by_address[(block, match)], True
+
+    def lookup_nearby(self, address: str) -> Optional[Geocode]:
+        """
+        Finds a building with the block number of an address, nearest to
+        the centre of the known buildings on its street. It's on another street,
+        so its location is only approximate.
+
+        Args:
+            address (str): Block number + Street
+
+        Returns:
+            Optional[Geocode]: The building, or None if there is none within `_RADIUS`
+        """
+        parsed = self._parse(address)
+        if parsed is None:
+            return None
+        block, street = parsed
+        with self._lock:
+            on_street = self._by_street.get(street)
+            if not on_street:
+                return None
+            if self._index is None:
+                self._index = SpatialIndex(
+                    np.array([geocode.lat for _, geocode in self._entries]),
+                    np.array([geocode.long for _, geocode in self._entries]))
+            lat = sum(_.lat for _ in on_street) / len(on_street)
+            lng = sum(_.long for _ in on_street) / len(on_street)
+            for pos, _ in self._index.within(lat, lng, self._RADIUS):
+                if self._entries[pos][0] == block:
+                    return self._entries[pos][1]
+        return None
+
+    def lookup_postal(self, postal: int) -> Optional[Geocode]:
+        """
+        Args:
+            postal (int): Postal code
+
+        Returns:
+            Optional[Geocode]: The building of the postal code, or None if it's not known
+        """
+        with self._lock:
+            return self._by_postal.get(postal)
+
+    def _match_street(self, block: str, street: str) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The known street most similar to `street` that has
+                        the block, or None if none is similar enough
+        """
+        grams = self._ngrams(street)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._by_gram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        shape = StreetName.shape(street)
+        best: Optional[str] = None
+        best_score = self._MIN_SIMILARITY
+        for candidate, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(self._grams[candidate]))
+            if score >= best_score and (block, candidate) in self._by_address and \
+                    StreetName.shape(candidate) == shape:
+                best, best_score = candidate, score
+        return best
+
+    @classmethod
+    def _ngrams(cls, street: str) -> Set[str]:
+        padded = ' {} '.format(street)
+        return {padded[i:i + cls._N] for i in range(len(padded) - cls._N + 1)}
+
+    @staticmethod
+    def _parse(address: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns:
+            Optional[Tuple[str, str]]: Block number, and canonical street
+        """
+        split_addr = address.upper().split(' ', 1)
+        if len(split_addr) < 2:
+            return None
+        return split_addr[0], StreetName.canonical(split_addr[1])
+
@@ -0,0 +1,223 @@
+from os import path
+import pickle
+import sqlite3
+from sqlite3 import Connection
+import threading
+import time
+from typing import ClassVar, Dict, Iterator, Optional, Tuple
+
+from .Geocode import Geocode
+
+
+class GeocodeCache(object):
+    """
+    Persistent cache of geocode results, stored in SQLite and keyed by address.
+    Each lookup and each new result is a single indexed query, so the cost doesn't grow
+    with the size of the cache.
+
+    Addresses that are not found are cached too, until their `retry_after`.
+    Results that are found expire after `ttl`, if it's given.
+
+    The database is in WAL mode, so several processes can read it while one writes.
+    Each thread gets its own connection.
+
+    Class Attributes:
+        ONEMAP (str): Service of results from OneMap
+        SDIRECTORY (str): Service of results from Street Directory
+        GAZETTEER (str): Service of results from the local gazetteer of earlier results
+        BASIC (str): Method of results from geocoding the address
+        NO_ALPHA (str): Method of results from geocoding the address without block alphabets
+        REVERSE (str): Method of results from reverse geocoding around the street
+        FUZZY (str): Method of results from a similar street name in the gazetteer
+        APPROXIMATE (str): Method of results from a block of the same number near the street,
+                    in the gazetteer, once the services have missed. Not trusted as
+                    the building of the address, so not in `iter_found()`.
+        _BUSY_TIMEOUT (float): Secs to wait for another process's write to finish
+        _SCHEMA (str): Schema of the cache
+
+    Attributes:
+        cache_loc (str): Location of the SQLite database
+        ttl (Optional[float]): Secs before a result that's found expires. None to never expire.
+        retry_after (float): Secs before an address that's not found is looked up again
+        _local (threading.local): Connection of each thread
+    """
+    ONEMAP: ClassVar[str] = 'onemap'
+    SDIRECTORY: ClassVar[str] = 'sdirectory'
+    GAZETTEER: ClassVar[str] = 'gazetteer'
+    BASIC: ClassVar[str] = 'basic'
+    NO_ALPHA: ClassVar[str] = 'no_alpha'
+    REVERSE: ClassVar[str] = 'reverse'
+    FUZZY: ClassVar[str] = 'fuzzy'
+    APPROXIMATE: ClassVar[str] = 'approximate'
+    _BUSY_TIMEOUT: ClassVar[float] = 30.0
+    _SCHEMA: ClassVar[str] = '''
+        CREATE TABLE IF NOT EXISTS Geocode (
+            address TEXT NOT NULL,
+            found BOOLEAN NOT NULL,
+            title TEXT,
+            lat FLOAT,
+            long FLOAT,
+            postal INT,
+            service TEXT,
+            method TEXT,
+            created FLOAT NOT NULL,
+            expires FLOAT,
+            PRIMARY KEY(address)
+        ) WITHOUT ROWID;
+    '''
+
+    cache_loc: str
+    ttl: Optional[float]
+    retry_after: float
+    _local: threading.local
+
+    def __init__(self, cache_loc: str, ttl: Optional[float] = None,
+                 retry_after: float = 7 * 24 * 3600.0,
+                 pickle_loc: Optional[str] = None) -> None:
+        """
+        Constructor. The database is created if it doesn't exist.
+
+        Args:
+            cache_loc (str): Location of the SQLite database
+            ttl (Optional[float]): Secs before a result that's found expires.
+                        None to never expire.
+            retry_after (float): Secs before an address that's not found is looked up again
+            pickle_loc (Optional[str]): Location of the former pickled cache,
+                        which is migrated when the database is created
+        """
+        self.cache_loc = cache_loc
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._local = threading.local()
+
+        is_new = not path.exists(cache_loc)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(self._SCHEMA)
+        if is_new and pickle_loc and path.exists(pickle_loc):
+            self.migrate(pickle_loc)
+
+    def get(self, address: str) -> Tuple[bool, Optional[Geocode]]:
+        """
+        Looks up an address. Entries past their expiry are misses.
+
+        Args:
+            address (str): Human readable address
+
+        Returns:
+            Tuple[bool, Optional[Geocode]]: Whether it's cached, and its result,
+                        which is None if it was not found
+        """
+        row = self._connect().execute(
+            'SELECT found, title, lat, long, postal, expires FROM Geocode WHERE address = ?',
+            (address,)).fetchone()
+        if row is None:
+            return False, None
+        found, title, lat, lng, postal, expires = row
+        if expires is not None and expires <= time.time():
+            return False, None
+        return True, Geocode(title, lat, lng, postal) if found else None
+
+    def was_missing(self, address: str) -> bool:
+        """
+        Args:
+            address (str): Human readable address
+
+        Returns:
+            bool: Whether the address was not found when it was last looked up,
+                        even if that has expired
+        """
+        row = self._connect().execute(
+            'SELECT found FROM Geocode WHERE address = ?', (address,)).fetchone()
+        return row is not None and not row[0]
+
+    def put(self, address: str, geocode: Geocode, service: Optional[str],
+            method: Optional[str]) -> None:
+        """
+        Caches the result of an address, replacing any earlier entry
+
+        Args:
+            address (str): Human readable address
+            geocode (Geocode): Geocode result
+            service (Optional[str]): ONEMAP, SDIRECTORY or GAZETTEER
+            method (Optional[str]): BASIC, NO_ALPHA, REVERSE, FUZZY or APPROXIMATE
+        """
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        self._upsert((address, True, geocode.title, geocode.lat, geocode.long,
+                      geocode.postal, service, method, now, expires))
+
+    def put_missing(self, address: str) -> None:
+        """
+        Caches an address that was not found, until `retry_after`
+
+        Args:
+            address (str): Human readable address
+        """
+        now = time.time()
+        self._upsert((address, False, None, None, None, None, None, None,
+                      now, now + self.retry_after))
+
+    def iter_found(self) -> Iterator[Tuple[str, Geocode]]:
+        """
+        Returns:
+            Iterator[Tuple[str, Geocode]]: Each address that was found and hasn't expired,
+                        with its result. Approximate results are left out.
+        """
+        cursor = self._connect().execute(
+            'SELECT address, title, lat, long, postal FROM Geocode '
+            'WHERE found AND (expires IS NULL OR expires > ?) '
+            'AND (method IS NULL OR method != ?)', (time.time(), self.APPROXIMATE))
+        for address, title, lat, lng, postal in cursor:
+            yield address, Geocode(title, lat, lng, postal)
+
+    def migrate(self, pickle_loc: str) -> int:
+        """
+        Copies the entries of the former pickled cache, which has no provenance.
+        Entries that are already cached are kept.
+
+        Args:
+            pickle_loc (str): Location of the pickled dictionary of address to Geocode
+
+        Returns:
+            int: No. of entries copied
+        """
+        with open(pickle_loc, 'rb') as fstream:
+            geocache: Dict[str, Optional[Geocode]] = pickle.load(fstream)
+
+        now = time.time()
+        expires = now + self.ttl if self.ttl is not None else None
+        conn = self._connect()
+        with conn:
+            cursor = conn.executemany(
+                'INSERT OR IGNORE INTO Geocode VALUES (?,?,?,?,?,?,?,?,?,?)',
+                ((address, True, _.title, _.lat, _.long, _.postal, None, None, now, expires)
+                 for address, _ in geocache.items() if _ is not None))
+        print('Migrated {} geocodes from {}'.format(cursor.rowcount, pickle_loc))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """
+        Closes the connection of this thread
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _upsert(self, row: Tuple) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO Geocode VALUES (?,?,?,?,?,?,?,?,?,?)', row)
+
+    def _connect(self) -> Connection:
+        """
+        Returns:
+            Connection: The connection of this thread, opened on first use
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_loc, timeout=self._BUSY_TIMEOUT)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
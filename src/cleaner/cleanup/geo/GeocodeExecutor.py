@@ -0,0 +1,285 @@
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from typing import Callable, Collection, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .AddressNotFoundException import AddressNotFoundException
+from .Gazetteer import Gazetteer
+from .Geocode import Geocode
+from .GeocodeCache import GeocodeCache
+from .IGeoservice import IGeoservice
+from .RateLimiter import RateLimiter
+from .onemap.OneMap import OneMap
+
+_Found = Tuple[Optional[Geocode], Optional[str]]  # (result, service)
+_Resolved = Tuple[Optional[Geocode], Optional[str], Optional[str]]  # (result, service, method)
+
+
+class GeocodeExecutor(object):
+    """
+    Geocodes many addresses at the same time, each through the order of query
+    in `Geocoding`. Every worker thread has its own OneMap client.
+    Street Directory is shared, e.g. as a pool of browsers that is kept across runs.
+
+    Calls to each service are spaced out by its rate limiter. Basic geocodes are
+    shared across workers, so an address (or a no-alpha variant, e.g. of 12A and 12B)
+    is only queried once even if several workers need it.
+
+    Basic geocodes are hedged: if OneMap hasn't answered after `hedge_delay`,
+    Street Directory is queried in parallel. Addresses that have missed before, and
+    addresses on streets that OneMap has missed, are hedged straight away.
+    A OneMap result is still preferred, unless Street Directory answers first with
+    an acceptable result (the right postal code, or an HDB building).
+    The losing query is cancelled if it hasn't gone out yet, otherwise its result is dropped.
+
+    Reverse geocodes look for the block around its street with each service.
+    Only if they both miss, a block of the same number near the street in the
+    gazetteer is taken, as an approximate result.
+
+    Attributes:
+        workers (int): Max no. of addresses in flight
+        hedge_delay (Optional[float]): Secs to wait for OneMap before also querying
+                    Street Directory. None to query them in sequence.
+        _pool (ThreadPoolExecutor): Worker threads
+        _hedges (ThreadPoolExecutor): Threads of the queries to each service,
+                    two per worker at most
+        _limiters (Dict[str, RateLimiter]): Rate limiter of each service
+        _local (threading.local): OneMap client of each worker
+        _sdir (IGeoservice): Street Directory client, safe to share between threads
+        _gazetteer (Optional[Gazetteer]): Earlier results, for approximate results
+        _found (Dict[str, Future]): Basic geocode of each address queried
+        _missed (Set[str]): Addresses, and streets, that OneMap has missed
+        _found_lock (threading.Lock): Guards `_found` and `_missed`
+    """
+    workers: int
+    hedge_delay: Optional[float]
+    _pool: ThreadPoolExecutor
+    _hedges: ThreadPoolExecutor
+    _limiters: Dict[str, RateLimiter]
+    _local: threading.local
+    _sdir: IGeoservice
+    _gazetteer: Optional[Gazetteer]
+    _found: Dict[str, Future]
+    _missed: Set[str]
+    _found_lock: threading.Lock
+
+    def __init__(self, workers: int, throttle: float, sdir: IGeoservice,
+                 hedge_delay: Optional[float] = None, missed: Collection[str] = (),
+                 gazetteer: Optional[Gazetteer] = None) -> None:
+        """
+        Constructor
+
+        Args:
+            workers (int): Max no. of addresses in flight
+            throttle (float): Min. secs between the start of two calls to the same service
+            sdir (IGeoservice): Street Directory client, safe to share between threads.
+                        It's not closed by `close()`.
+            hedge_delay (Optional[float]): Secs to wait for OneMap before also querying
+                        Street Directory. None to query them in sequence.
+            missed (Collection[str]): Addresses that have missed before, which are hedged
+                        straight away
+            gazetteer (Optional[Gazetteer]): Earlier results, for approximate results
+        """
+        self.workers = workers
+        self.hedge_delay = hedge_delay
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='geocode')
+        self._hedges = ThreadPoolExecutor(max_workers=2 * workers, thread_name_prefix='hedge')
+        self._limiters = {GeocodeCache.ONEMAP: RateLimiter(throttle),
+                          GeocodeCache.SDIRECTORY: RateLimiter(throttle)}
+        self._local = threading.local()
+        self._sdir = sdir
+        self._gazetteer = gazetteer
+        self._found = {}
+        self._missed = set(missed)
+        self._found_lock = threading.Lock()
+
+    def map(self, addresses: Iterable[str]) -> Iterator[_Resolved]:
+        """
+        Geocodes the addresses concurrently
+
+        Args:
+            addresses (Iterable[str]): Human readable addresses
+
+        Returns:
+            Iterator[Tuple[Optional[Geocode], Optional[str], Optional[str]]]:
+                        (result, service, method) of each address, in the same order.
+                        The result is None if the address was not found.
+        """
+        return self._pool.map(self._resolve, addresses)
+
+    def close(self) -> None:
+        """
+        Stops the workers
+        """
+        self._pool.shutdown()
+        self._hedges.shutdown()
+
+    def __enter__(self) -> 'GeocodeExecutor':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _resolve(self, address: str) -> _Resolved:
+        """
+        Geocodes an address in the order of query
+        """
+        # Geocode Block number + Street
+        result, service = self._basic_geocode(address)
+        if result:
+            return result, service, GeocodeCache.BASIC
+
+        # Geocode Block number without alphabets + Street
+        no_alpha_addr = self._no_alpha(address)
+        if no_alpha_addr is not None:
+            result, service = self._basic_geocode(no_alpha_addr)
+            if result:
+                return result, service, GeocodeCache.NO_ALPHA
+
+        # Geocode Street + Reverse Geocode + filter block number
+        try:
+            result, service = self._geocode_reverse(address)
+        except AddressNotFoundException:
+            pass
+        else:
+            return result, service, GeocodeCache.REVERSE
+
+        # Last resort: a known block of the same number near the street
+        result = self._gazetteer.lookup_nearby(address) if self._gazetteer else None
+        if result is None:
+            return None, None, None
+        print('[Warning] {} is approximated by a nearby block'.format(address))
+        return result, GeocodeCache.GAZETTEER, GeocodeCache.APPROXIMATE
+
+    def _basic_geocode(self, address: str) -> _Found:
+        """
+        Geocodes an address with each service, once across all workers
+        """
+        with self._found_lock:
+            future = self._found.get(address)
+            is_owner = future is None
+            if is_owner:
+                future = self._found[address] = Future()
+        if not is_owner:
+            return future.result()
+
+        try:
+            found = self._hedged_geocode(address)
+        except BaseException as expt:
+            future.set_exception(expt)
+            raise
+        future.set_result(found)
+        return found
+
+    def _hedged_geocode(self, address: str) -> _Found:
+        """
+        Geocodes an address with OneMap, and with Street Directory once OneMap is
+        late or has missed. Returns the first acceptable result.
+        """
+        street = address.split(' ', 1)[1]
+        with self._found_lock:
+            is_missed = address in self._missed or street in self._missed
+        delay = 0.0 if is_missed and self.hedge_delay is not None else self.hedge_delay
+
+        cancelled = threading.Event()
+        onemap = self._hedges.submit(self._query, GeocodeCache.ONEMAP, address, cancelled)
+        sdir: Optional[Future] = None
+        try:
+            futures.wait([onemap], timeout=delay)
+            if onemap.done():
+                result = onemap.result()
+                if result:
+                    return result, GeocodeCache.ONEMAP
+                with self._found_lock:
+                    self._missed.add(street)
+
+            sdir = self._hedges.submit(self._query, GeocodeCache.SDIRECTORY, address, cancelled)
+            pending = {onemap, sdir}
+            while pending:
+                done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                if onemap in done:
+                    result = onemap.result()
+                    if result:
+                        return result, GeocodeCache.ONEMAP
+                    with self._found_lock:
+                        self._missed.add(street)
+                if sdir in done and sdir.result() and \
+                        (onemap.done() or self._is_acceptable(address, sdir.result())):
+                    return sdir.result(), GeocodeCache.SDIRECTORY
+            result = sdir.result()
+            return result, GeocodeCache.SDIRECTORY if result else None
+        finally:
+            cancelled.set()
+            onemap.cancel()
+            if sdir is not None:
+                sdir.cancel()
+
+    def _query(self, service: str, address: str,
+               cancelled: threading.Event) -> Optional[Geocode]:
+        """
+        Geocodes an address with a service, once its rate limiter allows,
+        unless the query was cancelled while waiting
+        """
+        self._limiters[service].wait()
+        if cancelled.is_set():
+            return None
+        if service == GeocodeCache.ONEMAP:
+            return self._onemap().geocode(address)
+        return self._sdir.geocode(address)
+
+    def _geocode_reverse(self, address: str) -> Tuple[Geocode, str]:
+        # Gets the street and block number as separate elements
+        split_addr = address.split(' ', 1)
+        block, street = (split_addr[0], split_addr[1])
+
+        service = GeocodeCache.ONEMAP
+        result = self._call(service, self._onemap().geocode_reverse, block, street)
+        if not result:
+            service = GeocodeCache.SDIRECTORY
+            result = self._call(service, self._sdir.geocode_reverse, block, street)
+            if not result:
+                raise AddressNotFoundException(address)
+        print('[Warning] {} is via geocode_reverse()'.format(address))
+        return result, service
+
+    def _call(self, service: str, func: Callable, *args: str) -> Optional[Geocode]:
+        """
+        Calls a service, once its rate limiter allows
+        """
+        self._limiters[service].wait()
+        return func(*args)
+
+    def _onemap(self) -> OneMap:
+        """
+        Returns:
+            OneMap: The OneMap client of this worker
+        """
+        onemap = getattr(self._local, 'onemap', None)
+        if onemap is None:
+            onemap = self._local.onemap = OneMap()
+        return onemap
+
+    @staticmethod
+    def _is_acceptable(address: str, geocode: Geocode) -> bool:
+        """
+        Returns:
+            bool: Whether a Street Directory result can be taken before OneMap answers,
+                        i.e. its postal code ends with the block number, or it's an HDB building
+        """
+        block = address.split(' ', 1)[0]
+        if block[-1].isalpha():
+            block = block[:-1]
+        return '{:06d}'.format(geocode.postal)[-3:] == block or 'HDB' in geocode.title
+
+    @staticmethod
+    def _no_alpha(address: str) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The simplified address with no block alphabets,
+                        or None if the block has none
+        """
+        split_addr = address.split(' ', 1)
+        block, street = (split_addr[0], split_addr[1])
+        if block[-1].isalpha():
+            return ' '.join((block[:-1], street))
+        return None
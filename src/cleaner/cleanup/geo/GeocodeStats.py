@@ -0,0 +1,39 @@
+import threading
+from typing import ClassVar, Dict
+
+
+class GeocodeStats(object):
+    """
+    Process-wide counters of how addresses were geocoded, e.g. `cache`, `missing`,
+    or `<service>_<method>` such as `onemap_basic` and `gazetteer_fuzzy`.
+    Safe to update from the geocoding threads.
+
+    Class Attributes:
+        _lock (threading.Lock): Guards the counters
+        _counters (Dict[str, int]): Count of each outcome, and `lookups` in total
+    """
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _counters: ClassVar[Dict[str, int]] = {'lookups': 0}
+
+    @classmethod
+    def add(cls, outcome: str, count: int = 1) -> None:
+        """
+        Counts distinct addresses looked up
+
+        Args:
+            outcome (str): How they were geocoded
+            count (int): No. of addresses
+        """
+        with cls._lock:
+            cls._counters['lookups'] += count
+            cls._counters[outcome] = cls._counters.get(outcome, 0) + count
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: A copy of the counters. Subtract two snapshots for
+                        the lookups done in between.
+        """
+        with cls._lock:
+            return dict(cls._counters)
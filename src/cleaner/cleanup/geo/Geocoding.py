@@ -1,12 +1,17 @@
+import atexit
 from os import path
-import pickle
-from typing import ClassVar, Dict, List, Optional
+import threading
+from typing import ClassVar, Dict, Iterable, List, Optional
 
 import ProjUtils
 from .AddressNotFoundException import AddressNotFoundException
+from .Gazetteer import Gazetteer
 from .Geocode import Geocode
-from .onemap.OneMap import OneMap
-from .sd.SDirectory import SDirectory
+from .GeocodeCache import GeocodeCache
+from .GeocodeExecutor import GeocodeExecutor
+from .GeocodeStats import GeocodeStats
+from .IGeoservice import IGeoservice
+from .sd.SDirectoryPool import SDirectoryPool
 
 
 class Geocoding(object):
@@ -18,97 +23,227 @@ class Geocoding(object):
         Street Directory
 
     Order of query:
+        Local gazetteer of earlier results, by canonical or similar street name
         Geocode Block number + Street
         Geocode Block number without alphabets + Street
         Geocode Street + Reverse Geocode + filter block number
         Geocode Street
     """
-    _GEOCACHE_LOC: ClassVar[str] = 'Geocoding.cache'
-    _THROTTLE: float = 0.05
-    # Throttle in seconds
-    _geocache: ClassVar[Dict] = {}
+    _CACHE_LOC: ClassVar[str] = 'Geocoding.sqlite'
+    _PICKLE_LOC: ClassVar[str] = 'Geocoding.cache'
+    # Former cache, migrated into _CACHE_LOC
+    _throttle: ClassVar[float] = 0.05
+    # Throttle in seconds, per service
+    _workers: ClassVar[int] = 8
+    # Max no. of addresses in flight
+    _browsers: ClassVar[int] = 2
+    # Max no. of Street Directory browsers
+    _hedge_delay: ClassVar[Optional[float]] = 1.0
+    # Secs to wait for OneMap before also querying Street Directory
+    _sdir: ClassVar[Optional[IGeoservice]] = None
+    # Street Directory client, safe to share between threads. A pool of browsers by default.
+    _cache: ClassVar[Optional[GeocodeCache]] = None
+    _gazetteer: ClassVar[Optional[Gazetteer]] = None
+    _cache_lock: ClassVar[threading.Lock] = threading.Lock()
+    _is_closed_at_exit: ClassVar[bool] = False
 
     @classmethod
     def geocode(cls, *addresses: str) -> List[Geocode]:
         """
-        Obtains the lat and long of an address
+        Obtains the lat and long of an address.
+        Addresses that were not found are not looked up again until their retry time.
 
         Args:
             addresses (str): Human readable addresses
 
         Returns:
             List[Geocode]: Geocode results
-        """
-        onemap = OneMap()
-        sdir = SDirectory()
-        cls._load_cache()
 
-        results = []
+        Raises:
+            AddressNotFoundException: If an address is not found
+        """
+        results = cls.geocode_all(addresses)
+        geocodes = []
         for address in addresses:
-            if address not in cls._geocache:
-                result = cls._basic_geocode(address, onemap, sdir)
-                if not result:
-                    result = cls._no_alpha_geocode(address, onemap, sdir)
-                    if not result:
-                        result = cls._geocode_reverse(address, onemap, sdir)
-                cls._geocache[address] = result
-            results.append(cls._geocache[address])
-
-        cls._save_cache()
-        sdir.close()
+            result = results[cls.normalize(address)]
+            if result is None:
+                raise AddressNotFoundException(address)
+            geocodes.append(result)
+        return geocodes
+
+    @classmethod
+    def geocode_all(cls, addresses: Iterable[str]) -> Dict[str, Optional[Geocode]]:
+        """
+        Geocodes each distinct address once. Addresses that are not cached are
+        looked up in the gazetteer, and the rest are geocoded concurrently,
+        each through the order of query.
+
+        Args:
+            addresses (Iterable[str]): Human readable addresses, which may repeat
+
+        Returns:
+            Dict[str, Optional[Geocode]]: Geocode result of each normalized address,
+                        or None if it was not found
+        """
+        cache = cls._get_cache()
+        results: Dict[str, Optional[Geocode]] = {}
+        to_lookup: List[str] = []
+        for address in dict.fromkeys(cls.normalize(_) for _ in addresses):
+            is_cached, results[address] = cache.get(address)
+            if not is_cached:
+                to_lookup.append(address)
+            elif results[address] is None:
+                GeocodeStats.add('cache_missing')
+            else:
+                GeocodeStats.add('cache')
+        if not to_lookup:
+            return results
+
+        gazetteer = cls._get_gazetteer()
+        to_query: List[str] = []
+        for address in to_lookup:
+            result, is_fuzzy = gazetteer.lookup(address)
+            if result is None:
+                to_query.append(address)
+                continue
+            method = GeocodeCache.FUZZY if is_fuzzy else GeocodeCache.BASIC
+            cache.put(address, result, GeocodeCache.GAZETTEER, method)
+            GeocodeStats.add('{}_{}'.format(GeocodeCache.GAZETTEER, method))
+            results[address] = result
+        if not to_query:
+            return results
+
+        missed = {_ for _ in to_query if cache.was_missing(_)}
+        with GeocodeExecutor(cls._workers, cls._throttle, cls._get_sdir(),
+                             cls._hedge_delay, missed, gazetteer) as executor:
+            for address, (result, service, method) in zip(to_query, executor.map(to_query)):
+                if result is None:
+                    cache.put_missing(address)
+                    GeocodeStats.add('missing')
+                else:
+                    cache.put(address, result, service, method)
+                    if method != GeocodeCache.APPROXIMATE:
+                        gazetteer.add(address, result)
+                    GeocodeStats.add('{}_{}'.format(service, method))
+                results[address] = result
         return results
 
     @classmethod
-    def _load_cache(cls) -> None:
+    def set_concurrency(cls, workers: int, throttle: Optional[float] = None,
+                        browsers: Optional[int] = None) -> None:
         """
-        Loads geocache from file into class variable
+        Sets how many addresses are geocoded at the same time
+
+        Args:
+            workers (int): Max no. of addresses in flight
+            throttle (Optional[float]): Min. secs between the start of two calls
+                        to the same service
+            browsers (Optional[int]): Max no. of Street Directory browsers.
+                        Takes effect once the current ones are closed.
         """
-        geocache_loc = path.join(
-            ProjUtils.get_curr_folder_path(), cls._GEOCACHE_LOC)
-        if path.exists(geocache_loc):
-            with open(geocache_loc, 'rb') as fstream:
-                cls._geocache = pickle.load(fstream)
-        else:
-            cls._geocache = {}
+        if workers < 1:
+            raise ValueError('No. of workers must be at least 1')
+        cls._workers = workers
+        if throttle is not None:
+            cls._throttle = throttle
+        if browsers is not None:
+            cls._browsers = browsers
 
     @classmethod
-    def _save_cache(cls) -> None:
+    def set_hedge_delay(cls, delay: Optional[float]) -> None:
         """
-        Saves geocache to file
+        Sets how long to wait for OneMap before also querying Street Directory.
+        Addresses that have missed before are hedged straight away.
+
+        Args:
+            delay (Optional[float]): Delay in secs. None to query the services in sequence.
         """
-        geocache_loc = path.join(
-            ProjUtils.get_curr_folder_path(), cls._GEOCACHE_LOC)
-        with open(geocache_loc, 'wb') as fstream:
-            pickle.dump(cls._geocache, fstream)
+        if delay is not None and delay < 0:
+            raise ValueError('Hedge delay must not be negative')
+        cls._hedge_delay = delay
 
     @classmethod
-    def _basic_geocode(cls, address: str, onemap: OneMap, sdir: SDirectory) -> Optional[Geocode]:
-        result = onemap.geocode(address)
-        if not result:
-            result = sdir.geocode(address)
-        return result
+    def set_cache(cls, cache: Optional[GeocodeCache]) -> None:
+        """
+        Sets the cache of results, e.g. a separate one for benchmarks.
+        The gazetteer is rebuilt from it on next use.
+
+        Args:
+            cache (Optional[GeocodeCache]): The cache. None for the default one,
+                        which is opened on next use.
+        """
+        with cls._cache_lock:
+            cls._cache = cache
+            cls._gazetteer = None
 
     @classmethod
-    def _no_alpha_geocode(cls, address: str, onemap: OneMap, sdir: SDirectory) -> Optional[Geocode]:
-        # Gets the simplified address with no block alphabets
-        split_addr = address.split(' ', 1)
-        block, street = (split_addr[0], split_addr[1])
-        if block[-1].isalpha():
-            no_alpha_addr = ' '.join((block[:-1], street))
-        else:
-            return None
-        return cls._basic_geocode(no_alpha_addr, onemap, sdir)
+    def set_sdirectory(cls, sdir: Optional[IGeoservice]) -> None:
+        """
+        Sets the Street Directory client, e.g. a stand-in for benchmarks.
+        The current one is closed.
+
+        Args:
+            sdir (Optional[IGeoservice]): Client, safe to share between threads.
+                        None for the default pool of browsers, which is created on next use.
+        """
+        cls.close()
+        with cls._cache_lock:
+            cls._sdir = sdir
 
     @classmethod
-    def _geocode_reverse(cls, address: str, onemap: OneMap, sdir: SDirectory) -> Optional[Geocode]:
-        # Gets the street and block number as separate elements
-        split_addr = address.split(' ', 1)
-        block, street = (split_addr[0], split_addr[1])
-
-        result = onemap.geocode_reverse(block, street)
-        if not result:
-            result = sdir.geocode_reverse(block, street)
-            if not result:
-                raise AddressNotFoundException(address)
-        print('[Warning] {} is via geocode_reverse()'.format(address))
-        return result
+    def close(cls) -> None:
+        """
+        Closes the Street Directory client, e.g. its browsers. Also done when the program exits.
+        """
+        with cls._cache_lock:
+            if cls._sdir is not None:
+                cls._sdir.close()
+                cls._sdir = None
+
+    @staticmethod
+    def normalize(address: str) -> str:
+        """
+        Returns:
+            str: The address in upper case, with single spaces
+        """
+        return ' '.join(address.upper().split())
+
+    @classmethod
+    def _get_sdir(cls) -> IGeoservice:
+        """
+        Returns:
+            IGeoservice: The Street Directory client, kept across calls. By default,
+                        a pool of browsers that are only started when it's queried.
+        """
+        with cls._cache_lock:
+            if not cls._is_closed_at_exit:
+                atexit.register(cls.close)
+                cls._is_closed_at_exit = True
+            if cls._sdir is None:
+                cls._sdir = SDirectoryPool(cls._browsers)
+        return cls._sdir
+
+    @classmethod
+    def _get_gazetteer(cls) -> Gazetteer:
+        """
+        Returns:
+            Gazetteer: The gazetteer of every result in the cache, built on first use
+        """
+        cache = cls._get_cache()
+        with cls._cache_lock:
+            if cls._gazetteer is None:
+                cls._gazetteer = Gazetteer(cache.iter_found())
+        return cls._gazetteer
+
+    @classmethod
+    def _get_cache(cls) -> GeocodeCache:
+        """
+        Returns:
+            GeocodeCache: The cache, opened on first use
+        """
+        with cls._cache_lock:
+            if cls._cache is None:
+                folder = ProjUtils.get_curr_folder_path()
+                cls._cache = GeocodeCache(path.join(folder, cls._CACHE_LOC),
+                                          pickle_loc=path.join(folder, cls._PICKLE_LOC))
+        return cls._cache
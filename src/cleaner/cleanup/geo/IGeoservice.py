@@ -16,3 +16,9 @@ class IGeoservice(object, metaclass=abc.ABCMeta):
     @abc.abstractmethod
     def geocode_reverse(self, block: str, street: str) -> Optional[Geocode]:
         pass
+
+    def close(self) -> None:
+        """
+        Releases the connection, if any
+        """
+        pass
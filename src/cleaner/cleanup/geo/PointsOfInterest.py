@@ -0,0 +1,132 @@
+import csv
+import json
+from typing import ClassVar, Dict, List, Tuple
+
+import numpy as np
+
+from dataset.SpatialIndex import SpatialIndex
+
+
+class PointsOfInterest(object):
+    """
+    Points of interest, e.g. MRT stations, schools and hawker centres,
+    with a spatial index of each category.
+
+    Loaded from either:
+        * CSV, with a header of name, category, lat and long
+        * GeoJSON, of Point features with name and category properties
+
+    Attributes:
+        names (List[str]): Name of each point
+        categories (List[str]): Categories, sorted
+        _indices (Dict[str, SpatialIndex]): Index of the points of each category,
+                    identified by their position in `names`
+    """
+    _CSV_COLUMNS: ClassVar[Tuple[str, ...]] = ('name', 'category', 'lat', 'long')
+    # Columns of a CSV file, in the order read
+
+    names: List[str]
+    categories: List[str]
+    _indices: Dict[str, SpatialIndex]
+
+    def __init__(self, names: List[str], categories: List[str],
+                 lat: np.ndarray, lng: np.ndarray) -> None:
+        """
+        Indexes the points
+
+        Args:
+            names (List[str]): Name of each point
+            categories (List[str]): Category of each point
+            lat (np.ndarray): Latitude of each point
+            lng (np.ndarray): Longitude of each point
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        by_category: Dict[str, List[int]] = {}
+        for i, category in enumerate(categories):
+            by_category.setdefault(category, []).append(i)
+
+        self.names = list(names)
+        self.categories = sorted(by_category)
+        self._indices = {}
+        for category in self.categories:
+            pos = np.array(by_category[category], dtype=np.int64)
+            self._indices[category] = SpatialIndex(lat[pos], lng[pos], pos)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def nearest_many(self, category: str, lat: np.ndarray, lng: np.ndarray,
+                     k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the points of a category nearest to each of many locations.
+        See `SpatialIndex.nearest_many()`.
+
+        Args:
+            category (str): Category of the points
+            lat (np.ndarray): Latitude of each location
+            lng (np.ndarray): Longitude of each location
+            k (int): No. of points per location
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions in `names`, and distances in metres,
+                        of shape (no. of locations, k), nearest first.
+                        Padded with -1 and inf.
+        """
+        return self._indices[category].nearest_many(lat, lng, k)
+
+    @classmethod
+    def load(cls, poi_loc: str) -> 'PointsOfInterest':
+        """
+        Loads the points from a file. GeoJSON if it ends with .geojson or .json,
+        else CSV.
+
+        Args:
+            poi_loc (str): Location of the file
+
+        Returns:
+            PointsOfInterest: The points
+
+        Raises:
+            ValueError: If a point lacks a name, category or location
+        """
+        names: List[str] = []
+        categories: List[str] = []
+        lat: List[float] = []
+        lng: List[float] = []
+        for name, category, pt_lat, pt_lng in cls._read(poi_loc):
+            if not name or not category:
+                raise ValueError('Point of interest without name or category: {} {}'
+                                 .format(name, category))
+            names.append(name.strip())
+            categories.append(category.strip().lower())
+            lat.append(float(pt_lat))
+            lng.append(float(pt_lng))
+        return cls(names, categories, np.array(lat), np.array(lng))
+
+    @classmethod
+    def _read(cls, poi_loc: str) -> List[Tuple[str, str, float, float]]:
+        """
+        Returns:
+            List[Tuple[str, str, float, float]]: Name, category, lat and long of each point
+        """
+        if poi_loc.lower().endswith(('.geojson', '.json')):
+            with open(poi_loc, 'r', encoding='utf-8') as fstream:
+                features = json.load(fstream)['features']
+            points = []
+            for feature in features:
+                geometry = feature.get('geometry') or {}
+                if geometry.get('type') != 'Point':
+                    raise ValueError('Point of interest is not a Point: {}'.format(feature))
+                props = feature.get('properties') or {}
+                pt_lng, pt_lat = geometry['coordinates'][:2]
+                points.append((props.get('name'), props.get('category'), pt_lat, pt_lng))
+            return points
+
+        with open(poi_loc, 'r', encoding='utf-8', newline='') as fstream:
+            reader = csv.DictReader(fstream)
+            missing = set(cls._CSV_COLUMNS) - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError('Points of interest lack columns: {}'
+                                 .format(', '.join(sorted(missing))))
+            return [tuple(row[_] for _ in cls._CSV_COLUMNS) for row in reader]
@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+class RateLimiter(object):
+    """
+    Spaces out the calls to a service across threads, so that they start
+    at least `interval` secs apart. Each caller reserves the next free slot,
+    then sleeps until it without holding the lock.
+
+    Attributes:
+        interval (float): Min. secs between the start of two calls
+        _next (float): Next free slot, in `time.monotonic()` secs
+        _lock (threading.Lock): Guards `_next`
+    """
+    interval: float
+    _next: float
+    _lock: threading.Lock
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """
+        Blocks until the caller may call the service
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
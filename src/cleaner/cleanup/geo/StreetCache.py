@@ -0,0 +1,60 @@
+from concurrent.futures import Future
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class StreetCache(object):
+    """
+    In-memory cache of street-level results of a geoservice, e.g. the centroid
+    of a street, or the buildings around it. Shared by all clients of the service,
+    so every block on a street reuses the same queries.
+
+    Each result is computed once, even when several threads need it at the same time.
+    Results that raise are not cached.
+
+    Attributes:
+        _results (Dict[Hashable, Future]): Result of each key
+        _lock (threading.Lock): Guards `_results`
+    """
+    _results: Dict[Hashable, Future]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result of `key`, computing it if needed
+
+        Args:
+            key (Hashable): Key, e.g. the street
+            compute (Callable[[], Any]): Computes the result
+
+        Returns:
+            Any: The result
+        """
+        with self._lock:
+            future = self._results.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._results[key] = Future()
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as expt:
+            with self._lock:
+                del self._results[key]
+            future.set_exception(expt)
+            raise
+        future.set_result(result)
+        return result
+
+    def clear(self) -> None:
+        """
+        Removes every result
+        """
+        with self._lock:
+            self._results.clear()
@@ -1,20 +1,49 @@
 import json
-from typing import ClassVar, Dict, Optional
+import time
+from typing import ClassVar, Dict, Optional, Tuple
 
 import requests
 
 from ..Geocode import Geocode
 from ..IGeoservice import IGeoservice
+from ..StreetCache import StreetCache
 from .OneMapAuth import OneMapAuth
 
 
 class OneMap(IGeoservice):
     """
-    Client for accessing OneMap API
+    Client for accessing OneMap API.
+    Requests share a session, so the connection is kept alive between them.
+    A session is not thread-safe, so each thread should have its own client.
+    Requests that are rate limited (HTTP 429) are retried after a backoff.
+
+    Attributes:
+        _session (requests.Session): HTTP session
     """
 
-    _GEOCODE_API: ClassVar[str] = r'https://developers.onemap.sg/commonapi/search?searchVal={}&returnGeom=Y&getAddrDetails=Y&pageNum=1'  # pylint: disable=line-too-long
-    _R_GEOCODE_API: ClassVar[str] = r'https://developers.onemap.sg/privateapi/commonsvc/revgeocode?location={},{}&token={}&buffer=500&addressType=HDB'  # pylint: disable=line-too-long
+    _GEOCODE_API: ClassVar[str] = r'{}/commonapi/search?searchVal={}&returnGeom=Y&getAddrDetails=Y&pageNum=1'  # pylint: disable=line-too-long
+    _R_GEOCODE_API: ClassVar[str] = r'{}/privateapi/commonsvc/revgeocode?location={},{}&token={}&buffer={}&addressType=HDB'  # pylint: disable=line-too-long
+    _TIMEOUT: ClassVar[float] = 30.0
+    # Timeout of each request, in seconds
+    _RETRIES: ClassVar[int] = 3
+    # Max no. of retries of a rate limited request
+    _BACKOFF: ClassVar[float] = 1.0
+    # Secs before the first retry, doubled for each retry, unless the service gives Retry-After
+    BASE_URL: ClassVar[str] = r'https://developers.onemap.sg'
+    # Root of the API
+    _base_url: ClassVar[str] = BASE_URL
+    # Root of the API queried, see `set_base_url()`
+    _BUFFER: ClassVar[int] = 500
+    # Radius of the reverse geocode, in metres
+    _centroids: ClassVar[StreetCache] = StreetCache()
+    # Lat and long of each street
+    _buildings: ClassVar[StreetCache] = StreetCache()
+    # Buildings around each (street, buffer)
+
+    _session: requests.Session
+
+    def __init__(self) -> None:
+        self._session = requests.Session()
 
     def geocode(self, address: str) -> Optional[Geocode]:
         """
@@ -27,9 +56,7 @@ class OneMap(IGeoservice):
             Optional[Geocode]: Geocode result
         """
         # query
-        uri = self._GEOCODE_API.format(address)
-        req = requests.get(uri)
-        res = json.loads(req.text)
+        res = self._get(self._GEOCODE_API.format(self._base_url, address))
 
         # parse
         result: Optional[Geocode]
@@ -52,7 +79,8 @@ class OneMap(IGeoservice):
     def geocode_reverse(self, block: str, street: str) -> Optional[Geocode]:
         """
         Geocodes the street name, and reverse geocodes for buildings around it.
-        Hopefully the building is then found
+        Hopefully the building is then found.
+        Both are cached per street, so other blocks on the street are found locally.
 
         Args:
             block (str): The block number
@@ -61,31 +89,66 @@ class OneMap(IGeoservice):
         Returns:
             Optional[Geocode]: Geocode result
         """
-        # get street lat/long
-        uri = self._GEOCODE_API.format(street)
-        req = requests.get(uri)
-        res = json.loads(req.text)
-        if res['found'] == 0:
+        centroid = self._centroids.get(street, lambda: self._geocode_street(street))
+        if centroid is None:
             return None
-        street_lat = float(res['results'][0]['LATITUDE'])
-        street_lng = float(res['results'][0]['LONGITUDE'])
-
-        # get buildings around it
-        token = OneMapAuth.get_token()
-        uri = self._R_GEOCODE_API.format(street_lat, street_lng, token)
-        req = requests.get(uri)
-        res = json.loads(req.text)
+        buildings = self._buildings.get((street, self._BUFFER),
+                                        lambda: self._nearby_buildings(*centroid))
 
         # identify the right building
-        target_bldg: Optional[Dict] = None
-        for bldg in res['GeocodeInfo']:
-            if bldg['BLOCK'] == block:
-                target_bldg = bldg
-
+        target_bldg = buildings.get(block)
         if not target_bldg:
             return None
         return self._json2geocode(target_bldg)
 
+    def _geocode_street(self, street: str) -> Optional[Tuple[float, float]]:
+        """
+        Returns:
+            Optional[Tuple[float, float]]: Lat and long of the street, if it's found
+        """
+        res = self._get(self._GEOCODE_API.format(self._base_url, street))
+        if res['found'] == 0:
+            return None
+        return float(res['results'][0]['LATITUDE']), float(res['results'][0]['LONGITUDE'])
+
+    def _nearby_buildings(self, lat: float, lng: float) -> Dict[str, Dict]:
+        """
+        Returns:
+            Dict[str, Dict]: Buildings within the buffer, keyed by block number.
+                        The last of the same block number is kept.
+        """
+        token = OneMapAuth.get_token()
+        res = self._get(self._R_GEOCODE_API.format(self._base_url, lat, lng, token, self._BUFFER))
+        return {bldg['BLOCK']: bldg for bldg in res['GeocodeInfo']}
+
+    @classmethod
+    def set_base_url(cls, base_url: str) -> None:
+        """
+        Queries another OneMap service, e.g. a local stand-in.
+        See `OneMapAuth.set_service()` to log in to it.
+
+        Args:
+            base_url (str): Root of the OneMap API
+        """
+        cls._base_url = base_url.rstrip('/')
+
+    def _get(self, uri: str) -> Dict:
+        """
+        Returns:
+            Dict: Parsed response of a GET, retried while it's rate limited
+
+        Raises:
+            ConnectionError: If it's still rate limited after `_RETRIES`
+        """
+        for retry in range(self._RETRIES + 1):
+            req = self._session.get(uri, timeout=self._TIMEOUT)
+            if req.status_code != 429:
+                return json.loads(req.text)
+            if retry < self._RETRIES:
+                retry_after = req.headers.get('Retry-After')
+                time.sleep(float(retry_after) if retry_after else self._BACKOFF * 2 ** retry)
+        raise ConnectionError('OneMap is rate limiting: {}'.format(uri))
+
     @staticmethod
     def _json2geocode(result: Dict) -> Geocode:
         bldg = result['BUILDING'] if 'BUILDING' in result else ''
@@ -1,61 +1,283 @@
+from concurrent.futures import Future
 import json
-import os
 from os import path
+import threading
 import time
-from typing import ClassVar, Optional
+from typing import ClassVar, Dict, Optional
 
 import requests
 
 import ProjUtils
+from storage.DocumentIO import DocumentIO
 
 
 class OneMapAuth(object):
     """
-    Reponsible for logging in to OneMap service
+    Reponsible for logging in to OneMap service.
+
+    The token is kept in memory, and shared by all threads. It's only read from
+    `_TOKEN_LOC` on first use. Only one thread logs in at a time, and the others
+    wait for its token. A token within `_margin` secs of its expiry is still returned,
+    while a new one is fetched in the background, so queries don't wait on a login
+    once there's a token. The token is also refreshed on a timer before it's due.
+    New tokens are saved atomically to `_TOKEN_LOC`. After a failed login, no other
+    login is tried for a backoff that doubles with each failure in a row, so an outage
+    doesn't become a storm of logins.
+
+    Class Attributes:
+        _base_url (str): Root of the OneMap API
+        _auth (Optional[Dict]): Credentials. Read from `_AUTH_LOC` if not given.
+        _token_loc (Optional[str]): Where the token is saved. `_TOKEN_LOC` if not given.
+        _margin (float): Secs before expiry to refresh the token
+        _backoff_min (float): Secs without logins after the first failure
+        _backoff_max (float): Max. secs without logins after a failure
+        _token (Optional[Dict]): Current token result, with access_token and expiry_timestamp
+        _is_loaded (bool): Whether `_TOKEN_LOC` has been read
+        _refresh (Optional[Future]): Login in progress
+        _timer (Optional[threading.Timer]): Scheduled refresh
+        _failures (int): No. of failed logins in a row
+        _retry_at (float): Time of the next login allowed after a failure
+        _last_error (Optional[BaseException]): Error of the last failed login
+        _lock (threading.Lock): Guards the attributes above
     """
-    _ONEMAP_AUTH_API: ClassVar[str] = r'https://developers.onemap.sg/privateapi/auth/post/getToken'
+    _ONEMAP_AUTH_API: ClassVar[str] = r'{}/privateapi/auth/post/getToken'
     _AUTH_LOC: ClassVar[str] = 'OneMap.key'
     _TOKEN_LOC: ClassVar[str] = 'OneMapToken.key'
+    _TOKEN_MODE: ClassVar[int] = 0o600
+    # Permissions of the saved token
+    _TIMEOUT: ClassVar[float] = 30.0
+    # Timeout of the login, in seconds
+
+    _base_url: ClassVar[str] = r'https://developers.onemap.sg'
+    _auth: ClassVar[Optional[Dict]] = None
+    _token_loc: ClassVar[Optional[str]] = None
+    _margin: ClassVar[float] = 600.0
+    _backoff_min: ClassVar[float] = 5.0
+    _backoff_max: ClassVar[float] = 300.0
+    _token: ClassVar[Optional[Dict]] = None
+    _is_loaded: ClassVar[bool] = False
+    _refresh: ClassVar[Optional[Future]] = None
+    _timer: ClassVar[Optional[threading.Timer]] = None
+    _failures: ClassVar[int] = 0
+    _retry_at: ClassVar[float] = 0.0
+    _last_error: ClassVar[Optional[BaseException]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
 
     @classmethod
     def get_token(cls) -> str:
-        auth_loc = path.join(ProjUtils.get_curr_folder_path(), cls._AUTH_LOC)
-        token_loc = path.join(ProjUtils.get_curr_folder_path(), cls._TOKEN_LOC)
+        """
+        Returns:
+            str: A valid access token. Only blocks when there is none, i.e. on first use
+                        or after it expired.
+
+        Raises:
+            ConnectionError: If the login fails, or failed recently
+        """
+        with cls._lock:
+            if not cls._is_loaded:
+                cls._is_loaded = True
+                cls._set_token(cls._get_old_token(cls._get_token_loc()))
+
+            now = time.time()
+            token = cls._token
+            is_valid = token is not None and token['expiry_timestamp'] > now
+            if is_valid and token['expiry_timestamp'] > now + cls._margin:
+                return token['access_token']
+            refresh = cls._start_refresh()
 
-        token = cls._get_old_token(token_loc)
-        if not token:
-            # load auth
-            with open(auth_loc, 'r') as fstream:
+        if is_valid:
+            # refreshing in the background
+            return token['access_token']
+        return refresh.result()['access_token']
+
+    @classmethod
+    def set_margin(cls, margin: float) -> None:
+        """
+        Sets how early the token is refreshed
+
+        Args:
+            margin (float): Secs before expiry
+        """
+        if margin < 0:
+            raise ValueError('Margin must not be negative')
+        with cls._lock:
+            cls._margin = margin
+            cls._schedule()
+
+    @classmethod
+    def set_backoff(cls, backoff_min: float, backoff_max: float) -> None:
+        """
+        Sets how long logins are held off after a failure
+
+        Args:
+            backoff_min (float): Secs after the first failure. Doubled with each failure in a row.
+            backoff_max (float): Max. secs
+        """
+        if backoff_min < 0 or backoff_max < backoff_min:
+            raise ValueError('Backoff must not be negative, and max must not be below min')
+        with cls._lock:
+            cls._backoff_min = backoff_min
+            cls._backoff_max = backoff_max
+
+    @classmethod
+    def set_service(cls, base_url: str, auth: Optional[Dict] = None,
+                    token_loc: Optional[str] = None) -> None:
+        """
+        Logs in to another OneMap service, e.g. a local stand-in.
+        The token in memory, and any backoff, is dropped.
+
+        Args:
+            base_url (str): Root of the OneMap API
+            auth (Optional[Dict]): Credentials, with email and password.
+                        Read from `_AUTH_LOC` if not given.
+            token_loc (Optional[str]): Where to save the token. `_TOKEN_LOC` if not given.
+        """
+        with cls._lock:
+            cls._base_url = base_url.rstrip('/')
+            cls._auth = auth
+            cls._token_loc = token_loc
+            cls._is_loaded = False
+            cls._failures = 0
+            cls._retry_at = 0.0
+            cls._last_error = None
+            cls._set_token(None)
+
+    @classmethod
+    def _start_refresh(cls) -> Future:
+        """
+        Starts a login, unless one is in progress or a failed one is backing off.
+        Requires `_lock`.
+
+        Returns:
+            Future: Token result of the login. Failed at once while backing off.
+        """
+        wait = cls._retry_at - time.time()
+        if cls._refresh is None and wait > 0:
+            backing_off: Future = Future()
+            backing_off.set_exception(ConnectionError(
+                'OneMap login failed {} times in a row, retrying in {:.0f} secs: {}'
+                .format(cls._failures, wait, cls._last_error)))
+            return backing_off
+        if cls._refresh is None:
+            cls._refresh = Future()
+            threading.Thread(target=cls._do_refresh, args=(cls._refresh,),
+                             name='onemap-auth', daemon=True).start()
+        return cls._refresh
+
+    @classmethod
+    def _do_refresh(cls, refresh: Future) -> None:
+        try:
+            token_result = cls._login()
+        except BaseException as expt:  # pylint: disable=broad-except
+            with cls._lock:
+                cls._failures += 1
+                backoff = min(cls._backoff_max,
+                              cls._backoff_min * 2 ** min(cls._failures - 1, 30))
+                cls._retry_at = time.time() + backoff
+                cls._last_error = expt
+                cls._refresh = None
+            print('[Warning] OneMap login failed, retrying in {:.0f} secs: {}'
+                  .format(backoff, expt))
+            refresh.set_exception(expt)
+            return
+        with cls._lock:
+            cls._set_token(token_result)
+            cls._failures = 0
+            cls._retry_at = 0.0
+            cls._last_error = None
+            cls._refresh = None
+        refresh.set_result(token_result)
+
+    @classmethod
+    def _login(cls) -> Dict:
+        """
+        Posts the credentials, and saves the new token
+
+        Returns:
+            Dict: Token result, with access_token and expiry_timestamp
+        """
+        # load auth
+        with cls._lock:
+            auth, base_url = cls._auth, cls._base_url
+        if auth is None:
+            with open(cls._get_loc(cls._AUTH_LOC), 'r') as fstream:
                 auth = json.load(fstream)
 
-            # submit auth
-            headers = {'cache-control': 'no-cache'}
-            res = requests.post(cls._ONEMAP_AUTH_API,
-                                json=auth, headers=headers)
-            token_result = json.loads(res.text)
-            if 'access_token' not in token_result:
-                raise ConnectionError('Error in authentication!')
+        # submit auth
+        headers = {'cache-control': 'no-cache'}
+        res = requests.post(cls._ONEMAP_AUTH_API.format(base_url),
+                            json=auth, headers=headers, timeout=cls._TIMEOUT)
+        token_result = json.loads(res.text)
+        if 'access_token' not in token_result:
+            raise ConnectionError('Error in authentication!')
+        token_result['expiry_timestamp'] = float(token_result['expiry_timestamp'])
+
+        # save auth
+        cls._save_token(cls._get_token_loc(), token_result)
+        return token_result
+
+    @classmethod
+    def _set_token(cls, token_result: Optional[Dict]) -> None:
+        """
+        Sets the current token, and schedules its refresh. Requires `_lock`.
+        """
+        cls._token = token_result
+        cls._schedule()
+
+    @classmethod
+    def _schedule(cls) -> None:
+        """
+        Schedules a refresh at `_margin` secs before the token expires. Requires `_lock`.
+        """
+        if cls._timer is not None:
+            cls._timer.cancel()
+            cls._timer = None
+        if cls._token is None:
+            return
+        delay = max(0.0, cls._token['expiry_timestamp'] - cls._margin - time.time())
+        cls._timer = threading.Timer(delay, cls._on_timer)
+        cls._timer.daemon = True
+        cls._timer.start()
 
-            # save auth
-            with open(token_loc, 'w') as fstream:
+    @classmethod
+    def _on_timer(cls) -> None:
+        with cls._lock:
+            cls._timer = None
+            cls._start_refresh()
+
+    @classmethod
+    def _save_token(cls, token_loc: str, token_result: Dict) -> None:
+        """
+        Writes the token atomically, so readers never see a partial file.
+        It's kept readable by the owner only.
+        """
+        with DocumentIO.atomic_write(token_loc, cls._TOKEN_MODE) as temp_path:
+            with open(temp_path, 'w') as fstream:
                 json.dump(token_result, fstream)
-            token = token_result['access_token']
-        return token
 
     @staticmethod
-    def _get_old_token(token_loc: str) -> str:
+    def _get_old_token(token_loc: str) -> Optional[Dict]:
         """
-        Gets old token from file if it exists
+        Gets old token from file if it exists and hasn't expired
         """
-        token: Optional[str] = None
-        if path.exists(token_loc):
+        if not path.exists(token_loc):
+            return None
+        try:
             with open(token_loc, 'r') as fstream:
                 token_result = json.load(fstream)
-                fstream.close()
-
-            # check if expired
-            if token_result['expiry_timestamp'] <= time.time() + 600:
-                os.remove(token_loc)
-            else:
-                token = token_result['access_token']
-        return token
+            token_result['expiry_timestamp'] = float(token_result['expiry_timestamp'])
+        except (ValueError, KeyError):
+            return None
+
+        # check if expired
+        if token_result['expiry_timestamp'] <= time.time():
+            return None
+        return token_result
+
+    @classmethod
+    def _get_token_loc(cls) -> str:
+        return cls._token_loc or cls._get_loc(cls._TOKEN_LOC)
+
+    @staticmethod
+    def _get_loc(filename: str) -> str:
+        return path.join(ProjUtils.get_curr_folder_path(), filename)
@@ -1,33 +1,48 @@
 import json
 from os import path
-from typing import ClassVar, Dict, Optional
+from typing import Any, ClassVar, Dict, Optional, Tuple
 
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 
 import ProjUtils
 from ..Geocode import Geocode
 from ..IGeoservice import IGeoservice
+from ..StreetCache import StreetCache
 
 
 class SDirectory(IGeoservice):
     """
-    Client for accessing Street Directory API
+    Client for accessing Street Directory API.
+    PhantomJS is only started on the first query, and the page is loaded once.
+    Each query is then injected into the loaded page, which calls back with its result.
+    A client takes one query at a time. The page is reloaded after a query fails or times out,
+    so a late result cannot be taken as the result of the next query.
 
     Attributes:
-        _driver (webdriver.PhantomJS): Selenium webdriver
+        _driver (Optional[webdriver.PhantomJS]): Selenium webdriver, once started
     """
 
     _PHANTOMJS_PATH: ClassVar[str] = r'lib\phantomjs-2.1.1-windows\bin\phantomjs.exe'
     # Path to PhantomJS
     _HTML_LOC: ClassVar[str] = 'SDirectory.html'
     # Filename of HTML loader for JS script
+    _SCRIPT_TIMEOUT: ClassVar[float] = 30.0
+    # Timeout of each injected query, in seconds
+    _GEOCODE_SCRIPT: ClassVar[str] = \
+        'query_geocode(arguments[0], arguments[arguments.length - 1]);'
+    _REVERSE_SCRIPT: ClassVar[str] = \
+        'query_reverse(arguments[0], arguments[1], arguments[arguments.length - 1]);'
 
-    _driver: webdriver.PhantomJS
+    _centroids: ClassVar[StreetCache] = StreetCache()
+    # Lat and long of each street, shared by all clients
+    _buildings: ClassVar[StreetCache] = StreetCache()
+    # Building nearest to each street's centroid, shared by all clients
+
+    _driver: Optional[webdriver.PhantomJS]
 
     def __init__(self) -> None:
-        full_path = path.join(ProjUtils.get_project_path(),
-                              SDirectory._PHANTOMJS_PATH)
-        self._driver = webdriver.PhantomJS(executable_path=full_path)
+        self._driver = None
 
     def geocode(self, address: str) -> Optional[Geocode]:
         """
@@ -39,9 +54,7 @@ class SDirectory(IGeoservice):
         Returns:
             Optional[Geocode]: Geocode result
         """
-        uri = 'file:///{}?g={}'.format(path.join(ProjUtils.get_curr_folder_path(),
-                                                 SDirectory._HTML_LOC), address)
-        res = self._submit_query(uri)
+        res = self._submit_query(self._GEOCODE_SCRIPT, address)
 
         result: Optional[Geocode] = None
         try:
@@ -69,10 +82,11 @@ class SDirectory(IGeoservice):
                     pass
         return result
 
-    def geocode_reverse(self, block: str, street: str) -> Geocode:
+    def geocode_reverse(self, block: str, street: str) -> Optional[Geocode]:
         """
         Geocodes the street name, and reverse geocodes for a building around it.
-        Hopefully the building is found (but very unlikely)
+        Hopefully the building is found (but very unlikely).
+        Both are cached per street, so other blocks on the street are not queried again.
 
         Args:
             block (str): The block number
@@ -81,37 +95,84 @@ class SDirectory(IGeoservice):
         Returns:
             Optional[Geocode]: Geocode result
         """
-        # get street lat/long
-        uri = 'file:///{}?g={}'.format(path.join(
-            ProjUtils.get_curr_folder_path(), SDirectory._HTML_LOC), street)
-        res = self._submit_query(uri)
-        if res[0]['total'] == 0:
+        centroid = self._centroids.get(street, lambda: self._geocode_street(street))
+        if centroid is None:
             return None
-        street_lat = float(res[1]['y'])
-        street_lng = float(res[1]['x'])
-
-        # get buildings around it
-        uri = 'file:///{}?r={},{}'.format(
-            path.join(ProjUtils.get_curr_folder_path(), SDirectory._HTML_LOC),
-            street_lat, street_lng)
-        res = self._submit_query(uri)
+        buildings = self._buildings.get(street, lambda: self._nearby_buildings(*centroid))
 
         # identify the right building
-        if res['no.'] != block:
+        target_bldg = buildings.get(block)
+        if not target_bldg:
             return None
-        return self._json2geocode(res)
+        return self._json2geocode(target_bldg)
 
     def close(self) -> None:
         """
-        Closes the WebDriver
+        Closes the WebDriver, if it was started
+        """
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
+    def _geocode_street(self, street: str) -> Optional[Tuple[float, float]]:
+        """
+        Returns:
+            Optional[Tuple[float, float]]: Lat and long of the street, if it's found
+        """
+        res = self._submit_query(self._GEOCODE_SCRIPT, street)
+        if res[0]['total'] == 0:
+            return None
+        return float(res[1]['y']), float(res[1]['x'])
+
+    def _nearby_buildings(self, lat: float, lng: float) -> Dict[str, Dict]:
+        """
+        Returns:
+            Dict[str, Dict]: The building nearest to the point, keyed by block number
+        """
+        res = self._submit_query(self._REVERSE_SCRIPT, lat, lng)
+        return {res['no.']: res} if 'no.' in res else {}
+
+    def _submit_query(self, script: str, *args: Any) -> Any:
         """
-        self._driver.close()
+        Runs a query in the loaded page, starting the WebDriver if needed
+
+        Args:
+            script (str): Script that starts the query, and calls back with its result
+            args (Any): Arguments of the query
 
-    def _submit_query(self, uri: str) -> Dict:
-        self._driver.get(uri)
-        res = self._driver.find_element_by_id('query_results').text
+        Returns:
+            Any: Parsed result
+        """
+        if self._driver is None:
+            self._driver = self._start_driver()
+        try:
+            res = self._driver.execute_async_script(script, *args)
+        except WebDriverException:
+            # the query may still call back later, so drop it with the page
+            self._load_page(self._driver)
+            raise
         return json.loads(res)
 
+    @classmethod
+    def _start_driver(cls) -> webdriver.PhantomJS:
+        """
+        Returns:
+            webdriver.PhantomJS: A started WebDriver, on the loaded page
+        """
+        full_path = path.join(ProjUtils.get_project_path(), cls._PHANTOMJS_PATH)
+        driver = webdriver.PhantomJS(executable_path=full_path)
+        driver.set_script_timeout(cls._SCRIPT_TIMEOUT)
+        cls._load_page(driver)
+        return driver
+
+    @classmethod
+    def _load_page(cls, driver: webdriver.PhantomJS) -> None:
+        """
+        (Re)loads the HTML loader, discarding any query still running in it
+        """
+        driver.get('file:///{}'.format(
+            path.join(ProjUtils.get_curr_folder_path(), cls._HTML_LOC)))
+
     @staticmethod
     def _json2geocode(result: Dict) -> Geocode:
         title = result['t'] if 't' in result else ''
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+from queue import Queue
+import threading
+from typing import Iterator, List, Optional
+
+from ..Geocode import Geocode
+from ..IGeoservice import IGeoservice
+from .SDirectory import SDirectory
+
+
+class SDirectoryPool(IGeoservice):
+    """
+    A small pool of Street Directory clients, shared by several threads.
+    Clients are created as they are needed, up to `size`, and kept for the next query,
+    so their browsers are only started once.
+
+    Attributes:
+        size (int): Max no. of clients
+        _idle (Queue): Clients that are free
+        _clients (List[SDirectory]): Every client created
+        _lock (threading.Lock): Guards `_clients`
+    """
+    size: int
+    _idle: Queue
+    _clients: List[SDirectory]
+    _lock: threading.Lock
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._idle = Queue()
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def geocode(self, address: str) -> Optional[Geocode]:
+        with self._borrow() as sdir:
+            return sdir.geocode(address)
+
+    def geocode_reverse(self, block: str, street: str) -> Optional[Geocode]:
+        with self._borrow() as sdir:
+            return sdir.geocode_reverse(block, street)
+
+    def close(self) -> None:
+        """
+        Closes every client
+        """
+        with self._lock:
+            for sdir in self._clients:
+                sdir.close()
+
+    @contextmanager
+    def _borrow(self) -> Iterator[SDirectory]:
+        """
+        Returns:
+            Iterator[SDirectory]: A free client, which is returned after the `with` block
+        """
+        sdir: Optional[SDirectory] = None
+        with self._lock:
+            if self._idle.empty() and len(self._clients) < self.size:
+                sdir = SDirectory()
+                self._clients.append(sdir)
+        if sdir is None:
+            sdir = self._idle.get()
+        try:
+            yield sdir
+        finally:
+            self._idle.put(sdir)
@@ -1,7 +1,8 @@
 from datetime import datetime
-import json
 from os import path
 
+from storage.DocumentIO import DocumentIO
+
 
 class CleanupLog(object):
     """
@@ -21,10 +22,8 @@ class CleanupLog(object):
         """
         if not path.exists(log_loc):
             return False
-        with open(log_loc, 'r') as fstream:
-            log = json.load(fstream)
-            fstream.close()
-            return name in log
+        log = DocumentIO.load(log_loc)
+        return name in log
 
     @staticmethod
     def log_done(name: str, log_loc: str) -> None:
@@ -35,16 +34,6 @@ class CleanupLog(object):
             name (str): Name of the cleanup process
             log_loc (str): Location of the log file
         """
-        if path.exists(log_loc):
-            with open(log_loc, 'r+') as fstream:
-                log = json.load(fstream)
-                log[name] = str(datetime.now())
-
-                fstream.seek(0)
-                json.dump(log, fstream, indent=4)
-                fstream.close()
-        else:
-            with open(log_loc, 'w') as fstream:
-                log = {name: str(datetime.now())}
-                json.dump(log, fstream, indent=4)
-                fstream.close()
+        log = DocumentIO.load(log_loc) if path.exists(log_loc) else {}
+        log[name] = str(datetime.now())
+        DocumentIO.dump(log_loc, log, DocumentIO.PRETTY)
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Tuple
+
+
+class HeavyHitters(object):
+    """
+    Approximate most frequent values in constant memory, using Space-Saving. Mergeable.
+
+    Attributes:
+        capacity (int): No. of counters kept
+        _counters (Dict[Tuple[str, Any], List[int]]): [count, error] per value,
+                    keyed by (type name, value) because True == 1 for dicts
+    """
+    capacity: int
+    _counters: Dict[Tuple[str, Any], List[int]]
+
+    def __init__(self, capacity: int = 100) -> None:
+        self.capacity = capacity
+        self._counters = {}
+
+    def add(self, value: Any) -> None:
+        """
+        Adds a value. Once full, the least counted value is evicted
+        and its count is inherited as the error bound of the new value.
+
+        Args:
+            value (Any): A hashable value
+        """
+        key = (type(value).__name__, value)
+        counter = self._counters.get(key)
+        if counter:
+            counter[0] += 1
+        elif len(self._counters) < self.capacity:
+            self._counters[key] = [1, 0]
+        else:
+            min_key = min(self._counters, key=lambda k: self._counters[k][0])
+            min_count = self._counters.pop(min_key)[0]
+            self._counters[key] = [min_count + 1, min_count]
+
+    def merge(self, other: 'HeavyHitters') -> None:
+        """
+        Merges another sketch into this one
+
+        Args:
+            other (HeavyHitters): The other sketch
+        """
+        # A value missing from a full sketch may have been counted up to its minimum
+        self_min = self._min_count()
+        other_min = other._min_count()
+
+        merged: Dict[Tuple[str, Any], List[int]] = {}
+        for key in set(self._counters) | set(other._counters):
+            mine = self._counters.get(key, [self_min, self_min])
+            theirs = other._counters.get(key, [other_min, other_min])
+            merged[key] = [mine[0] + theirs[0], mine[1] + theirs[1]]
+
+        ranked = sorted(merged.items(), key=lambda _: _[1][0], reverse=True)
+        self._counters = dict(ranked[:self.capacity])
+
+    def top(self, limit: int) -> List[Dict]:
+        """
+        Args:
+            limit (int): No. of values to return
+
+        Returns:
+            List[Dict]: Most frequent values, with their count and error bound
+        """
+        ranked = sorted(self._counters.items(), key=lambda _: _[1][0], reverse=True)
+        return [{'value': key[1], 'count': counter[0], 'error': counter[1]}
+                for key, counter in ranked[:limit]]
+
+    def _min_count(self) -> int:
+        if len(self._counters) < self.capacity:
+            return 0
+        return min(_[0] for _ in self._counters.values())
@@ -0,0 +1,71 @@
+import hashlib
+import math
+from typing import Any, ClassVar
+
+
+class HyperLogLog(object):
+    """
+    Approximate distinct counter in constant memory. Mergeable.
+
+    Class Attributes:
+        _HASH_BITS (int): No. of bits in the hash of a value
+
+    Attributes:
+        precision (int): No. of bits used to pick a register. Error is ~1.04 / sqrt(2^precision)
+        _registers (bytearray): Longest run of leading zeros seen, per register
+    """
+    _HASH_BITS: ClassVar[int] = 64
+
+    precision: int
+    _registers: bytearray
+
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be within 4 to 16')
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, value: Any) -> None:
+        """
+        Adds a value
+
+        Args:
+            value (Any): A hashable value. Values of different types are counted separately.
+        """
+        # Python's hash() is salted per process, so it can't be merged across runs
+        key = '{}:{!r}'.format(type(value).__name__, value).encode('utf-8')
+        hashed = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+        rest_bits = self._HASH_BITS - self.precision
+        index = hashed >> rest_bits
+        rest = hashed & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """
+        Merges another counter of the same precision into this one
+
+        Args:
+            other (HyperLogLog): The other counter
+        """
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge HyperLogLog of different precision')
+        self._registers = bytearray(
+            max(_) for _ in zip(self._registers, other._registers))
+
+    def count(self) -> int:
+        """
+        Returns:
+            int: Estimated no. of distinct values
+        """
+        size = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -_ for _ in self._registers)
+
+        # Small range correction, by linear counting
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
@@ -0,0 +1,125 @@
+import math
+from typing import Any, ClassVar, Dict, List, Optional
+
+from .PropertySketch import PropertySketch
+
+
+class PropertyProfile(PropertySketch):
+    """
+    Running statistics of a single property, in bounded memory.
+    Extends the sketch with the type mix, exact min/max and a histogram.
+
+    Class Attributes:
+        _MAX_BINS (int): Max. no. of histogram bins before the bin width is doubled
+
+    Attributes:
+        types (Dict[str, int]): No. of values seen per type name
+        min_val (Optional[float]): Smallest numeric value
+        max_val (Optional[float]): Largest numeric value
+        _bin_width (float): Current width of a histogram bin
+        _bins (Dict[int, int]): Histogram, keyed by bin index
+    """
+    _MAX_BINS: ClassVar[int] = 32
+
+    types: Dict[str, int]
+    min_val: Optional[float]
+    max_val: Optional[float]
+    _bin_width: float
+    _bins: Dict[int, int]
+
+    def __init__(self, prop_name: str) -> None:
+        PropertySketch.__init__(self, prop_name)
+        self.types = {}
+        self.min_val = None
+        self.max_val = None
+        self._bin_width = 1.0
+        self._bins = {}
+
+    def add(self, value: Any) -> None:
+        """
+        Adds a value to the profile
+
+        Args:
+            value (Any): A JSON value. Lists and dictionaries are only counted by type.
+        """
+        PropertySketch.add(self, value)
+        type_name = type(value).__name__
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self._add_numeric(value)
+
+    def merge(self, other: 'PropertySketch') -> None:
+        """
+        Merges the profile of the same property into this one.
+        The histogram is re-binned to the wider of the two bin widths.
+
+        Args:
+            other (PropertySketch): The other profile
+        """
+        if not isinstance(other, PropertyProfile):
+            raise TypeError('Cannot merge {} into a PropertyProfile'.format(type(other).__name__))
+        PropertySketch.merge(self, other)
+        for type_name, type_count in other.types.items():
+            self.types[type_name] = self.types.get(type_name, 0) + type_count
+        if other.min_val is not None and (self.min_val is None or other.min_val < self.min_val):
+            self.min_val = other.min_val
+        if other.max_val is not None and (self.max_val is None or other.max_val > self.max_val):
+            self.max_val = other.max_val
+
+        # Both widths are 1 doubled a no. of times
+        while self._bin_width < other._bin_width:
+            self._widen()
+        shift = int(round(math.log2(self._bin_width / other._bin_width)))
+        for other_index, other_count in other._bins.items():
+            index = other_index >> shift
+            self._bins[index] = self._bins.get(index, 0) + other_count
+        self._fit_bins()
+
+    def to_dict(self) -> Dict:
+        """
+        To Dictionary
+
+        Returns:
+            Dict: dictionary. One-way transformation.
+        """
+        dict_obj = PropertySketch.to_dict(self)
+        dict_obj.update({'types': dict(self.types),
+                         'min': self.min_val,
+                         'max': self.max_val,
+                         'histogram': self._histogram()})
+        return dict_obj
+
+    def _add_numeric(self, value: float) -> None:
+        if self.min_val is None or value < self.min_val:
+            self.min_val = value
+        if self.max_val is None or value > self.max_val:
+            self.max_val = value
+
+        index = int(math.floor(value / self._bin_width))
+        self._bins[index] = self._bins.get(index, 0) + 1
+        self._fit_bins()
+
+    def _fit_bins(self) -> None:
+        """
+        Widens the bins until they fit again
+        """
+        while len(self._bins) > self._MAX_BINS:
+            self._widen()
+
+    def _widen(self) -> None:
+        """
+        Doubles the bin width, merging each pair of bins
+        """
+        self._bin_width *= 2
+        merged: Dict[int, int] = {}
+        for old_index, old_count in self._bins.items():
+            new_index = old_index // 2
+            merged[new_index] = merged.get(new_index, 0) + old_count
+        self._bins = merged
+
+    def _histogram(self) -> List[Dict]:
+        return [{'low': index * self._bin_width,
+                 'high': (index + 1) * self._bin_width,
+                 'count': self._bins[index]}
+                for index in sorted(self._bins)]
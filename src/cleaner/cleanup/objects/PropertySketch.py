@@ -0,0 +1,88 @@
+from typing import Any, ClassVar, Dict, Tuple
+
+from .HeavyHitters import HeavyHitters
+from .HyperLogLog import HyperLogLog
+from .QuantileSketch import QuantileSketch
+
+
+class PropertySketch(object):
+    """
+    Approximate statistics of a single property, in constant memory. Mergeable.
+
+    Class Attributes:
+        _QUANTILES (Tuple[float, ...]): Quantiles that are reported
+        _TOP_REPORTED (int): No. of heavy hitters that are reported
+
+    Attributes:
+        prop_name (str): Name of the property. Object-oriented. Dot-delimited.
+        count (int): No. of values seen, including nulls
+        null_count (int): No. of null values seen
+        distinct (HyperLogLog): Distinct count of non-null values
+        heavy_hitters (HeavyHitters): Most frequent non-null values
+        quantiles (QuantileSketch): Distribution of numeric values
+    """
+    _QUANTILES: ClassVar[Tuple[float, ...]] = (0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+    _TOP_REPORTED: ClassVar[int] = 10
+
+    prop_name: str
+    count: int
+    null_count: int
+    distinct: HyperLogLog
+    heavy_hitters: HeavyHitters
+    quantiles: QuantileSketch
+
+    def __init__(self, prop_name: str) -> None:
+        self.prop_name = prop_name
+        self.count = 0
+        self.null_count = 0
+        self.distinct = HyperLogLog()
+        self.heavy_hitters = HeavyHitters()
+        self.quantiles = QuantileSketch()
+
+    def add(self, value: Any) -> None:
+        """
+        Adds a value to the sketch
+
+        Args:
+            value (Any): A JSON value. Lists and dictionaries are only counted.
+        """
+        self.count += 1
+        if value is None:
+            self.null_count += 1
+            return
+        if isinstance(value, (dict, list)):
+            return
+
+        self.distinct.add(value)
+        self.heavy_hitters.add(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.quantiles.add(value)
+
+    def merge(self, other: 'PropertySketch') -> None:
+        """
+        Merges the sketch of the same property into this one
+
+        Args:
+            other (PropertySketch): The other sketch
+        """
+        self.count += other.count
+        self.null_count += other.null_count
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.quantiles.merge(other.quantiles)
+
+    def to_dict(self) -> Dict:
+        """
+        To Dictionary
+
+        Returns:
+            Dict: dictionary. One-way transformation.
+        """
+        quantiles = None
+        if self.quantiles.count:
+            quantiles = {str(_): self.quantiles.quantile(_) for _ in self._QUANTILES}
+        return {'count': self.count,
+                'null_count': self.null_count,
+                'distinct_count': self.distinct.count(),
+                'top_k': self.heavy_hitters.top(self._TOP_REPORTED),
+                'quantiles': quantiles}
@@ -0,0 +1,118 @@
+import math
+import random
+from typing import List, Optional
+
+
+class QuantileSketch(object):
+    """
+    Approximate quantiles in constant memory, using KLL compactors. Mergeable.
+
+    Each level holds items of weight 2^level. When a level is full, it is
+    sorted and every other item is promoted to the next level.
+
+    Attributes:
+        size (int): Accuracy parameter. Rank error is ~1.65 / size
+        count (int): No. of values added
+        min_val (Optional[float]): Smallest value
+        max_val (Optional[float]): Largest value
+        _levels (List[List[float]]): Compactors, from lowest to highest weight
+        _random (random.Random): Coin for picking odd or even items during compaction
+    """
+    size: int
+    count: int
+    min_val: Optional[float]
+    max_val: Optional[float]
+    _levels: List[List[float]]
+    _random: random.Random
+
+    def __init__(self, size: int = 200) -> None:
+        self.size = size
+        self.count = 0
+        self.min_val = None
+        self.max_val = None
+        self._levels = [[]]
+        # Seeded so that reports are reproducible
+        self._random = random.Random(0)
+
+    def add(self, value: float) -> None:
+        """
+        Adds a value
+
+        Args:
+            value (float): Numeric value
+        """
+        self.count += 1
+        if self.min_val is None or value < self.min_val:
+            self.min_val = value
+        if self.max_val is None or value > self.max_val:
+            self.max_val = value
+
+        self._levels[0].append(value)
+        if len(self._levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Merges another sketch into this one
+
+        Args:
+            other (QuantileSketch): The other sketch
+        """
+        if other.count == 0:
+            return
+        self.count += other.count
+        if self.min_val is None or other.min_val < self.min_val:
+            self.min_val = other.min_val
+        if self.max_val is None or other.max_val > self.max_val:
+            self.max_val = other.max_val
+
+        while len(self._levels) < len(other._levels):
+            self._levels.append([])
+        for level, items in enumerate(other._levels):
+            self._levels[level].extend(items)
+        self._compress()
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """
+        Args:
+            fraction (float): 0.0 to 1.0. E.g. 0.5 for the median
+
+        Returns:
+            Optional[float]: Approximate value at the given quantile. None if empty
+        """
+        if self.count == 0:
+            return None
+        if fraction <= 0:
+            return self.min_val
+        if fraction >= 1:
+            return self.max_val
+
+        weighted = sorted((value, 1 << level)
+                          for level, items in enumerate(self._levels) for value in items)
+        total = sum(_[1] for _ in weighted)
+        target = fraction * total
+        running = 0
+        for value, weight in weighted:
+            running += weight
+            if running >= target:
+                return value
+        return self.max_val
+
+    def _capacity(self, level: int) -> int:
+        # Lower levels get geometrically smaller capacities
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.size * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        for level in range(len(self._levels)):
+            if len(self._levels[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self._levels):
+                self._levels.append([])
+
+            items = sorted(self._levels[level])
+            # Keep the odd one out, so that the total weight is preserved
+            leftover = [items.pop()] if len(items) % 2 else []
+            offset = self._random.randint(0, 1)
+            self._levels[level + 1].extend(items[offset::2])
+            self._levels[level] = leftover
@@ -0,0 +1,71 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+
+class Stage(object):
+    """
+    A cleanup step that works on all files in memory, declaring the properties
+    that it reads and writes, so that independent stages can run at the same time.
+
+    Attributes:
+        name (str): Name of this Stage
+        reads (Tuple[str, ...]): Properties read. Object-oriented. Dot-delimited.
+        writes (Tuple[str, ...]): Properties written. Object-oriented. Dot-delimited.
+        func (callable): Modifies the JSON of every file in place
+        sources (Tuple[str, ...]): Locations of other files read, e.g. reference data.
+                    Their content is part of the stage's fingerprint.
+    """
+    name: str
+    reads: Tuple[str, ...]
+    writes: Tuple[str, ...]
+    func: Any
+    # Can't be Callable, see ReplacePair
+    sources: Tuple[str, ...]
+
+    def __init__(self, name: str, reads: Tuple[str, ...], writes: Tuple[str, ...],
+                 func: Callable[[List[Dict]], Any], sources: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.reads = reads
+        self.writes = writes
+        self.func = func
+        self.sources = sources
+
+    @property
+    def props(self) -> Tuple[str, ...]:
+        """
+        Returns:
+            Tuple[str, ...]: Properties read or written, sorted
+        """
+        return tuple(sorted(set(self.reads) | set(self.writes)))
+
+    def depends_on(self, other: 'Stage') -> bool:
+        """
+        Checks if this stage has to wait for `other`, which comes before it.
+        That is when one writes what the other reads or writes.
+
+        Args:
+            other (Stage): An earlier stage
+
+        Returns:
+            bool: True if the stages cannot run at the same time
+        """
+        return _overlaps(other.writes, self.reads + self.writes) or \
+            _overlaps(other.reads, self.writes)
+
+    def __str__(self) -> str:
+        return '{} ({} -> {})'.format(self.name, ', '.join(self.reads), ', '.join(self.writes))
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def _overlaps(props_a: Tuple[str, ...], props_b: Tuple[str, ...]) -> bool:
+    """
+    Returns:
+        bool: True if a property is, or is nested within, a property of the other
+    """
+    for prop_a in props_a:
+        for prop_b in props_b:
+            if prop_a == prop_b or prop_b.startswith(prop_a + '.') or \
+                    prop_a.startswith(prop_b + '.'):
+                return True
+    return False
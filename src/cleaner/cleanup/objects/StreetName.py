@@ -0,0 +1,80 @@
+import re
+from typing import ClassVar, List, Tuple
+
+
+class StreetName(object):
+    """
+    Street names, and their canonical form, in which acronyms are expanded
+    the same way as the ExpandAddressAcronym step
+
+    Class Attributes:
+        ACRONYMS (List[Tuple[str, str, bool]]): Street acronyms, in the order that they
+                        are expanded: (acronym, expansion, whether the acronym is a regex)
+        DIRECTIONS (frozenset): Words that tell apart the parts of an estate,
+                        e.g. JURONG WEST vs JURONG EAST
+        TYPES (frozenset): Words of the kind of street, e.g. ROAD vs RING ROAD
+    """
+    ACRONYMS: ClassVar[List[Tuple[str, str, bool]]] = [
+        ('BT ', 'BUKIT ', False),
+        ("C'WEALTH ", 'COMMONWEALTH ', False),
+        ('JLN ', 'JALAN ', False),
+        (r'\bLOR ', 'LORONG ', True),
+        ('ST. ', 'SAINT ', False),
+        ('UPP ', 'UPPER ', False),
+        (r' AVE\b', ' AVENUE', True),
+        (r' CL\b', ' CLOSE', True),
+        (r' CRES\b', ' CRESCENT', True),
+        (' CTRL', ' CENTRAL', False),
+        (r' DR\b', ' DRIVE', True),
+        (' GDNS', ' GARDENS', False),
+        (' HTS', ' HEIGHTS', False),
+        (' NTH', ' NORTH', False),
+        (' PK', ' PARK', False),
+        (r' PL\b', ' PLACE', True),
+        (' RD', ' ROAD', False),
+        (r' ST\b', ' STREET', True),
+        (r' TER\b', ' TERRACE', True)
+    ]
+    DIRECTIONS: ClassVar[frozenset] = frozenset(
+        ('NORTH', 'SOUTH', 'EAST', 'WEST', 'CENTRAL', 'UPPER', 'LOWER'))
+    TYPES: ClassVar[frozenset] = frozenset(
+        ('AVENUE', 'BOULEVARD', 'CIRCLE', 'CLOSE', 'CRESCENT', 'DRIVE', 'FIELD',
+         'GARDENS', 'GROVE', 'HEIGHTS', 'HILL', 'JALAN', 'LANE', 'LINK', 'LOOP',
+         'LORONG', 'PARK', 'PLACE', 'RING', 'RISE', 'ROAD', 'SQUARE', 'STREET',
+         'TERRACE', 'VALE', 'VIEW', 'WALK', 'WAY'))
+
+    @classmethod
+    def canonical(cls, street: str) -> str:
+        """
+        Args:
+            street (str): Street name, e.g. BT BATOK WEST AVE 2
+
+        Returns:
+            str: In upper case, with single spaces and acronyms expanded,
+                        e.g. BUKIT BATOK WEST AVENUE 2
+        """
+        street = ' '.join(street.upper().split())
+        for acro, expd, is_regex in cls.ACRONYMS:
+            street = re.sub(acro, expd, street) if is_regex else street.replace(acro, expd)
+        return street
+
+    @classmethod
+    def shape(cls, street: str) -> Tuple[int, Tuple[str, ...], Tuple[str, ...],
+                                         Tuple[str, ...]]:
+        """
+        What two names of the same street must share. Only the other words may
+        differ, e.g. by spelling.
+
+        Args:
+            street (str): Canonical street name, e.g. BUKIT BATOK WEST AVENUE 2
+
+        Returns:
+            Tuple[int, Tuple[str, ...], Tuple[str, ...], Tuple[str, ...]]: No. of words,
+                        then its directions, types and numbers in order,
+                        e.g. (5, ('WEST',), ('AVENUE',), ('2',))
+        """
+        words = street.split()
+        return (len(words),
+                tuple(_ for _ in words if _ in cls.DIRECTIONS),
+                tuple(_ for _ in words if _ in cls.TYPES),
+                tuple(_ for _ in words if _[0].isdigit()))
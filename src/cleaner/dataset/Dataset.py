@@ -0,0 +1,432 @@
+import json
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from storage.DatasetSource import open_source
+from .Snapshot import Snapshot
+from .SpatialIndex import SpatialIndex
+from .StringTable import StringTable
+
+
+class Dataset(object):
+    """
+    Columnar, in-memory view of all JSON files.
+
+    The nested `blocks -> apartments -> lease_price_list` documents are flattened
+    into 3 structured arrays. A parent holds the [start, stop) offsets of its
+    children, and a child holds the index of its parent. Strings are encoded
+    as identifiers of `strings`, where -1 is null.
+
+    Dates may be null, a raw string (before parsing) or a parsed dictionary,
+    as given by their `_kind` column. Similarly for leases.
+    Block properties that are not known, are kept as an encoded JSON string.
+
+    Class Attributes:
+        NULL (int): Kind of a null value
+        PARSED (int): Kind of a parsed value (i.e. date dictionary, integer lease)
+        RAW (int): Kind of a raw string value
+        DATE_PROPS (Tuple[str, ...]): Date properties of a block
+        BLOCK_DTYPE (np.dtype): Columns of `blocks`
+        APARTMENT_DTYPE (np.dtype): Columns of `apartments`
+        LEASE_DTYPE (np.dtype): Columns of `leases`
+
+    Attributes:
+        strings (StringTable): Dictionary encoding of all strings
+        files (List[str]): Path of each file, relative to the JSON folder
+        file_offsets (np.ndarray): [start, stop) offsets into `blocks` of each file
+        blocks (np.ndarray): One row per block
+        apartments (np.ndarray): One row per apartment
+        leases (np.ndarray): One row per lease price
+    """
+    NULL: ClassVar[int] = 0
+    PARSED: ClassVar[int] = 1
+    RAW: ClassVar[int] = 2
+
+    DATE_PROPS: ClassVar[Tuple[str, ...]] = ('dpd_date', 'lcd_date', 'pcd_date')
+    _DATE_FIELDS: ClassVar[Tuple[str, ...]] = ('year', 'month', 'day', 'quarter', 'months_since')
+    _STRING_PROPS: ClassVar[Tuple[str, ...]] = ('town', 'flat_type', 'street')
+    _CODE_PROPS: ClassVar[Tuple[str, ...]] = ('block_num', 'contract', 'neighbourhood')
+    _QUOTA_PROPS: ClassVar[Tuple[str, ...]] = ('quota_chinese', 'quota_malay', 'quota_other')
+    _GEO_PROPS: ClassVar[Tuple[str, ...]] = ('title', 'lat', 'long', 'postal')
+
+    BLOCK_DTYPE: ClassVar[np.dtype] = np.dtype(
+        [('file', np.int32)] +
+        [(_, np.int32) for _ in _STRING_PROPS + _CODE_PROPS + _QUOTA_PROPS] +
+        [_ for date in DATE_PROPS for _ in (
+            (date + '_kind', np.int8), (date + '_raw', np.int32),
+            (date + '_year', np.int16), (date + '_month', np.int8),
+            (date + '_day', np.int8), (date + '_quarter', np.int8),
+            (date + '_months_since', np.int32))] +
+        [('has_geo', np.bool_), ('title', np.int32), ('lat', np.float64),
+         ('long', np.float64), ('postal', np.int64),
+         ('extra', np.int32), ('apt_start', np.int64), ('apt_stop', np.int64)])
+    APARTMENT_DTYPE: ClassVar[np.dtype] = np.dtype(
+        [('block', np.int64), ('floor', np.int16), ('unit', np.int32),
+         ('area', np.float64), ('area_is_int', np.bool_), ('is_repurchased', np.bool_),
+         ('lease_start', np.int64), ('lease_stop', np.int64)])
+    LEASE_DTYPE: ClassVar[np.dtype] = np.dtype(
+        [('apartment', np.int64), ('lease_kind', np.int8), ('lease', np.int16),
+         ('lease_raw', np.int32), ('price', np.int64)])
+
+    _KNOWN_PROPS: ClassVar[frozenset] = frozenset(
+        ('apartments', 'block_code') + DATE_PROPS + _STRING_PROPS + _QUOTA_PROPS + _GEO_PROPS)
+    _STRING_COLUMNS: ClassVar[frozenset] = frozenset(
+        _STRING_PROPS + _CODE_PROPS + ('title', 'lease_raw') +
+        tuple(_ + '_raw' for _ in DATE_PROPS))
+    _INTERNAL_COLUMNS: ClassVar[frozenset] = frozenset(
+        ('file', 'has_geo', 'extra', 'apt_start', 'apt_stop', 'block', 'area_is_int',
+         'lease_start', 'lease_stop', 'apartment', 'lease_kind', 'lease_raw') +
+        tuple(_ + '_kind' for _ in DATE_PROPS) + tuple(_ + '_raw' for _ in DATE_PROPS))
+
+    strings: StringTable
+    files: List[str]
+    file_offsets: np.ndarray
+    blocks: np.ndarray
+    apartments: np.ndarray
+    leases: np.ndarray
+
+    def __init__(self, strings: StringTable, files: List[str], file_offsets: np.ndarray,
+                 blocks: np.ndarray, apartments: np.ndarray, leases: np.ndarray) -> None:
+        self.strings = strings
+        self.files = files
+        self.file_offsets = file_offsets
+        self.blocks = blocks
+        self.apartments = apartments
+        self.leases = leases
+
+    @classmethod
+    def load(cls, json_loc: str) -> 'Dataset':
+        """
+        Flattens all JSON files into columns.
+        Files with an array root element are read as a list of blocks.
+
+        Args:
+            json_loc (str): location of JSON folder, or of a container
+
+        Returns:
+            Dataset: The loaded dataset
+        """
+        strings = StringTable()
+        files: List[str] = []
+        file_offsets = [0]
+        block_rows: List[tuple] = []
+        apt_rows: List[tuple] = []
+        lease_rows: List[tuple] = []
+
+        # Iterate through all files, in a stable order
+        for rel_path, data in open_source(json_loc).iter_documents():
+            blocks = data if isinstance(data, list) else data['blocks']
+            for block in blocks:
+                block_rows.append(cls._flatten_block(
+                    block, len(files), len(block_rows), strings, apt_rows, lease_rows))
+            files.append(rel_path)
+            file_offsets.append(len(block_rows))
+
+        return Dataset(strings, files,
+                       np.array(file_offsets, dtype=np.int64),
+                       np.array(block_rows, dtype=cls.BLOCK_DTYPE),
+                       np.array(apt_rows, dtype=cls.APARTMENT_DTYPE),
+                       np.array(lease_rows, dtype=cls.LEASE_DTYPE))
+
+    @classmethod
+    def load_cached(cls, json_loc: str, snapshot_loc: str,
+                    mmap_mode: Optional[str] = 'r') -> 'Dataset':
+        """
+        Loads the dataset from its binary snapshot if it is fresh.
+        Otherwise, loads the JSON files and saves a new snapshot.
+
+        Args:
+            json_loc (str): location of JSON folder, or of a container
+            snapshot_loc (str): location of snapshot folder
+            mmap_mode (Optional[str]): Mode of `numpy.memmap`. The default 'r' is read-only;
+                        use 'c' to modify the columns without touching the snapshot.
+
+        Returns:
+            Dataset: The loaded dataset
+        """
+        if Snapshot.is_fresh(json_loc, snapshot_loc):
+            strings, files, arrays = Snapshot.load(snapshot_loc, mmap_mode)
+            return Dataset(strings, files, arrays['file_offsets'], arrays['blocks'],
+                           arrays['apartments'], arrays['leases'])
+
+        dataset = cls.load(json_loc)
+        dataset.save_snapshot(json_loc, snapshot_loc)
+        return dataset
+
+    def save_snapshot(self, json_loc: str, snapshot_loc: str) -> None:
+        """
+        Saves the binary snapshot, keyed to the current JSON files
+
+        Args:
+            json_loc (str): location of JSON folder that this dataset is saved in
+            snapshot_loc (str): location of snapshot folder
+        """
+        Snapshot.save(snapshot_loc, json_loc, self.strings, self.files,
+                      {'file_offsets': self.file_offsets, 'blocks': self.blocks,
+                       'apartments': self.apartments, 'leases': self.leases})
+
+    def save(self, json_loc: str, file_indices: Optional[Iterable[int]] = None) -> None:
+        """
+        Saves the dataset back into the JSON layout. Unchanged files are not rewritten.
+        A container is always rewritten as a whole.
+
+        Args:
+            json_loc (str): location of JSON folder, or of a container
+            file_indices (Optional[Iterable[int]]): Only saves these files, if given
+        """
+        source = open_source(json_loc)
+        if source.is_container:
+            file_indices = None
+        source.write_documents(self.to_documents(file_indices))
+
+    def to_documents(self, file_indices: Optional[Iterable[int]] = None,
+                     with_apartments: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """
+        Rebuilds the documents of each file
+
+        Args:
+            file_indices (Optional[Iterable[int]]): Only rebuilds these files, if given
+            with_apartments (bool): If False, the blocks are rebuilt without apartments,
+                        for readers of the `apartments` and `leases` columns
+
+        Returns:
+            Iterator[Tuple[str, Dict]]: Relative file path, and its document
+        """
+        if file_indices is None:
+            file_indices = range(len(self.files))
+
+        # decode all strings once
+        str_list: List[Any] = self.strings.to_list()
+        for i in file_indices:
+            rel_path = self.files[i]
+            start, stop = self.file_offsets[i], self.file_offsets[i + 1]
+            blocks = [self._block_to_dict(self.blocks[_].item(), str_list,
+                                          with_apartments)
+                      for _ in range(start, stop)]
+            yield rel_path, {'blocks': blocks}
+
+    def column(self, prop_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the column of a property, as used by ExamineProperty.
+        E.g. blocks.apartments.area, or blocks.pcd_date.months_since
+
+        Args:
+            prop_name (str): object-oriented, dot-delimited attribute
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The values, and whether each value is not null.
+                        String properties remain as identifiers of `strings`.
+                        Only parsed dates and leases are valid.
+        """
+        table, key = self._resolve(prop_name)
+        values = table[key]
+
+        valid: np.ndarray
+        if key == 'lease':
+            valid = table['lease_kind'] == self.PARSED
+        elif key.endswith(('_month', '_day', '_quarter')):
+            valid = values != 0
+        elif key.startswith(self.DATE_PROPS):
+            date = next(_ for _ in self.DATE_PROPS if key.startswith(_))
+            valid = table[date + '_kind'] == self.PARSED
+        elif key in self._GEO_PROPS:
+            valid = table['has_geo'].copy()
+        elif key in self._STRING_COLUMNS:
+            valid = values >= 0
+        else:
+            valid = np.ones(len(values), dtype=np.bool_)
+        return values, valid
+
+    def distinct(self, prop_name: str) -> List[Any]:
+        """
+        Sorted distinct values of a property, similar to ExamineProperty.retrieve
+
+        Args:
+            prop_name (str): object-oriented, dot-delimited attribute
+
+        Returns:
+            List[Any]: Distinct values. Includes None if there are null values.
+        """
+        _, key = self._resolve(prop_name)
+        values, valid = self.column(prop_name)
+        uniques = np.unique(values[valid])
+
+        result: List[Any]
+        if key in self._STRING_COLUMNS:
+            result = sorted(self.strings.decode_array(uniques).tolist())
+        else:
+            result = uniques.tolist()
+        if not valid.all():
+            result.append(None)
+        return result
+
+    def spatial_index(self) -> SpatialIndex:
+        """
+        Returns:
+            SpatialIndex: Index of the blocks with geolocation, identified by their
+                        index into `blocks`
+        """
+        has_geo = self.blocks['has_geo']
+        return SpatialIndex(self.blocks['lat'][has_geo], self.blocks['long'][has_geo],
+                            np.nonzero(has_geo)[0])
+
+    def lease_blocks(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Index into `blocks` of each lease price
+        """
+        return self.apartments['block'][self.leases['apartment']]
+
+    def _resolve(self, prop_name: str) -> Tuple[np.ndarray, str]:
+        """
+        Maps a property to its table and column
+
+        Args:
+            prop_name (str): object-oriented, dot-delimited attribute
+
+        Returns:
+            Tuple[np.ndarray, str]: The table, and the name of the column
+        """
+        prop_arr = prop_name.split('.')
+        if prop_arr[0] != 'blocks' or len(prop_arr) < 2:
+            raise KeyError(prop_name)
+
+        table: np.ndarray
+        if prop_arr[1] == 'apartments':
+            if prop_arr[2:3] == ['lease_price_list']:
+                table, key = self.leases, '.'.join(prop_arr[3:])
+            else:
+                table, key = self.apartments, '.'.join(prop_arr[2:])
+        elif prop_arr[1] == 'block_code':
+            table, key = self.blocks, '.'.join(prop_arr[2:])
+        elif prop_arr[1] in self.DATE_PROPS and len(prop_arr) == 3:
+            table, key = self.blocks, '_'.join(prop_arr[1:])
+        else:
+            table, key = self.blocks, '.'.join(prop_arr[1:])
+
+        if key not in table.dtype.names or key in self._INTERNAL_COLUMNS:
+            raise KeyError(prop_name)
+        return table, key
+
+    @classmethod
+    def _flatten_block(cls, block: Dict, file_index: int, block_index: int,
+                       strings: StringTable, apt_rows: List[tuple],
+                       lease_rows: List[tuple]) -> tuple:
+        """
+        Flattens a block into a row, and appends its apartments and lease prices
+
+        Returns:
+            tuple: Row of the block, in order of `BLOCK_DTYPE`
+        """
+        row: List[Any] = [file_index]
+        row.extend(strings.encode(block[_]) for _ in cls._STRING_PROPS)
+        row.extend(strings.encode(block['block_code'][_]) for _ in cls._CODE_PROPS)
+        row.extend(block[_] for _ in cls._QUOTA_PROPS)
+
+        for date in cls.DATE_PROPS:
+            value = block[date]
+            if isinstance(value, dict):
+                row.extend((cls.PARSED, -1))
+                row.extend(value[_] or 0 for _ in cls._DATE_FIELDS)
+            else:
+                row.extend((cls.RAW if value is not None else cls.NULL,
+                            strings.encode(value), 0, 0, 0, 0, 0))
+
+        if 'lat' in block:
+            row.extend((True, strings.encode(block['title']), block['lat'],
+                        block['long'], block['postal']))
+        else:
+            row.extend((False, -1, np.nan, np.nan, 0))
+
+        extra = {k: v for k, v in block.items() if k not in cls._KNOWN_PROPS}
+        row.append(strings.encode(json.dumps(extra)) if extra else -1)
+
+        # Children
+        apt_start = len(apt_rows)
+        for apt in block['apartments']:
+            lease_start = len(lease_rows)
+            for lease_price in apt['lease_price_list']:
+                lease = lease_price['lease']
+                if isinstance(lease, int):
+                    lease_rows.append((len(apt_rows), cls.PARSED, lease, -1,
+                                       lease_price['price']))
+                else:
+                    lease_rows.append((len(apt_rows),
+                                       cls.RAW if lease is not None else cls.NULL, 0,
+                                       strings.encode(lease), lease_price['price']))
+            area = apt['area']
+            apt_rows.append((block_index, apt['floor'], apt['unit'], area,
+                             isinstance(area, int), apt['is_repurchased'],
+                             lease_start, len(lease_rows)))
+        row.extend((apt_start, len(apt_rows)))
+        return tuple(row)
+
+    def _block_to_dict(self, row: tuple, str_list: List[Any],
+                       with_apartments: bool = True) -> Dict:
+        """
+        Rebuilds a block from its row, in the key order of the JSON files
+
+        Args:
+            row (tuple): Row of `blocks`
+            str_list (List[Any]): Decoded `strings`
+            with_apartments (bool): If False, `apartments` is left out
+
+        Returns:
+            Dict: The block
+        """
+        cols = dict(zip(self.BLOCK_DTYPE.names, row))
+
+        def decode(str_id: int) -> Optional[str]:
+            return None if str_id < 0 else str_list[str_id]
+
+        def date_value(date: str) -> Any:
+            if cols[date + '_kind'] != self.PARSED:
+                return decode(cols[date + '_raw'])
+            # months_since of 0 is May 2017, not null
+            return {_: cols['_'.join((date, _))] if _ in ('year', 'months_since')
+                       else cols['_'.join((date, _))] or None
+                    for _ in self._DATE_FIELDS}
+
+        apartments = []
+        apt_indices = range(cols['apt_start'], cols['apt_stop']) if with_apartments else ()
+        for apt_index in apt_indices:
+            (_, floor, unit, area, area_is_int, is_repurchased,
+             lease_start, lease_stop) = self.apartments[apt_index].item()
+            lease_price_list = []
+            for _, lease_kind, lease, lease_raw, price in \
+                    self.leases[lease_start:lease_stop].tolist():
+                lease_price_list.append({
+                    'lease': lease if lease_kind == self.PARSED else decode(lease_raw),
+                    'price': price})
+            apartments.append({'area': int(area) if area_is_int else area,
+                               'floor': floor,
+                               'is_repurchased': is_repurchased,
+                               'lease_price_list': lease_price_list,
+                               'unit': unit})
+
+        # Sorted keys, as serialised by the scraper
+        block: Dict[str, Any] = {
+            'apartments': apartments,
+            'block_code': {_: decode(cols[_]) for _ in self._CODE_PROPS},
+            'dpd_date': date_value('dpd_date'),
+            'flat_type': decode(cols['flat_type']),
+            'lcd_date': date_value('lcd_date'),
+            'pcd_date': date_value('pcd_date'),
+            'quota_chinese': cols['quota_chinese'],
+            'quota_malay': cols['quota_malay'],
+            'quota_other': cols['quota_other'],
+            'street': decode(cols['street']),
+            'town': decode(cols['town'])}
+        if not with_apartments:
+            del block['apartments']
+
+        # Appended by AddGeo
+        if cols['has_geo']:
+            block['title'] = decode(cols['title'])
+            block['lat'] = cols['lat']
+            block['long'] = cols['long']
+            block['postal'] = cols['postal']
+        if cols['extra'] >= 0:
+            block.update(json.loads(decode(cols['extra'])))
+        return block
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from os import path
+from typing import ClassVar, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from storage.DocumentIO import DocumentIO
+from .StringTable import StringTable
+
+
+class Snapshot(object):
+    """
+    Binary snapshot of a `Dataset`, for instant reloads.
+
+    Each column table is a `.npy` file that is opened with `numpy.memmap`, so loads
+    are zero-copy and processes share pages through the OS cache. Strings and file
+    paths are kept in a JSON string table. The manifest keys the snapshot to the
+    mtime, size and hash of every source file, and is written last.
+
+    Class Attributes:
+        _VERSION (int): Format version. Snapshots of other versions are stale.
+        _MANIFEST (str): Filename of the manifest
+        _STRINGS (str): Filename of the string table
+        _ARRAYS (Tuple[str, ...]): Names of the `.npy` files
+    """
+    _VERSION: ClassVar[int] = 1
+    _MANIFEST: ClassVar[str] = 'manifest.json'
+    _STRINGS: ClassVar[str] = 'strings.json'
+    _ARRAYS: ClassVar[Tuple[str, ...]] = ('file_offsets', 'blocks', 'apartments', 'leases')
+
+    @classmethod
+    def is_fresh(cls, json_loc: str, snapshot_loc: str, verify: bool = False) -> bool:
+        """
+        Checks if the snapshot was taken of the current source files
+
+        Args:
+            json_loc (str): location of JSON folder, or of a container
+            snapshot_loc (str): location of snapshot folder
+            verify (bool): If True, also compares the hash of every file's content
+
+        Returns:
+            bool: True if the snapshot can be loaded in place of the source files
+        """
+        manifest_loc = path.join(snapshot_loc, cls._MANIFEST)
+        if not path.exists(manifest_loc):
+            return False
+        with open(manifest_loc, 'r') as fstream:
+            manifest = json.load(fstream)
+            fstream.close()
+
+        if manifest['version'] != cls._VERSION:
+            return False
+        if manifest['files'] != cls._stat_files(json_loc):
+            return False
+        if verify:
+            return manifest['hashes'] == cls._hash_files(json_loc, sorted(manifest['files']))
+        return True
+
+    @classmethod
+    def save(cls, snapshot_loc: str, json_loc: str, strings: StringTable,
+             files: List[str], arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Saves the snapshot. The manifest of the previous snapshot is removed first,
+        so an interrupted save is never mistaken as fresh. Each file is written
+        atomically, and the manifest last.
+
+        Args:
+            snapshot_loc (str): location of snapshot folder
+            json_loc (str): location of JSON folder, or of a container the dataset was loaded from
+            strings (StringTable): String table of the dataset
+            files (List[str]): Relative file paths of the dataset
+            arrays (Dict[str, np.ndarray]): Column tables, keyed by name
+        """
+        if not path.exists(snapshot_loc):
+            os.makedirs(snapshot_loc)
+        manifest_loc = path.join(snapshot_loc, cls._MANIFEST)
+        if path.exists(manifest_loc):
+            os.remove(manifest_loc)
+
+        # Never written in place, as a loaded snapshot may still be mapping the old files
+        for name in cls._ARRAYS:
+            with DocumentIO.atomic_write(path.join(snapshot_loc, name + '.npy')) as temp_path:
+                with open(temp_path, 'wb') as fstream:
+                    np.save(fstream, arrays[name])
+        DocumentIO.dump(path.join(snapshot_loc, cls._STRINGS),
+                        {'strings': strings.to_list(), 'files': files}, DocumentIO.COMPACT)
+
+        stats = cls._stat_files(json_loc)
+        manifest = {'version': cls._VERSION,
+                    'files': stats,
+                    'hashes': cls._hash_files(json_loc, sorted(stats))}
+        DocumentIO.dump(manifest_loc, manifest, DocumentIO.COMPACT)
+
+    @classmethod
+    def load(cls, snapshot_loc: str, mmap_mode: Optional[str] = 'r') \
+            -> Tuple[StringTable, List[str], Dict[str, np.ndarray]]:
+        """
+        Loads the snapshot
+
+        Args:
+            snapshot_loc (str): location of snapshot folder
+            mmap_mode (Optional[str]): Mode of `numpy.memmap`. 'r' is read-only and shared,
+                        'c' is copy-on-write. None reads the arrays into memory.
+
+        Returns:
+            Tuple[StringTable, List[str], Dict[str, np.ndarray]]:
+                        String table, relative file paths, and column tables
+        """
+        with open(path.join(snapshot_loc, cls._STRINGS), 'r') as fstream:
+            table = json.load(fstream)
+            fstream.close()
+
+        arrays = {name: np.load(path.join(snapshot_loc, name + '.npy'), mmap_mode=mmap_mode)
+                  for name in cls._ARRAYS}
+        return StringTable(table['strings']), table['files'], arrays
+
+    @staticmethod
+    def _stat_files(json_loc: str) -> Dict[str, List[int]]:
+        """
+        Returns:
+            Dict[str, List[int]]: [mtime in ns, size] keyed by relative file path
+        """
+        # A container is a single file
+        if path.isfile(json_loc):
+            stat = os.stat(json_loc)
+            return {path.basename(json_loc): [stat.st_mtime_ns, stat.st_size]}
+
+        stats = {}
+        for filepath, _ in DocumentIO.walk(json_loc):
+            stat = os.stat(filepath)
+            stats[path.relpath(filepath, json_loc)] = [stat.st_mtime_ns, stat.st_size]
+        return stats
+
+    @staticmethod
+    def _hash_files(json_loc: str, rel_paths: List[str]) -> Dict[str, str]:
+        """
+        Returns:
+            Dict[str, str]: Hash of the content, keyed by relative file path
+        """
+        hashes = {}
+        for rel_path in rel_paths:
+            filepath = json_loc if path.isfile(json_loc) else path.join(json_loc, rel_path)
+            with open(filepath, 'rb') as fstream:
+                hashes[rel_path] = hashlib.blake2b(fstream.read(), digest_size=16).hexdigest()
+        return hashes
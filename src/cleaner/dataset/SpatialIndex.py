@@ -0,0 +1,335 @@
+import heapq
+import math
+from typing import Any, ClassVar, List, Optional, Tuple
+
+import numpy as np
+
+
+class SpatialIndex(object):
+    """
+    KD-tree over points given in lat and long, for nearest neighbour, radius and
+    bounding box queries.
+
+    Points are projected to metres around their mean, by the equirectangular
+    approximation. Over an area the size of Singapore, its distances are within
+    0.1% of the haversine distance. The tree splits the widest axis at the median,
+    down to leaves of `_LEAF_SIZE` points. Each node keeps the bounding box of its
+    points, which are contiguous in the tree's order.
+
+    Class Attributes:
+        EARTH_RADIUS (float): Mean radius of the Earth, in metres
+        _LEAF_SIZE (int): Max no. of points in a leaf
+        _GROUP_SIZE (int): Max no. of locations that `nearest_many()` compares
+                    with the points at once
+
+    Attributes:
+        ids (np.ndarray): Identifier of each point, in the tree's order
+        _lat0 (float): Latitude of the origin of the projection
+        _lng0 (float): Longitude of the origin of the projection
+        _cos_lat0 (float): Scale of longitudes at the origin
+        _xy (np.ndarray): Projected points in metres, in the tree's order, shape (n, 2)
+        _start (np.ndarray): Start offset into `_xy` of each node
+        _stop (np.ndarray): Stop offset into `_xy` of each node
+        _children (List[Tuple[int, int]]): Left and right child of each node, -1 for leaves
+        _boxes (List[Tuple[float, float, float, float]]): Bounding box of each node,
+                    as (min x, min y, max x, max y)
+    """
+    EARTH_RADIUS: ClassVar[float] = 6371000.0
+    _LEAF_SIZE: ClassVar[int] = 16
+    _GROUP_SIZE: ClassVar[int] = 256
+    # Max no. of locations that `nearest_many()` compares with the points at once
+
+    ids: np.ndarray
+    _lat0: float
+    _lng0: float
+    _cos_lat0: float
+    _xy: np.ndarray
+    _start: np.ndarray
+    _stop: np.ndarray
+    _children: List[Tuple[int, int]]
+    _boxes: List[Tuple[float, float, float, float]]
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray,
+                 ids: Optional[np.ndarray] = None) -> None:
+        """
+        Builds the index
+
+        Args:
+            lat (np.ndarray): Latitude of each point
+            lng (np.ndarray): Longitude of each point
+            ids (Optional[np.ndarray]): Identifier of each point, e.g. its index into
+                        `Dataset.blocks`. The position of the point if not given.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        ids = np.arange(len(lat), dtype=np.int64) if ids is None else np.asarray(ids)
+        self._lat0 = float(lat.mean()) if len(lat) else 0.0
+        self._lng0 = float(lng.mean()) if len(lng) else 0.0
+        self._cos_lat0 = math.cos(math.radians(self._lat0))
+
+        xy = np.column_stack(self._project(lat, lng))
+        order, starts, stops, self._children = _build(xy, self._LEAF_SIZE)
+        self.ids = ids[order]
+        self._xy = xy[order]
+        self._start = np.array(starts, dtype=np.int64)
+        self._stop = np.array(stops, dtype=np.int64)
+        # plain floats, as the queries test one box at a time
+        self._boxes = [tuple(np.concatenate((self._xy[s:e].min(axis=0),
+                                             self._xy[s:e].max(axis=0))).tolist())
+                       if e > s else (0.0, 0.0, 0.0, 0.0)
+                       for s, e in zip(starts, stops)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Finds the points nearest to a location
+
+        Args:
+            lat (float): Latitude
+            lng (float): Longitude
+            k (int): No. of points
+
+        Returns:
+            List[Tuple[int, float]]: Identifier and distance in metres of up to
+                        `k` points, nearest first
+        """
+        if not len(self.ids) or k < 1:
+            return []
+        px, py = (float(_) for _ in self._project(lat, lng))
+        return [(int(self.ids[pos]), math.sqrt(dist)) for dist, pos in self._nearest_xy(px, py, k)]
+
+    def nearest_many(self, lat: np.ndarray, lng: np.ndarray,
+                     k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the points nearest to each of many locations, in one vectorized pass.
+        The locations are grouped by a KD-tree of their own, of up to `_GROUP_SIZE`
+        locations per leaf. The points that can be nearest to any location of a group
+        are found once from the centre of the group, then measured against all its
+        locations at once.
+
+        Args:
+            lat (np.ndarray): Latitude of each location
+            lng (np.ndarray): Longitude of each location
+            k (int): No. of points per location
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Identifiers, and distances in metres, of the
+                        `k` points nearest to each location, nearest first. Both of shape
+                        (no. of locations, k), padded with -1 and inf if there are
+                        fewer than `k` points.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        ids = np.full((len(lat), max(k, 0)), -1, dtype=np.int64)
+        dists = np.full(ids.shape, np.inf)
+        count = min(k, len(self.ids))
+        if count < 1 or not len(lat):
+            return ids, dists
+
+        qxy = np.column_stack(self._project(lat, lng))
+        order, starts, stops, children = _build(qxy, self._GROUP_SIZE)
+        for start, stop, (left, _) in zip(starts, stops, children):
+            if left >= 0:
+                continue
+            group = order[start:stop]
+            pts = qxy[group]
+            lo, hi = pts.min(axis=0), pts.max(axis=0)
+            cx, cy = ((lo + hi) / 2).tolist()
+            half_diag = float(np.hypot(*(hi - lo))) / 2
+
+            # The kth point nearest to the centre is within reach + half_diag of
+            # every location, so their k nearest are within reach + 2 * half_diag
+            # of the centre
+            reach = math.sqrt(self._nearest_xy(cx, cy, count)[-1][0]) + 2 * half_diag
+            cand, _ = self._within_xy(cx, cy, reach * reach * (1 + 1e-9) + 1e-6)
+            cand_xy = self._xy[cand]
+            dx = pts[:, 0, None] - cand_xy[None, :, 0]
+            dy = pts[:, 1, None] - cand_xy[None, :, 1]
+            dist_sq = dx * dx + dy * dy
+            if len(cand) > count:
+                near = np.argpartition(dist_sq, count - 1, axis=1)[:, :count]
+            else:
+                near = np.broadcast_to(np.arange(len(cand)), dist_sq.shape)
+            # fancy indexing by row, as np.take_along_axis() is not in numpy 1.13
+            rows = np.arange(len(group))[:, None]
+            near_sq = dist_sq[rows, near]
+            rank = np.argsort(near_sq, axis=1, kind='mergesort')
+            ids[group, :count] = self.ids[cand[near[rows, rank]]]
+            dists[group, :count] = np.sqrt(near_sq[rows, rank])
+        return ids, dists
+
+    def within(self, lat: float, lng: float, radius: float) -> List[Tuple[int, float]]:
+        """
+        Finds the points within a distance of a location
+
+        Args:
+            lat (float): Latitude
+            lng (float): Longitude
+            radius (float): Distance in metres
+
+        Returns:
+            List[Tuple[int, float]]: Identifier and distance in metres of each point,
+                        nearest first
+        """
+        if not len(self.ids):
+            return []
+        px, py = (float(_) for _ in self._project(lat, lng))
+        positions, dists = self._within_xy(px, py, radius * radius)
+        order = np.argsort(dists, kind='mergesort')
+        return [(int(self.ids[pos]), math.sqrt(float(dist)))
+                for pos, dist in zip(positions[order], dists[order])]
+
+    def in_box(self, min_lat: float, min_lng: float,
+               max_lat: float, max_lng: float) -> List[int]:
+        """
+        Finds the points within a bounding box
+
+        Args:
+            min_lat (float): South edge
+            min_lng (float): West edge
+            max_lat (float): North edge
+            max_lng (float): East edge
+
+        Returns:
+            List[int]: Identifier of each point, in the tree's order
+        """
+        if not len(self.ids):
+            return []
+        lo = np.array(self._project(min_lat, min_lng))
+        hi = np.array(self._project(max_lat, max_lng))
+        lo_x, lo_y = lo.tolist()
+        hi_x, hi_y = hi.tolist()
+        found: List[np.ndarray] = []
+        nodes = [0]
+        while nodes:
+            node = nodes.pop()
+            min_x, min_y, max_x, max_y = self._boxes[node]
+            if max_x < lo_x or max_y < lo_y or min_x > hi_x or min_y > hi_y:
+                continue
+            start, stop = self._start[node], self._stop[node]
+            if min_x >= lo_x and min_y >= lo_y and max_x <= hi_x and max_y <= hi_y:
+                found.append(self.ids[start:stop])
+                continue
+            left, right = self._children[node]
+            if left >= 0:
+                nodes.extend((right, left))
+                continue
+            pts = self._xy[start:stop]
+            found.append(self.ids[start:stop][((pts >= lo) & (pts <= hi)).all(axis=1)])
+        return np.concatenate(found).tolist() if found else []
+
+    def _nearest_xy(self, px: float, py: float, k: int) -> List[Tuple[float, int]]:
+        """
+        Returns:
+            List[Tuple[float, int]]: Squared distance and position of up to `k` points
+                        nearest to a projected location, nearest first
+        """
+        point = np.array((px, py))
+        best: List[Tuple[float, int]] = []  # max heap of (-dist^2, position)
+        nodes = [(0.0, 0)]  # min heap of (box dist^2, node)
+        while nodes:
+            box_dist, node = heapq.heappop(nodes)
+            if len(best) == k and box_dist > -best[0][0]:
+                break
+            left, right = self._children[node]
+            if left < 0:
+                start, stop = self._start[node], self._stop[node]
+                dists = ((self._xy[start:stop] - point) ** 2).sum(axis=1)
+                for pos in np.argsort(dists)[:k]:
+                    item = (-float(dists[pos]), int(start + pos))
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                    else:
+                        break
+                continue
+            for child in (left, right):
+                heapq.heappush(nodes, (self._box_dist(child, px, py), child))
+        return [(-neg_dist, pos) for neg_dist, pos in sorted(best, reverse=True)]
+
+    def _within_xy(self, px: float, py: float,
+                   radius_sq: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Position and squared distance of the points
+                        within a squared distance of a projected location, unordered
+        """
+        point = np.array((px, py))
+        positions: List[np.ndarray] = [np.zeros(0, dtype=np.int64)]
+        dists: List[np.ndarray] = [np.zeros(0)]
+        nodes = [0]
+        while nodes:
+            node = nodes.pop()
+            if self._box_dist(node, px, py) > radius_sq:
+                continue
+            left, right = self._children[node]
+            if left >= 0:
+                nodes.extend((left, right))
+                continue
+            start, stop = self._start[node], self._stop[node]
+            node_dists = ((self._xy[start:stop] - point) ** 2).sum(axis=1)
+            is_within = node_dists <= radius_sq
+            positions.append(np.nonzero(is_within)[0] + start)
+            dists.append(node_dists[is_within])
+        return np.concatenate(positions), np.concatenate(dists)
+
+    def _box_dist(self, node: int, px: float, py: float) -> float:
+        """
+        Returns:
+            float: Squared distance from the point to the bounding box of the node
+        """
+        min_x, min_y, max_x, max_y = self._boxes[node]
+        dx = max(min_x - px, px - max_x, 0.0)
+        dy = max(min_y - py, py - max_y, 0.0)
+        return dx * dx + dy * dy
+
+    def _project(self, lat: Any, lng: Any) -> Tuple[Any, Any]:
+        """
+        Projects to metres east and north of the origin. Works on arrays too.
+        """
+        x = np.radians(np.subtract(lng, self._lng0)) * self._cos_lat0 * self.EARTH_RADIUS
+        y = np.radians(np.subtract(lat, self._lat0)) * self.EARTH_RADIUS
+        return x, y
+
+
+def _build(xy: np.ndarray, leaf_size: int) -> Tuple[np.ndarray, List[int], List[int],
+                                                    List[Tuple[int, int]]]:
+    """
+    Builds a KD-tree depth first, splitting the widest axis at the median,
+    and reordering the points so that each node is a range
+
+    Args:
+        xy (np.ndarray): Projected points, shape (n, 2)
+        leaf_size (int): Max no. of points in a leaf
+
+    Returns:
+        Tuple[np.ndarray, List[int], List[int], List[Tuple[int, int]]]: Position of each
+                    point in the tree's order, then the start and stop offset of each
+                    node into that order, and its left and right child, -1 for leaves
+    """
+    order = np.arange(len(xy))
+    starts: List[int] = []
+    stops: List[int] = []
+    children: List[List[int]] = []
+    stack = [(0, len(xy), -1, 0)]
+    while stack:
+        start, stop, parent, side = stack.pop()
+        node = len(starts)
+        starts.append(start)
+        stops.append(stop)
+        children.append([-1, -1])
+        if parent >= 0:
+            children[parent][side] = node
+        if stop - start <= leaf_size:
+            continue
+        pts = xy[order[start:stop]]
+        axis = int(np.argmax(pts.max(axis=0) - pts.min(axis=0)))
+        mid = (stop - start) // 2
+        part = np.argpartition(pts[:, axis], mid)
+        order[start:stop] = order[start:stop][part]
+        stack.append((start + mid, stop, node, 1))
+        stack.append((start, start + mid, node, 0))
+    return order, starts, stops, [(left, right) for left, right in children]
@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class StringTable(object):
+    """
+    Dictionary encoding of strings into integer identifiers.
+    Identifier -1 is reserved for null.
+
+    Attributes:
+        _strings (List[str]): Strings, indexed by identifier
+        _ids (Dict[str, int]): Identifiers, keyed by string
+    """
+    _strings: List[str]
+    _ids: Dict[str, int]
+
+    def __init__(self, strings: Optional[Iterable[str]] = None) -> None:
+        self._strings = []
+        self._ids = {}
+        for string in strings or []:
+            self.encode(string)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def encode(self, string: Optional[str]) -> int:
+        """
+        Args:
+            string (Optional[str]): String to encode
+
+        Returns:
+            int: Identifier of `string`, added to the table if new. -1 if null.
+        """
+        if string is None:
+            return -1
+        str_id = self._ids.get(string)
+        if str_id is None:
+            str_id = self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return str_id
+
+    def lookup(self, string: str) -> int:
+        """
+        Args:
+            string (str): String to look up
+
+        Returns:
+            int: Identifier of `string`, or -1 if it's not in the table
+        """
+        return self._ids.get(string, -1)
+
+    def decode(self, str_id: int) -> Optional[str]:
+        """
+        Args:
+            str_id (int): Identifier
+
+        Returns:
+            Optional[str]: The string, or None if `str_id` is -1
+        """
+        return None if str_id < 0 else self._strings[str_id]
+
+    def decode_array(self, str_ids: np.ndarray) -> np.ndarray:
+        """
+        Decodes a column of identifiers in one go
+
+        Args:
+            str_ids (np.ndarray): Identifiers
+
+        Returns:
+            np.ndarray: Array of objects, with None for -1
+        """
+        # Append a None, so that -1 indexes it
+        lookup = np.empty(len(self._strings) + 1, dtype=object)
+        lookup[:-1] = self._strings
+        lookup[-1] = None
+        return lookup[str_ids]
+
+    def to_list(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Strings, indexed by identifier
+        """
+        return list(self._strings)
@@ -1,5 +1,4 @@
 import json
-import os
 from os import path
 import time
 from typing import ClassVar, Dict, Optional
@@ -9,6 +8,7 @@ from pymongo import MongoClient
 from pymongo.database import Database
 
 import ProjUtils
+from dataset.Dataset import Dataset
 
 
 class MongoImporter(object):
@@ -18,15 +18,32 @@ class MongoImporter(object):
     Attributes:
         _database (Database): Reference to the connected database
         _json_loc (str): Relative location (from project) of the JSON files
+        _snapshot_loc (str): Relative location (from project) of the dataset snapshot
+        _is_indexed (bool): Whether the indices have been created
     """
     _CONNECTION_NAME: ClassVar[str] = 'connection.key'
 
     _database: Optional[Database]
     _json_loc: str
+    _snapshot_loc: str
+    _is_indexed: bool
 
-    def __init__(self, json_loc: str) -> None:
-        self._database = self._connect()
+    def __init__(self, json_loc: str, snapshot_loc: str,
+                 database: Optional[Database] = None, drop: bool = True) -> None:
+        """
+        Constructor
+
+        Args:
+            json_loc (str): Relative location (from project) of the JSON files
+            snapshot_loc (str): Relative location (from project) of the dataset snapshot
+            database (Optional[Database]): Database to import into, instead of
+                        connecting with `connection.key`. Its collections are not dropped.
+            drop (bool): Whether the collections of `connection.key`'s database are dropped
+        """
+        self._database = database if database is not None else self._connect(drop)
         self._json_loc = json_loc
+        self._snapshot_loc = snapshot_loc
+        self._is_indexed = False
 
     def run(self) -> None:
         print('------------------------------------------------')
@@ -38,11 +55,36 @@ class MongoImporter(object):
         print('\tDone in {:.2f} secs'.format(time.time() - curr_time))
         print('------------------------------------------------')
 
+    def upsert(self, data: Dict) -> None:
+        """
+        Imports a single file, replacing the blocks of its town and flat type
+
+        Args:
+            data (Dict): The JSON of a cleaned file
+        """
+        if not self._is_indexed:
+            self._create_indices()
+        collection = self._database['blocks']
+        for town, flat_type in sorted({(blk['town'], blk['flat_type'])
+                                       for blk in data['blocks']}):
+            collection.delete_many({'town': town, 'flat_type': flat_type})
+        # insert_many() adds an _id to each document, so copies are inserted
+        collection.insert_many([dict(_) for _ in data['blocks']])
+
+    def close(self) -> None:
+        """
+        Closes the database connection
+        """
+        self._close()
+
     @classmethod
-    def _connect(cls) -> Database:
+    def _connect(cls, drop: bool = True) -> Database:
         """
         Connects to the MongoDB database
 
+        Args:
+            drop (bool): Whether the collections are dropped
+
         Returns:
             Database: A reference to the database client
         """
@@ -66,8 +108,9 @@ class MongoImporter(object):
         # drop collections if database exist
         # PS: we don't drop database because we will lose user roles
         database = client.get_database(conn_json['database'])
-        for name in database.collection_names():
-            database.drop_collection(name)
+        if drop:
+            for name in database.collection_names():
+                database.drop_collection(name)
         return database
 
     def _close(self) -> None:
@@ -80,21 +123,15 @@ class MongoImporter(object):
 
     def _import_data(self) -> None:
         """
-        Imports the JSON files into MongoDB
+        Imports the JSON files into MongoDB, through the dataset snapshot
         """
         curr_time = time.time()
 
         # iterate through every file
-        json_path = path.join(os.getcwd(), self._json_loc)
-        for root, _, files in os.walk(json_path):
-            for file in files:
-                file_path = path.join(root, file)
-                file_json: Dict
-                with open(file_path) as fstream:
-                    file_json = json.load(fstream)
-
-                # load file into MongoDB
-                self._database['blocks'].insert_many(file_json['blocks'])
+        dataset = Dataset.load_cached(self._json_loc, self._snapshot_loc)
+        for _, file_json in dataset.to_documents():
+            # load file into MongoDB
+            self._database['blocks'].insert_many(file_json['blocks'])
         print('\tImport Data: {:.2f} secs'.format(time.time() - curr_time))
 
     def _create_indices(self):
@@ -109,4 +146,7 @@ class MongoImporter(object):
         to_index([('lat', pymongo.ASCENDING), ('long', pymongo.ASCENDING)])
         to_index('apartments.area')
         to_index('apartments.lease_price_list.price')
+        to_index([('amenities.category', pymongo.ASCENDING),
+                  ('amenities.distance', pymongo.ASCENDING)])
+        self._is_indexed = True
         print('\tIndexing {:.2f} secs'.format(time.time() - curr_time))
@@ -1,42 +1,84 @@
-import json
 import os
 from os import path
+import re
 import sqlite3
 from sqlite3 import Connection, Cursor
 import time
-from typing import ClassVar, Dict, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+import numpy as np
 
 import ProjUtils
+from dataset.Dataset import Dataset
 
 
 class SqliteImporter(object):
     """
     Helper class to import the data files into SQLite.
 
+    Rows are gathered per table, and inserted in batches by `executemany()`.
+    A full import is a bulk load: it runs in one transaction, with the PRAGMAs of
+    `_BULK_PRAGMAS`, and creates the secondary indexes of the schema only after
+    the rows are in. The PRAGMAs are then restored, and the tables analyzed.
+
+    Class Attributes:
+        _INSERTS (Dict[str, str]): INSERT statement of each table, in the order inserted
+        _BULK_PRAGMAS (Dict[str, Any]): PRAGMAs during a full import
+        _BATCH_ROWS (int): Max no. of rows of a table inserted at once
+        _INDEX_SQL (Pattern): Matches the secondary indexes of the schema
+
     Attributes:
         _conn (Connection): SQL database connection
         _sqlite_loc (str): SQLite database location
         _json_loc (str): JSON files location
+        _snapshot_loc (str): Dataset snapshot location
         _schema_loc (str): SQLite schema location
 
         _cached_date_id (int): Latest row id for Day table
+        _day_ids (Dict[Tuple, int]): Row id of each date in the Day table,
+                    keyed by (year, month, day, quarter, months_since)
         _cached_block_id (int): Latest row id for Block table
         _cached_apt_id (int): Latest row id for Apartment table
+        _rows (Dict[str, List[Tuple]]): Rows of each table, yet to be inserted
     """
     _instantiated: ClassVar[bool] = False
+    _INSERTS: ClassVar[Dict[str, str]] = {
+        'Day': 'INSERT INTO Day (day_id, year, month, day, quarter, months_since) \
+                VALUES (?,?,?,?,?,?)',
+        'Block': 'INSERT INTO Block VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
+        'Apartment': 'INSERT INTO Apartment VALUES (?,?,?,?,?,?)',
+        'Lease_Price': 'INSERT INTO Lease_Price VALUES (?,?,?)',
+        'Block_Amenity': 'INSERT INTO Block_Amenity VALUES (?,?,?,?,?)'
+    }
+    _BULK_PRAGMAS: ClassVar[Dict[str, Any]] = {
+        'journal_mode': 'MEMORY',  # the database is rebuilt if the import fails
+        'synchronous': 'OFF',
+        'cache_size': -262144  # in KiB, i.e. 256 MiB
+    }
+    _BATCH_ROWS: ClassVar[int] = 50000
+    _INDEX_SQL: ClassVar[Any] = re.compile(r'^CREATE INDEX [^;]*;', re.MULTILINE)
 
     _conn: Connection
     _sqlite_loc: str
     _json_loc: str
+    _snapshot_loc: str
     _schema_loc: str
 
     _cached_date_id: int
+    _day_ids: Dict[Tuple, int]
     _cached_block_id: int
     _cached_apt_id: int
+    _rows: Dict[str, List[Tuple]]
 
-    def __init__(self) -> None:
+    def __init__(self, sqlite_loc: Optional[str] = None, json_loc: Optional[str] = None,
+                 snapshot_loc: Optional[str] = None) -> None:
         """
-        Constructor
+        Constructor. Paths default to those in the project's data folder.
+
+        Args:
+            sqlite_loc (Optional[str]): SQLite database location
+            json_loc (Optional[str]): JSON files location
+            snapshot_loc (Optional[str]): Dataset snapshot location
         """
         # Singleton
         if SqliteImporter._instantiated:
@@ -45,17 +87,21 @@ class SqliteImporter(object):
         SqliteImporter._instantiated = True
 
         # set paths
-        self._sqlite_loc = path.join(
-            ProjUtils.get_project_path(), 'data', 'database.sqlite')
-        self._json_loc = path.join(
-            ProjUtils.get_project_path(), 'data', 'json')
+        def data_path(filename: str) -> str:
+            return path.join(ProjUtils.get_project_path(), 'data', filename)
+        self._sqlite_loc = sqlite_loc or data_path('database.sqlite')
+        self._json_loc = json_loc or data_path('json')
+        self._snapshot_loc = snapshot_loc or data_path('snapshot')
         self._schema_loc = path.join(
             ProjUtils.get_curr_folder_path(), 'schema.sql')
 
         # cached data
+        self._conn = None
         self._cached_date_id = 0
+        self._day_ids = {}
         self._cached_block_id = 0
         self._cached_apt_id = 0
+        self._rows = {table: [] for table in self._INSERTS}
 
     def run(self) -> None:
         """
@@ -64,26 +110,67 @@ class SqliteImporter(object):
         print('------------------------------------------------')
         print('[SqliteImporter]')
         curr_time = time.time()
-        self._create_db()
-
-        # Iterate through towns
-        town_paths = [path.join(self._json_loc, d) for d in os.listdir(
-            self._json_loc) if path.isdir(path.join(self._json_loc, d))]
-        for town_path in town_paths:
-            self._import_town(town_path)
+        index_sqls = self._create_db(defer_indexes=True)
+        cursor = self._conn.cursor()
+        pragmas = self._set_pragmas(cursor, self._BULK_PRAGMAS)
+        try:
+            dataset = Dataset.load_cached(self._json_loc, self._snapshot_loc)
+            self._import_dataset(cursor, dataset)
+            print('\tLoad: {:.2f} secs'.format(time.time() - curr_time))
+
+            index_time = time.time()
+            for index_sql in index_sqls:
+                cursor.execute(index_sql)
+            self._conn.commit()
+            cursor.execute('ANALYZE')
+            self._conn.commit()
+            print('\tIndex: {:.2f} secs'.format(time.time() - index_time))
+        except BaseException:
+            self._conn.rollback()
+            raise
+        finally:
+            self._set_pragmas(cursor, pragmas)
         print('\tDone in {:.2f} secs'.format(time.time() - curr_time))
         print('------------------------------------------------')
 
+    def upsert(self, data: Dict) -> None:
+        """
+        Imports a single file, replacing the blocks of its town and flat type.
+        The database is created if it doesn't exist, and is otherwise kept.
+
+        Args:
+            data (Dict): The JSON of a cleaned file
+        """
+        if self._conn is None:
+            self._open_db()
+        cursor = self._conn.cursor()
+        for town, flat_type in sorted({(blk['town'], blk['flat_type'])
+                                       for blk in data['blocks']}):
+            self._delete_blocks(cursor, town, flat_type)
+        for block_dict in data['blocks']:
+            self._import_block(block_dict)
+        self._flush(cursor)
+        cursor.connection.commit()
+
     def close(self) -> None:
         """
         Closes the database connection
         """
-        self._conn.close()
+        if self._conn is not None:
+            self._conn.close()
         self._conn = None
+        SqliteImporter._instantiated = False
 
-    def _create_db(self) -> None:
+    def _create_db(self, defer_indexes: bool = False) -> List[str]:
         """
         Creates the database
+
+        Args:
+            defer_indexes (bool): If True, the secondary indexes are not created,
+                        but returned to be created after a bulk load
+
+        Returns:
+            List[str]: CREATE INDEX statements deferred
         """
         # Creates database file if does not exist
         if path.exists(self._sqlite_loc):
@@ -91,50 +178,128 @@ class SqliteImporter(object):
 
         # Connect
         self._conn = sqlite3.connect(self._sqlite_loc)  # type: Connection
+        self._cached_date_id = 0
+        self._day_ids = {}
 
         # Create the schema
         with open(self._schema_loc, 'r') as fstream:
             schema_sql = fstream.read()
+        index_sqls = self._INDEX_SQL.findall(schema_sql) if defer_indexes else []
+        if defer_indexes:
+            schema_sql = self._INDEX_SQL.sub('', schema_sql)
         self._conn.executescript(schema_sql)
         self._conn.commit()
+        return index_sqls
 
-    def _import_town(self, town_path: str) -> None:
+    @staticmethod
+    def _set_pragmas(cursor: Cursor, pragmas: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Creates town based on given town directory path
+        Sets PRAGMAs of the connection, outside of a transaction
 
         Args:
-            town_path (str): absolute path to a town directory
-        """
-        cursor = self._conn.cursor()
-
-        # Iterate through flat types
-        flat_type_paths = [path.join(town_path, t)
-                           for t in os.listdir(town_path)]
-        for flat_type_path in flat_type_paths:
+            cursor (Cursor): cursor to the database connection
+            pragmas (Dict[str, Any]): Value of each PRAGMA
 
-            # Open doc
-            with open(flat_type_path, 'r') as fstream:
-                root = json.load(fstream)
+        Returns:
+            Dict[str, Any]: Previous value of each PRAGMA, to restore them
+        """
+        previous = {}
+        for name, value in pragmas.items():
+            previous[name] = cursor.execute('PRAGMA {}'.format(name)).fetchone()[0]
+            cursor.execute('PRAGMA {} = {}'.format(name, value))
+        return previous
 
-            # Iterate through blocks
-            for block_dict in root['blocks']:
-                self._import_block(cursor, block_dict)
+    def _open_db(self) -> None:
+        """
+        Connects to the database without clearing it, creating it if it doesn't exist
+        """
+        if not path.exists(self._sqlite_loc):
+            self._create_db()
+            return
 
-        cursor.connection.commit()
+        self._conn = sqlite3.connect(self._sqlite_loc)  # type: Connection
+        cursor = self._conn.cursor()
+        self._cached_date_id = cursor.execute(
+            'SELECT IFNULL(MAX(day_id), 0) FROM Day').fetchone()[0]
+        self._day_ids = {tuple(row[1:]): row[0] for row in cursor.execute(
+            'SELECT day_id, year, month, day, quarter, months_since FROM Day')}
+        self._cached_block_id = cursor.execute(
+            'SELECT IFNULL(MAX(block_id), 0) FROM Block').fetchone()[0]
+        self._cached_apt_id = cursor.execute(
+            'SELECT IFNULL(MAX(apartment_id), 0) FROM Apartment').fetchone()[0]
+
+    @staticmethod
+    def _delete_blocks(cursor: Cursor, town: str, flat_type: str) -> None:
+        """
+        Deletes the blocks of a town and flat type, with their apartments,
+        lease prices and amenities. Dates are shared with other blocks, so they're kept.
 
-    def _import_block(self, cursor: Cursor, block_dict: Dict) -> None:
+        Args:
+            cursor (Cursor): cursor to the database connection
+            town (str): The town
+            flat_type (str): The flat type
+        """
+        blocks_sql = 'SELECT block_id FROM Block WHERE town_name = ? AND flat_type = ?'
+        params = (town, flat_type)
+        cursor.execute('DELETE FROM Lease_Price WHERE apartment_id IN \
+                        (SELECT apartment_id FROM Apartment WHERE block_id IN ({}))'
+                       .format(blocks_sql), params)
+        cursor.execute('DELETE FROM Apartment WHERE block_id IN ({})'.format(blocks_sql),
+                       params)
+        cursor.execute('DELETE FROM Block_Amenity WHERE block_id IN ({})'.format(blocks_sql),
+                       params)
+        cursor.execute('DELETE FROM Block WHERE town_name = ? AND flat_type = ?', params)
+
+    def _import_dataset(self, cursor: Cursor, dataset: Dataset) -> None:
         """
-        Creates block based on given block dictionary object
+        Imports all blocks of the dataset. The apartments and lease prices, which are
+        most of the rows, are inserted straight from the columns of the dataset.
 
         Args:
             cursor (Cursor): cursor to the database connection
+            dataset (Dataset): The dataset
+        """
+        # Blocks are imported in the dataset's order, so their ids follow its rows
+        block_base, apt_base = self._cached_block_id, self._cached_apt_id
+        for _, root in dataset.to_documents(with_apartments=False):
+            for block_dict in root['blocks']:
+                self._import_block(block_dict, with_apartments=False)
+            if max(len(_) for _ in self._rows.values()) >= self._BATCH_ROWS:
+                self._flush(cursor)
+        self._flush(cursor)
+
+        apts = dataset.apartments
+        leases = dataset.leases
+        lease = leases['lease'].astype(np.int64)
+        is_raw = leases['lease_kind'] != Dataset.PARSED
+        lease[is_raw] = [int(dataset.strings.decode(_)) for _ in leases['lease_raw'][is_raw]]
+        columns = {
+            'Apartment': (block_base + 1 + apts['block'], apt_base + 1 + np.arange(len(apts)),
+                          apts['floor'], apts['unit'], apts['area'].astype(np.int64),
+                          apts['is_repurchased']),
+            'Lease_Price': (apt_base + 1 + leases['apartment'], lease, leases['price'])
+        }
+        for table, table_columns in columns.items():
+            for start in range(0, len(table_columns[0]), self._BATCH_ROWS):
+                stop = start + self._BATCH_ROWS
+                cursor.executemany(self._INSERTS[table],
+                                   zip(*(_[start:stop].tolist() for _ in table_columns)))
+        self._cached_apt_id += len(apts)
+
+    def _import_block(self, block_dict: Dict, with_apartments: bool = True) -> None:
+        """
+        Gathers the rows of a block, based on given block dictionary object.
+        They're inserted by `_flush()`.
+
+        Args:
             block_dict (Dict): Block dictionary
+            with_apartments (bool): If False, the apartments are imported separately
         """
 
         # Insert dates
-        pcd_id = self._import_dates(cursor, block_dict['pcd_date'])
-        dpd_id = self._import_dates(cursor, block_dict['dpd_date'])
-        lcd_id = self._import_dates(cursor, block_dict['lcd_date'])
+        pcd_id = self._import_dates(block_dict['pcd_date'])
+        dpd_id = self._import_dates(block_dict['dpd_date'])
+        lcd_id = self._import_dates(block_dict['lcd_date'])
 
         # Insert block's fields
         town = block_dict['town']
@@ -149,40 +314,42 @@ class SqliteImporter(object):
         quota_c = int(block_dict['quota_chinese'])
         quota_o = int(block_dict['quota_other'])
         self._cached_block_id += 1
-        try:
-            cursor.execute('INSERT INTO Block VALUES \
-                            (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)',
-                           (town, title, self._cached_block_id,
-                            flat_type, block_num, street, postal,
-                            lat, lng, pcd_id, dpd_id, lcd_id,
-                            quota_m, quota_c, quota_o))
-        except Exception as expt:
-            raise expt
+        self._rows['Block'].append((town, title, self._cached_block_id,
+                                    flat_type, block_num, street, postal,
+                                    lat, lng, pcd_id, dpd_id, lcd_id,
+                                    quota_m, quota_c, quota_o))
 
         # Insert Apartments
-        for apartment in block_dict['apartments']:
+        for apartment in block_dict['apartments'] if with_apartments else ():
             floor = int(apartment['floor'])
             unit = apartment['unit']
             area = int(apartment['area'])
             repurchased = bool(apartment['is_repurchased'])
             self._cached_apt_id += 1
-            cursor.execute('INSERT INTO Apartment VALUES (?,?,?,?,?,?)',
-                           (self._cached_block_id, self._cached_apt_id,
-                            floor, unit, area, repurchased))
+            self._rows['Apartment'].append((self._cached_block_id, self._cached_apt_id,
+                                            floor, unit, area, repurchased))
 
             # Insert Lease_Price
             for lease_price in apartment['lease_price_list']:
                 lease = int(lease_price['lease'])
                 price = int(lease_price['price'])
-                cursor.execute('INSERT INTO Lease_Price VALUES (?,?,?)',
-                               (self._cached_apt_id, lease, price))
-
-    def _import_dates(self, cursor: Cursor, date_dict: Optional[dict]) -> Optional[int]:
+                self._rows['Lease_Price'].append((self._cached_apt_id, lease, price))
+
+        # Insert Block_Amenity, ranked within each category
+        ranks: Dict[str, int] = {}
+        for amenity in block_dict.get('amenities', ()):
+            category = amenity['category']
+            ranks[category] = ranks.get(category, 0) + 1
+            self._rows['Block_Amenity'].append((self._cached_block_id, category,
+                                                ranks[category], amenity['name'],
+                                                int(amenity['distance'])))
+
+    def _import_dates(self, date_dict: Optional[dict]) -> Optional[int]:
         """
-        Stores a date into the database, returning the date identifier
+        Stores a date into the database, returning the date identifier.
+        Each distinct date is stored once, and shared by the blocks.
 
         Args:
-            cursor (Cursor): cursor to the database connection
             date_dict (dict): A dictionary representing dates
 
         Returns:
@@ -191,13 +358,27 @@ class SqliteImporter(object):
         if not date_dict:
             return None
 
-        self._cached_date_id += 1
-        cursor.execute('INSERT INTO Day (day_id, year, month, day, quarter, months_since) \
-                        VALUES (?,?,?,?,?,?)',
-                       (self._cached_date_id,
-                        date_dict['year'],
-                        date_dict['month'],
-                        date_dict['day'],
-                        date_dict['quarter'],
-                        date_dict['months_since']))
-        return self._cached_date_id
+        key = (date_dict['year'],
+               date_dict['month'],
+               date_dict['day'],
+               date_dict['quarter'],
+               date_dict['months_since'])
+        day_id = self._day_ids.get(key)
+        if day_id is None:
+            self._cached_date_id += 1
+            day_id = self._day_ids[key] = self._cached_date_id
+            self._rows['Day'].append((day_id,) + key)
+        return day_id
+
+    def _flush(self, cursor: Cursor) -> None:
+        """
+        Inserts the rows gathered, a batch per table
+
+        Args:
+            cursor (Cursor): cursor to the database connection
+        """
+        for table, insert_sql in self._INSERTS.items():
+            rows = self._rows[table]
+            if rows:
+                cursor.executemany(insert_sql, rows)
+                rows.clear()
@@ -5,6 +5,7 @@ DROP TABLE IF EXISTS Day;
 DROP TABLE IF EXISTS Block;
 DROP TABLE IF EXISTS Apartment;
 DROP TABLE IF EXISTS Lease_Price;
+DROP TABLE IF EXISTS Block_Amenity;
 COMMIT;
 VACUUM;
 
@@ -23,6 +24,10 @@ CREATE TABLE IF NOT EXISTS Day (
     months_since SMALLINT(4) NOT NULL,
     PRIMARY KEY(day_id)
 );
+-- each date is stored once, and shared by the blocks
+-- IFNULL, as NULLs are never equal in a UNIQUE constraint
+CREATE UNIQUE INDEX IF NOT EXISTS Day_date ON Day(
+    year, IFNULL(month, 0), IFNULL(day, 0), IFNULL(quarter, 0), months_since);
 
 
 CREATE TABLE IF NOT EXISTS Block (
@@ -81,4 +86,17 @@ CREATE TABLE IF NOT EXISTS Lease_Price (
 );
 -- no lease - most queries will target >50%
 CREATE INDEX IF NOT EXISTS Lease_Price_price ON Lease_Price(price);
+
+
+CREATE TABLE IF NOT EXISTS Block_Amenity (
+    block_id INT(10) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    rank TINYINT(1) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    distance INT(10) NOT NULL,
+    PRIMARY KEY(block_id, category, rank),
+    FOREIGN KEY(block_id) REFERENCES Block(block_id)
+);
+-- e.g. blocks within 500m of an MRT station
+CREATE INDEX IF NOT EXISTS Block_Amenity_category_distance ON Block_Amenity(category, distance);
 COMMIT;
\ No newline at end of file
@@ -0,0 +1,252 @@
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+import os
+from os import path
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from storage.DocumentIO import DocumentIO
+from storage.IOStats import IOStats
+
+_FuncKey = Tuple[str, int, str]
+_thread_time = getattr(time, 'thread_time', time.process_time)  # Python 3.7+
+
+
+class StepProfiler(object):
+    """
+    Records the wall time, CPU time and I/O of each named step of a run.
+    cProfile and tracemalloc can be turned on for every step, without editing code,
+    through the environment variable CLEANER_PROFILE (e.g. cprofile,tracemalloc).
+
+    The report is saved as `report.json` in the report folder. With cProfile,
+    each step also gets `<no>-<step>.collapsed`, whose lines are `frame;frame;frame <usecs>`,
+    as read by flamegraph.pl and speedscope.
+
+    Steps may run on several threads at once, e.g. the stages of the Orchestrator.
+    cProfile only sees the thread that runs the step, so a step is profiled on its own thread.
+
+    Class Attributes:
+        ENV_VAR (str): Environment variable of the modes
+        CPROFILE (str): Mode that runs cProfile on each step
+        TRACEMALLOC (str): Mode that traces the memory allocations of each step
+        _TOP_N (int): No. of functions or allocation sites listed per step
+
+    Attributes:
+        report_loc (str): Folder of the report
+        modes (List[str]): Modes that are on
+        steps (List[Dict[str, Any]]): Records of the steps that have run
+        sections (Dict[str, Any]): Other details of the run, keyed by name
+        _start (float): Start of the run, in `time.perf_counter()` secs
+        _created (str): Start of the run, as a timestamp
+        _lock (threading.Lock): Guards `steps`
+    """
+    ENV_VAR: ClassVar[str] = 'CLEANER_PROFILE'
+    CPROFILE: ClassVar[str] = 'cprofile'
+    TRACEMALLOC: ClassVar[str] = 'tracemalloc'
+    _MODES: ClassVar[Tuple[str, ...]] = (CPROFILE, TRACEMALLOC)
+    _TOP_N: ClassVar[int] = 10
+
+    report_loc: str
+    modes: List[str]
+    steps: List[Dict[str, Any]]
+    sections: Dict[str, Any]
+    _start: float
+    _created: str
+    _lock: threading.Lock
+
+    def __init__(self, report_loc: str, modes: Optional[Iterable[str]] = None) -> None:
+        """
+        Constructor
+
+        Args:
+            report_loc (str): Folder of the report
+            modes (Optional[Iterable[str]]): CPROFILE and/or TRACEMALLOC.
+                        Read from the environment variable if not given.
+        """
+        if modes is None:
+            modes = [_ for _ in os.environ.get(self.ENV_VAR, '').split(',') if _.strip()]
+        self.modes = [_.strip().lower() for _ in modes]
+        for mode in self.modes:
+            if mode not in self._MODES:
+                raise ValueError('Unknown profiling mode {}'.format(mode))
+
+        self.report_loc = report_loc
+        self.steps = []
+        self.sections = {}
+        self._start = time.perf_counter()
+        self._created = str(datetime.now())
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str, per_thread: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Profiles the code within the `with` block as a step
+
+        Args:
+            name (str): Name of the step
+            per_thread (bool): If True, the CPU time and I/O are of the calling thread only,
+                        for a step that runs alongside others. Else they're process-wide.
+
+        Returns:
+            Iterator[Dict[str, Any]]: The step's record. More details can be added to it.
+        """
+        record: Dict[str, Any] = {'name': name}
+        profiler = cProfile.Profile() if self.CPROFILE in self.modes else None
+        is_tracing = self.TRACEMALLOC in self.modes and not tracemalloc.is_tracing()
+
+        io_snapshot = IOStats.thread_snapshot if per_thread else IOStats.snapshot
+        cpu_time = _thread_time if per_thread else time.process_time
+        io_before = io_snapshot()
+        if is_tracing:
+            tracemalloc.start()
+        cpu_start = cpu_time()
+        wall_start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+            wall_end = time.perf_counter()
+            record['start'] = wall_start - self._start
+            record['wall'] = wall_end - wall_start
+            record['cpu'] = cpu_time() - cpu_start
+            io_after = io_snapshot()
+            for key, value in io_after.items():
+                record[key] = value - io_before[key]
+
+            if is_tracing:
+                record['memory'] = self._trace_memory()
+                tracemalloc.stop()
+            with self._lock:
+                if profiler:
+                    record['cprofile'] = self._save_profile(name, profiler)
+                self.steps.append(record)
+
+    def add_section(self, name: str, value: Any) -> None:
+        """
+        Adds other details of the run to the report, e.g. a timeline
+
+        Args:
+            name (str): Name of the section
+            value (Any): JSON-serialisable details
+        """
+        self.sections[name] = value
+
+    def save(self) -> str:
+        """
+        Saves the report
+
+        Returns:
+            str: Path to the report
+        """
+        if not path.exists(self.report_loc):
+            os.makedirs(self.report_loc)
+        report_path = path.join(self.report_loc, 'report.json')
+        report = {'created': self._created,
+                  'modes': self.modes,
+                  'wall': time.perf_counter() - self._start,
+                  'steps': self.steps}
+        report.update(self.sections)
+        DocumentIO.dump(report_path, report, DocumentIO.PRETTY)
+        return report_path
+
+    def _trace_memory(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: Peak traced memory, and the top allocation sites still held
+        """
+        _, peak = tracemalloc.get_traced_memory()
+        top_stats = tracemalloc.take_snapshot().statistics('lineno')[:self._TOP_N]
+        return {'peak_bytes': peak,
+                'top': [{'site': str(_.traceback), 'bytes': _.size, 'count': _.count}
+                        for _ in top_stats]}
+
+    def _save_profile(self, name: str, profiler: cProfile.Profile) -> Dict[str, Any]:
+        """
+        Saves the collapsed stacks of a step
+
+        Returns:
+            Dict[str, Any]: Filename of the collapsed stacks,
+                        and the top functions by cumulative time
+        """
+        if not path.exists(self.report_loc):
+            os.makedirs(self.report_loc)
+        stats = pstats.Stats(profiler).stats  # type: ignore
+        filename = '{:02d}-{}.collapsed'.format(len(self.steps), re.sub(r'[^\w.-]+', '_', name))
+        collapsed_path = path.join(self.report_loc, filename)
+        with open(collapsed_path, 'w') as fstream:
+            for stack, usecs in sorted(_collapse(stats).items()):
+                fstream.write('{} {}\n'.format(stack, usecs))
+
+        by_cumtime = sorted(stats.items(), key=lambda _: _[1][3], reverse=True)
+        return {'collapsed': path.basename(collapsed_path),
+                'top': [{'function': _label(func), 'calls': stat[1],
+                         'tottime': stat[2], 'cumtime': stat[3]}
+                        for func, stat in by_cumtime[:self._TOP_N]]}
+
+
+def _label(func: _FuncKey) -> str:
+    """
+    Returns:
+        str: `function (file:line)`, without the semicolons that delimit frames
+    """
+    filename, lineno, funcname = func
+    if filename == '~':  # built-in
+        return funcname.replace(';', ',')
+    return '{} ({}:{})'.format(funcname, path.basename(filename), lineno).replace(';', ',')
+
+
+def _collapse(stats: Dict[_FuncKey, tuple]) -> Dict[str, int]:
+    """
+    Rebuilds call stacks from cProfile's caller-callee edges.
+    The time of a function is split across its callers in proportion to the
+    cumulative time of each edge. Recursive calls are cut off.
+    Only the thread of the step is profiled, so the prefetching threads are not in the stacks.
+
+    Args:
+        stats (Dict[_FuncKey, tuple]): `pstats.Stats.stats`
+
+    Returns:
+        Dict[str, int]: Self time in microseconds, keyed by `;`-joined stack
+    """
+    callees: Dict[_FuncKey, List[Tuple[_FuncKey, float]]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    collapsed: Dict[str, int] = {}
+
+    def visit(func: _FuncKey, stack: List[str], on_stack: Set[_FuncKey], share: float) -> None:
+        """
+        Args:
+            share (float): Fraction of the time of `func` that is spent in this stack
+        """
+        tottime, cumtime = stats[func][2:4]
+        if cumtime * share < 1e-6:  # prunes the paths that are too short to show
+            return
+        stack.append(_label(func))
+        on_stack.add(func)
+
+        usecs = int(tottime * share * 1e6)
+        if usecs > 0:
+            key = ';'.join(stack)
+            collapsed[key] = collapsed.get(key, 0) + usecs
+        for callee, edge_cumtime in callees.get(func, []):
+            callee_cumtime = stats[callee][3]
+            if callee not in on_stack and callee_cumtime > 0:
+                visit(callee, stack, on_stack, share * edge_cumtime / callee_cumtime)
+
+        on_stack.discard(func)
+        stack.pop()
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            visit(func, [], set(), 1.0)
+    return collapsed
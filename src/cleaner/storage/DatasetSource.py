@@ -0,0 +1,45 @@
+"""
+Opens the documents of the data folder, however they are stored.
+"""
+from os import path
+
+from .DirectorySource import DirectorySource
+from .IDatasetSource import IDatasetSource
+from .NdjsonSource import NdjsonSource
+from .ZipSource import ZipSource
+
+
+def open_source(location: str) -> IDatasetSource:
+    """
+    Picks the source by the extension of `location`:
+        .zip                            -> ZipSource
+        .ndjson, .jsonl (.gz or .xz)    -> NdjsonSource
+        anything else                   -> DirectorySource
+
+    Args:
+        location (str): location of JSON folder, or of the container
+
+    Returns:
+        IDatasetSource: The source
+    """
+    name = path.basename(location).lower()
+    for ext in ('.gz', '.xz'):
+        if name.endswith(ext):
+            name = name[:-len(ext)]
+
+    if name.endswith('.zip'):
+        return ZipSource(location)
+    if name.endswith('.ndjson') or name.endswith('.jsonl'):
+        return NdjsonSource(location)
+    return DirectorySource(location)
+
+
+def export(src_loc: str, dst_loc: str) -> None:
+    """
+    Copies every document from one source to another, e.g. into a compressed container
+
+    Args:
+        src_loc (str): location to read from
+        dst_loc (str): location to write to
+    """
+    open_source(dst_loc).write_documents(open_source(src_loc).iter_documents())
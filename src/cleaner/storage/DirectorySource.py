@@ -0,0 +1,116 @@
+import os
+from os import path
+from typing import Any, Callable, ClassVar, Iterable, Iterator, Optional, Tuple
+
+from .DocumentIO import DocumentIO
+from .IDatasetSource import IDatasetSource
+from .Prefetcher import Prefetcher
+
+
+class DirectorySource(IDatasetSource):
+    """
+    Documents stored as files in a folder, e.g. data/json/Bedok/3-Room.json.
+    The next files are read ahead on background threads, and modified files are
+    written behind, so that processing a document does not wait on the disk.
+
+    Class Attributes:
+        prefetch_depth (int): No. of files read ahead, and written behind.
+                    0 does all I/O in the calling thread.
+    """
+    prefetch_depth: ClassVar[int] = 8
+
+    @classmethod
+    def set_prefetch_depth(cls, depth: int) -> None:
+        """
+        Sets the no. of files read ahead, and written behind
+
+        Args:
+            depth (int): Queue depth. 0 disables prefetching.
+        """
+        if depth < 0:
+            raise ValueError('Prefetch depth cannot be negative, not {}'.format(depth))
+        cls.prefetch_depth = depth
+
+    def iter_documents(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterates through the files of the folder, in a stable order
+
+        Returns:
+            Iterator[Tuple[str, Any]]: Relative path, and its document
+        """
+        if not self.prefetch_depth:
+            yield from self._iter_loaded(None)
+            return
+        with Prefetcher(self.prefetch_depth) as prefetcher:
+            yield from self._iter_loaded(prefetcher)
+
+    def write_documents(self, documents: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Writes each document to its own file. Other files are left as they are.
+
+        Args:
+            documents (Iterable[Tuple[str, Any]]): Relative path, and its document
+        """
+        if not self.prefetch_depth:
+            for rel_path, data in documents:
+                self._write(rel_path, data)
+            return
+        with Prefetcher(self.prefetch_depth) as prefetcher:
+            for rel_path, data in documents:
+                prefetcher.write_behind(self._write, rel_path, data)
+
+    @property
+    def is_container(self) -> bool:
+        return False
+
+    def transform(self, func: Callable[[Any], Tuple[bool, Any]]) -> int:
+        """
+        Applies `func` on every document, writing each modified file right away
+
+        Args:
+            func (Callable[[Any], Tuple[bool, Any]]): Given a document, returns whether
+                        a change was made, and the changed document
+
+        Returns:
+            int: No. of documents modified
+        """
+        if not self.prefetch_depth:
+            return self._transform(func, None)
+        with Prefetcher(self.prefetch_depth) as prefetcher:
+            return self._transform(func, prefetcher)
+
+    def _transform(self, func: Callable[[Any], Tuple[bool, Any]],
+                   prefetcher: Optional[Prefetcher]) -> int:
+        """
+        Applies `func` on every document, writing behind with `prefetcher` if given
+        """
+        modified = 0
+        for rel_path, data in self._iter_announced(self._iter_loaded(prefetcher)):
+            is_dirty, data = func(data)
+            if is_dirty:
+                modified += 1
+                if prefetcher:
+                    prefetcher.write_behind(self._write, rel_path, data)
+                else:
+                    self._write(rel_path, data)
+        return modified
+
+    def _iter_loaded(self, prefetcher: Optional[Prefetcher]) -> Iterator[Tuple[str, Any]]:
+        """
+        Loads the files, reading ahead with `prefetcher` if given
+        """
+        filepaths = (filepath for filepath, _ in DocumentIO.walk(self.location))
+        loaded = prefetcher.read_ahead(filepaths, DocumentIO.load) if prefetcher \
+            else ((_, DocumentIO.load(_)) for _ in filepaths)
+        for filepath, data in loaded:
+            yield path.relpath(filepath, self.location), data
+
+    def _write(self, rel_path: str, data: Any) -> None:
+        """
+        Writes a document to its file, creating the directory if needed
+        """
+        filepath = path.join(self.location, rel_path)
+        folder = path.dirname(filepath)
+        if not path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        DocumentIO.dump(filepath, data)
@@ -0,0 +1,213 @@
+from contextlib import contextmanager
+import json
+import os
+from os import path
+import tempfile
+from typing import Any, ClassVar, Iterator, Optional, Tuple
+
+from .IOStats import IOStats
+
+
+def _current_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+class DocumentIO(object):
+    """
+    Reads and writes the JSON documents of the data folder.
+
+    Writes go to a temporary file that is fsync-ed and renamed over the target,
+    so an interrupted run never leaves a truncated file behind. Writes are skipped
+    if the serialised bytes are the same as what is already on disk.
+
+    Class Attributes:
+        COMPACT (str): JSON without whitespace
+        PRETTY (str): JSON indented by 4 spaces, as written by the scraper
+        NDJSON (str): One block per line
+        encoding (str): Encoding used for writes
+        _TEMP_PREFIX (str): Prefix of temporary files, which are hidden from `walk()`
+        _NEW_FILE_MODE (int): Permissions of new files, as `open()` would have created them
+    """
+    COMPACT: ClassVar[str] = 'compact'
+    PRETTY: ClassVar[str] = 'pretty'
+    NDJSON: ClassVar[str] = 'ndjson'
+    _ENCODINGS: ClassVar[Tuple[str, ...]] = (COMPACT, PRETTY, NDJSON)
+    _TEMP_PREFIX: ClassVar[str] = '.~'
+    _NEW_FILE_MODE: ClassVar[int] = 0o666 & ~_current_umask()
+
+    encoding: ClassVar[str] = PRETTY
+
+    @classmethod
+    def set_encoding(cls, encoding: str) -> None:
+        """
+        Sets the encoding used for writes. Reads detect the encoding by themselves.
+
+        Args:
+            encoding (str): One of COMPACT, PRETTY or NDJSON
+        """
+        if encoding not in cls._ENCODINGS:
+            raise ValueError('Unknown encoding {}'.format(encoding))
+        cls.encoding = encoding
+
+    @classmethod
+    def walk(cls, json_loc: str) -> Iterator[Tuple[str, str]]:
+        """
+        Iterates through the files of a folder, in a stable order
+
+        Args:
+            json_loc (str): location of JSON folder
+
+        Returns:
+            Iterator[Tuple[str, str]]: Path to each file, and its directory
+        """
+        for root, dirs, filenames in os.walk(json_loc):
+            dirs.sort()
+            for filename in sorted(filenames):
+                if not filename.startswith(cls._TEMP_PREFIX):
+                    yield path.join(root, filename), root
+
+    @classmethod
+    def load(cls, filepath: str) -> Any:
+        """
+        Reads a document
+
+        Args:
+            filepath (str): Path to the file
+
+        Returns:
+            Any: The document
+        """
+        with open(filepath, 'rb') as fstream:
+            content = fstream.read()
+        IOStats.add_read(len(content))
+        return cls.decode(content)
+
+    @classmethod
+    def dump(cls, filepath: str, data: Any, encoding: Optional[str] = None) -> bool:
+        """
+        Atomically writes a document, if it differs from the file's current content
+
+        Args:
+            filepath (str): Path to the file
+            data (Any): The document
+            encoding (Optional[str]): Overrides `encoding` for this write
+
+        Returns:
+            bool: Whether the file was written
+        """
+        content = cls.encode(data, encoding or cls.encoding)
+
+        # Skip if unchanged
+        if path.exists(filepath) and path.getsize(filepath) == len(content):
+            with open(filepath, 'rb') as fstream:
+                if fstream.read() == content:
+                    return False
+
+        with cls.atomic_write(filepath) as temp_path:
+            with open(temp_path, 'wb') as fstream:
+                fstream.write(content)
+        IOStats.add_write(len(content))
+        return True
+
+    @classmethod
+    @contextmanager
+    def atomic_write(cls, filepath: str, mode: Optional[int] = None) -> Iterator[str]:
+        """
+        Gives a temporary file in the same folder to write in place of `filepath`.
+        After the `with` block, it is fsync-ed and renamed over `filepath`,
+        keeping its permissions. It is removed instead if the block raises.
+
+        Args:
+            filepath (str): Path to the file
+            mode (Optional[int]): Permissions of the file, e.g. 0o600 for secrets.
+                        If not given, those of the current file, or as `open()` would create.
+
+        Returns:
+            Iterator[str]: Path to the temporary file
+        """
+        # mkstemp() creates files that only the owner can read
+        if mode is None:
+            mode = os.stat(filepath).st_mode & 0o777 if path.exists(filepath) \
+                else cls._NEW_FILE_MODE
+
+        folder, filename = path.split(filepath)
+        fdesc, temp_path = tempfile.mkstemp(
+            prefix=cls._TEMP_PREFIX + filename, suffix='.tmp', dir=folder or '.')
+        os.close(fdesc)
+        try:
+            os.chmod(temp_path, mode)
+            yield temp_path
+            fdesc = os.open(temp_path, os.O_RDWR)
+            try:
+                os.fsync(fdesc)
+            finally:
+                os.close(fdesc)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            if path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        cls._fsync_dir(folder)
+
+    @classmethod
+    def encode(cls, data: Any, encoding: str) -> bytes:
+        """
+        Serialises a document
+
+        Args:
+            data (Any): The document
+            encoding (str): One of COMPACT, PRETTY or NDJSON
+
+        Returns:
+            bytes: UTF-8 content
+        """
+        text: str
+        if encoding == cls.COMPACT:
+            text = json.dumps(data, separators=(',', ':'))
+        elif encoding == cls.PRETTY:
+            text = json.dumps(data, indent=4)
+        elif encoding == cls.NDJSON:
+            blocks = data if isinstance(data, list) else data['blocks']
+            text = ''.join(json.dumps(_, separators=(',', ':')) + '\n' for _ in blocks)
+        else:
+            raise ValueError('Unknown encoding {}'.format(encoding))
+        return text.encode('utf-8')
+
+    @staticmethod
+    def decode(content: bytes) -> Any:
+        """
+        Deserialises a document, detecting its encoding.
+        NDJSON is read back as a document of blocks. An empty content is read as NDJSON.
+
+        Args:
+            content (bytes): UTF-8 content
+
+        Returns:
+            Any: The document
+        """
+        text = content.decode('utf-8')
+        try:
+            data = json.loads(text)
+            # NDJSON of a single block is also a valid JSON
+            if not (isinstance(data, dict) and 'apartments' in data):
+                return data
+        except ValueError:
+            pass
+
+        # One block per line
+        return {'blocks': [json.loads(_) for _ in text.splitlines() if _.strip()]}
+
+    @staticmethod
+    def _fsync_dir(folder: str) -> None:
+        """
+        Persists the rename. Not supported on Windows, where it's skipped.
+        """
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fdesc = os.open(folder or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fdesc)
+        finally:
+            os.close(fdesc)
@@ -0,0 +1,84 @@
+import abc
+from os import path
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+
+class IDatasetSource(object, metaclass=abc.ABCMeta):
+    """
+    Abstract class for inheritance.
+    A source of documents, each keyed by its path relative to the JSON folder
+    (e.g. Bedok/3-Room.json), regardless of how they are stored.
+
+    Attributes:
+        location (str): Location of the source
+    """
+    location: str
+
+    def __init__(self, location: str) -> None:
+        self.location = location
+
+    @abc.abstractmethod
+    def iter_documents(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterates through the documents, in a stable order
+
+        Returns:
+            Iterator[Tuple[str, Any]]: Relative path, and its document
+        """
+        pass
+
+    @abc.abstractmethod
+    def write_documents(self, documents: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Writes the documents. A container is rewritten to hold exactly the given
+        documents, whereas a directory only writes the given files.
+
+        Args:
+            documents (Iterable[Tuple[str, Any]]): Relative path, and its document
+        """
+        pass
+
+    @property
+    def is_container(self) -> bool:
+        """
+        Returns:
+            bool: True if all documents are stored in a single file
+        """
+        return True
+
+    def transform(self, func: Callable[[Any], Tuple[bool, Any]]) -> int:
+        """
+        Applies `func` on every document, and saves the documents that it modified.
+        A container is rewritten once at the end, if anything was modified.
+
+        Args:
+            func (Callable[[Any], Tuple[bool, Any]]): Given a document, returns whether
+                        a change was made, and the changed document
+
+        Returns:
+            int: No. of documents modified
+        """
+        documents: List[Tuple[str, Any]] = []
+        modified = 0
+        for rel_path, data in self._iter_announced(self.iter_documents()):
+            is_dirty, data = func(data)
+            if is_dirty:
+                modified += 1
+            documents.append((rel_path, data))
+
+        if modified:
+            self.write_documents(documents)
+        return modified
+
+    def _iter_announced(self, documents: Iterable[Tuple[str, Any]]) \
+            -> Iterator[Tuple[str, Any]]:
+        """
+        Passes the documents through, announcing each new directory
+        """
+        curr_dir = None
+        for rel_path, data in documents:
+            rel_dir = path.dirname(rel_path)
+            if rel_dir != curr_dir:
+                curr_dir = rel_dir
+                print('Running directory {}'.format(path.join(self.location, rel_dir)))
+            yield rel_path, data
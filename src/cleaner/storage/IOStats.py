@@ -0,0 +1,81 @@
+import threading
+from typing import ClassVar, Dict
+
+
+class IOStats(object):
+    """
+    Process-wide counters of the files and bytes read and written by the storage layer.
+    Safe to update from the prefetching threads. Each thread also has its own counters,
+    for the I/O of work that runs alongside other work.
+
+    Class Attributes:
+        _lock (threading.Lock): Guards the counters
+        _counters (Dict[str, int]): files_read, bytes_read, files_written, bytes_written
+        _local (threading.local): `counters` of the current thread, like `_counters`
+    """
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _counters: ClassVar[Dict[str, int]] = {
+        'files_read': 0,
+        'bytes_read': 0,
+        'files_written': 0,
+        'bytes_written': 0
+    }
+    _local: ClassVar[threading.local] = threading.local()
+
+    @classmethod
+    def add_read(cls, nbytes: int) -> None:
+        """
+        Counts a file read
+
+        Args:
+            nbytes (int): Size of the file
+        """
+        with cls._lock:
+            cls._counters['files_read'] += 1
+            cls._counters['bytes_read'] += nbytes
+        counters = cls._thread_counters()
+        counters['files_read'] += 1
+        counters['bytes_read'] += nbytes
+
+    @classmethod
+    def add_write(cls, nbytes: int) -> None:
+        """
+        Counts a file written
+
+        Args:
+            nbytes (int): Size of the file
+        """
+        with cls._lock:
+            cls._counters['files_written'] += 1
+            cls._counters['bytes_written'] += nbytes
+        counters = cls._thread_counters()
+        counters['files_written'] += 1
+        counters['bytes_written'] += nbytes
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: A copy of the counters. Subtract two snapshots for
+                        the I/O done in between.
+        """
+        with cls._lock:
+            return dict(cls._counters)
+
+    @classmethod
+    def thread_snapshot(cls) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: A copy of the counters of the current thread only
+        """
+        return dict(cls._thread_counters())
+
+    @classmethod
+    def _thread_counters(cls) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: Counters of the current thread, created on first use
+        """
+        if not hasattr(cls._local, 'counters'):
+            cls._local.counters = dict.fromkeys(cls._counters, 0)
+        return cls._local.counters
@@ -0,0 +1,60 @@
+import gzip
+import json
+import lzma
+import os
+from os import path
+from typing import Any, Callable, ClassVar, Dict, IO, Iterable, Iterator, Tuple
+
+from .DocumentIO import DocumentIO
+from .IDatasetSource import IDatasetSource
+from .IOStats import IOStats
+
+
+class NdjsonSource(IDatasetSource):
+    """
+    Documents stored as a stream of one JSON object per line, optionally compressed
+    by gzip (.gz) or xz (.xz), e.g. data/json.ndjson.xz.
+    Each line is {"file": <relative path>, "document": <document>}.
+
+    Class Attributes:
+        _OPENERS (Dict[str, Callable[..., IO]]): Opener of each compression extension
+    """
+    _OPENERS: ClassVar[Dict[str, Callable[..., IO]]] = {
+        '.gz': gzip.open,
+        '.xz': lzma.open
+    }
+
+    def iter_documents(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterates through the stream, decompressing as it goes
+
+        Returns:
+            Iterator[Tuple[str, Any]]: Relative path, and its document
+        """
+        with self._open(self.location, 'rt') as fstream:
+            for line in fstream:
+                if line.strip():
+                    IOStats.add_read(len(line))
+                    record = json.loads(line)
+                    yield record['file'], record['document']
+
+    def write_documents(self, documents: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Rewrites the stream atomically. See `DocumentIO.atomic_write()`.
+
+        Args:
+            documents (Iterable[Tuple[str, Any]]): Relative path, and its document
+        """
+        with DocumentIO.atomic_write(self.location) as temp_path:
+            with self._open(temp_path, 'wt') as fstream:
+                for rel_path, data in documents:
+                    record = {'file': rel_path.replace(os.sep, '/'), 'document': data}
+                    fstream.write(json.dumps(record, separators=(',', ':')) + '\n')
+        IOStats.add_write(path.getsize(self.location))
+
+    def _open(self, filepath: str, mode: str) -> IO:
+        """
+        Opens `filepath` with the compression of `location`
+        """
+        opener = self._OPENERS.get(path.splitext(self.location)[1].lower(), open)
+        return opener(filepath, mode, encoding='utf-8')
@@ -0,0 +1,90 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, Tuple
+
+
+class Prefetcher(object):
+    """
+    Overlaps file I/O with the processing of documents.
+    Reads (and decodes) up to `depth` files ahead of the consumer, and writes
+    behind it, on a pool of threads. Documents are yielded in their original order.
+
+    Attributes:
+        depth (int): Max no. of reads, and of writes, in flight
+        _pool (ThreadPoolExecutor): Threads doing the I/O
+        _writes (Deque[Future]): Writes in flight, oldest first
+    """
+    depth: int
+    _pool: ThreadPoolExecutor
+    _writes: Deque[Future]
+
+    def __init__(self, depth: int, workers: int = 4) -> None:
+        """
+        Constructor
+
+        Args:
+            depth (int): Max no. of reads, and of writes, in flight
+            workers (int): No. of threads
+        """
+        if depth < 1:
+            raise ValueError('Prefetch depth must be at least 1, not {}'.format(depth))
+        self.depth = depth
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._writes = deque()
+
+    def __enter__(self) -> 'Prefetcher':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def read_ahead(self, filepaths: Iterable[str],
+                   loader: Callable[[str], Any]) -> Iterator[Tuple[str, Any]]:
+        """
+        Loads the files ahead of the consumer
+
+        Args:
+            filepaths (Iterable[str]): Files to load, in order
+            loader (Callable[[str], Any]): Reads and decodes a file
+
+        Returns:
+            Iterator[Tuple[str, Any]]: Each file, and its document
+        """
+        pending: Deque[Tuple[str, Future]] = deque()
+        try:
+            for filepath in filepaths:
+                pending.append((filepath, self._pool.submit(loader, filepath)))
+                if len(pending) >= self.depth:
+                    filepath, future = pending.popleft()
+                    yield filepath, future.result()
+            while pending:
+                filepath, future = pending.popleft()
+                yield filepath, future.result()
+        finally:
+            # Consumer stopped early
+            for _, future in pending:
+                future.cancel()
+
+    def write_behind(self, writer: Callable[..., Any], *args: Any) -> None:
+        """
+        Queues a write. Blocks while `depth` writes are in flight.
+        The arguments must not be modified after this call.
+
+        Args:
+            writer (Callable[..., Any]): Writes a file
+            *args (Any): Arguments of `writer`
+        """
+        while len(self._writes) >= self.depth:
+            self._writes.popleft().result()
+        self._writes.append(self._pool.submit(writer, *args))
+
+    def flush(self) -> None:
+        """
+        Waits for all queued writes, raising the first error if any
+        """
+        while self._writes:
+            self._writes.popleft().result()
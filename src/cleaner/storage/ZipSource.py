@@ -0,0 +1,58 @@
+import os
+from os import path
+from typing import Any, ClassVar, Iterable, Iterator, Tuple
+import zipfile
+
+from .DocumentIO import DocumentIO
+from .IDatasetSource import IDatasetSource
+from .IOStats import IOStats
+
+
+class ZipSource(IDatasetSource):
+    """
+    Documents stored in a zip archive, e.g. data/json.zip.
+    The archive's top-level folder (e.g. json/) is not part of the relative path.
+
+    Class Attributes:
+        _TOP_FOLDER (str): Top-level folder of new archives
+    """
+    _TOP_FOLDER: ClassVar[str] = 'json/'
+
+    def iter_documents(self) -> Iterator[Tuple[str, Any]]:
+        """
+        Iterates through the documents in the archive, without extracting it
+
+        Returns:
+            Iterator[Tuple[str, Any]]: Relative path, and its document
+        """
+        with zipfile.ZipFile(self.location, 'r') as archive:
+            names = sorted((_ for _ in archive.namelist() if not _.endswith('/')),
+                           key=lambda _: _.split('/'))
+            prefix = self._top_folder(names)
+            for name in names:
+                content = archive.read(name)
+                IOStats.add_read(len(content))
+                yield name[len(prefix):], DocumentIO.decode(content)
+
+    def write_documents(self, documents: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Rewrites the archive atomically. See `DocumentIO.atomic_write()`.
+
+        Args:
+            documents (Iterable[Tuple[str, Any]]): Relative path, and its document
+        """
+        with DocumentIO.atomic_write(self.location) as temp_path:
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for rel_path, data in documents:
+                    name = self._TOP_FOLDER + rel_path.replace(os.sep, '/')
+                    archive.writestr(name, DocumentIO.encode(data, DocumentIO.encoding))
+        IOStats.add_write(path.getsize(self.location))
+
+    @staticmethod
+    def _top_folder(names: Iterable[str]) -> str:
+        """
+        Returns:
+            str: The folder that all members are in (e.g. json/), or '' if there is none
+        """
+        tops = set(_.split('/', 1)[0] + '/' if '/' in _ else '' for _ in names)
+        return tops.pop() if len(tops) == 1 else ''
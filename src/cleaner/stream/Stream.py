@@ -0,0 +1,188 @@
+"""
+Watch mode: streams each newly scraped file through cleanup, geocoding and import,
+so the data can be queried while the scraper is still running.
+
+The stages run on their own threads, joined by bounded queues, so a slow stage holds
+back the ones before it instead of piling files up in memory:
+    watch -> clean -> geocode (several threads) -> import
+The cleanup stages that depend on the geocodes, e.g. AddAmenity, run after them
+on the geocode threads. The others run on the clean thread.
+"""
+from os import path
+from queue import Queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cleanup import Pipeline, RootJsonFix
+from cleanup.objects.Stage import Stage
+from db.mongodb.MongoImporter import MongoImporter
+from db.sqlite.SqliteImporter import SqliteImporter
+from storage.DocumentIO import DocumentIO
+from .Watcher import Watcher
+
+_GEOCODE_STAGE = 'AddGeo'
+_DONE = None  # sentinel that ends a stage
+
+_Item = Tuple[str, float, Any]  # (file path, time it was seen, document)
+
+
+def run(json_loc: str, sqlite: Optional[SqliteImporter] = None,
+        mongo: Optional[MongoImporter] = None, poll_secs: float = 2.0,
+        idle_secs: Optional[float] = None, queue_size: int = 8,
+        geocode_workers: int = 2, include_existing: bool = False,
+        skip: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Watches the JSON folder until interrupted, or until it's idle for `idle_secs`.
+    Each new file is cleaned in memory, geocoded, written back, and upserted
+    into the databases. A file that fails is reported and left as it is.
+
+    Args:
+        json_loc (str): location of JSON folder
+        sqlite (Optional[SqliteImporter]): Importer to upsert each file into
+        mongo (Optional[MongoImporter]): Importer to upsert each file into
+        poll_secs (float): Interval between polls of the folder
+        idle_secs (Optional[float]): Stops after no new files for this long. None to never stop.
+        queue_size (int): Max no. of files waiting between two stages
+        geocode_workers (int): No. of threads geocoding files
+        include_existing (bool): Whether files that already exist are also streamed
+        skip (Iterable[str]): Names of the cleanup stages not to run, e.g. AddGeo
+
+    Returns:
+        Dict[str, Any]: No. of files imported, files that failed,
+                    and the latency from a file being seen to it being imported
+    """
+    print('--------------------------------')
+    print('[Stream] Watching {}'.format(json_loc))
+    clean_stages, geocode_stages = _split_stages(
+        [_ for _ in Pipeline.STAGES if _.name not in set(skip)])
+
+    watcher = Watcher(json_loc, include_existing)
+    stop = threading.Event()
+    clean_queue: Queue = Queue(queue_size)
+    geocode_queue: Queue = Queue(queue_size)
+    import_queue: Queue = Queue(queue_size)
+    failed: List[str] = []
+
+    def fail(filepath: str) -> None:
+        print('Failed {}:\n{}'.format(path.relpath(filepath, json_loc), traceback.format_exc()))
+        failed.append(filepath)
+
+    # Each stage ends the next one even if it crashes, so the run never hangs
+    def watch() -> None:
+        last_seen = time.perf_counter()
+        try:
+            while not stop.is_set():
+                for filepath in watcher.poll():
+                    clean_queue.put((filepath, time.perf_counter(), None))
+                    last_seen = time.perf_counter()
+                if idle_secs is not None and time.perf_counter() - last_seen > idle_secs:
+                    break
+                stop.wait(poll_secs)
+        finally:
+            clean_queue.put(_DONE)
+
+    def clean() -> None:
+        try:
+            for filepath, seen_at, _ in iter(clean_queue.get, _DONE):
+                try:
+                    data = RootJsonFix.fix_root(DocumentIO.load(filepath))[1]
+                    for stage in clean_stages:
+                        stage.func([data])
+                except Exception:  # pylint: disable=broad-except
+                    fail(filepath)
+                    continue
+                geocode_queue.put((filepath, seen_at, data))
+        finally:
+            for _ in range(geocode_workers):
+                geocode_queue.put(_DONE)
+
+    def geocode() -> None:
+        try:
+            for item in iter(geocode_queue.get, _DONE):
+                try:
+                    for stage in geocode_stages:
+                        stage.func([item[2]])
+                except Exception:  # pylint: disable=broad-except
+                    fail(item[0])
+                    continue
+                import_queue.put(item)
+        finally:
+            import_queue.put(_DONE)
+
+    threads = [threading.Thread(target=watch, name='watch', daemon=True),
+               threading.Thread(target=clean, name='clean', daemon=True)]
+    threads += [threading.Thread(target=geocode, name='geocode_{}'.format(i), daemon=True)
+                for i in range(geocode_workers)]
+    for thread in threads:
+        thread.start()
+
+    # Imports on this thread, which owns the SQLite connection
+    latencies: List[float] = []
+    remaining = geocode_workers
+    while remaining:
+        try:
+            item = import_queue.get()
+        except KeyboardInterrupt:
+            print('Stopping, once the files in progress are imported ...')
+            stop.set()
+            continue
+        if item is _DONE:
+            remaining -= 1
+            continue
+        if _import(item, watcher, sqlite, mongo, fail):
+            latencies.append(time.perf_counter() - item[1])
+            print('Imported {} in {:.2f} secs'.format(
+                path.relpath(item[0], json_loc), latencies[-1]))
+    for thread in threads:
+        thread.join()
+
+    result = {'files': len(latencies),
+              'failed': failed,
+              'latency': {'mean': sum(latencies) / len(latencies) if latencies else 0.0,
+                          'max': max(latencies, default=0.0)}}
+    print('[Stream] Imported {} files, {} failed'.format(len(latencies), len(failed)))
+    return result
+
+
+def _split_stages(stages: List[Stage]) -> Tuple[List[Stage], List[Stage]]:
+    """
+    Splits the stages between the clean and geocode threads. Geocoding, and the later
+    stages that depend on it directly or through another, go to the geocode threads.
+
+    Args:
+        stages (List[Stage]): Stages, in the order that they are declared
+
+    Returns:
+        Tuple[List[Stage], List[Stage]]: Stages of the clean thread, and of the
+                    geocode threads, each in the order that they are declared
+    """
+    geocode_stages: List[Stage] = []
+    for stage in stages:
+        if stage.name == _GEOCODE_STAGE or \
+                any(stage.depends_on(_) for _ in geocode_stages):
+            geocode_stages.append(stage)
+    return [_ for _ in stages if _ not in geocode_stages], geocode_stages
+
+
+def _import(item: _Item, watcher: Watcher, sqlite: Optional[SqliteImporter],
+            mongo: Optional[MongoImporter], fail: Callable[[str], None]) -> bool:
+    """
+    Writes a cleaned file back, and upserts it into the databases
+
+    Returns:
+        bool: Whether it succeeded
+    """
+    filepath, _, data = item
+    try:
+        DocumentIO.dump(filepath, data)
+        watcher.mark(filepath)
+        if sqlite is not None:
+            sqlite.upsert(data)
+        if mongo is not None:
+            mongo.upsert(data)
+    except Exception:  # pylint: disable=broad-except
+        fail(filepath)
+        return False
+    return True
@@ -0,0 +1,91 @@
+import os
+from os import path
+import threading
+from typing import ClassVar, Dict, List, Optional, Tuple
+
+from storage.DocumentIO import DocumentIO
+
+
+class Watcher(object):
+    """
+    Polls a JSON folder for files that are new or have changed since they were last seen.
+    The scraper renames each file into place once it's complete, and temporary files
+    are hidden, so a file is never seen half-written.
+
+    Class Attributes:
+        _EXTENSION (str): Extension of the files watched
+
+    Attributes:
+        json_loc (str): location of JSON folder
+        _seen (Dict[str, Tuple[int, int]]): (mtime in ns, size) of each file, keyed by path
+        _lock (threading.Lock): Guards `_seen`, which is also marked by the importing thread
+    """
+    _EXTENSION: ClassVar[str] = '.json'
+
+    json_loc: str
+    _seen: Dict[str, Tuple[int, int]]
+    _lock: threading.Lock
+
+    def __init__(self, json_loc: str, include_existing: bool = False) -> None:
+        """
+        Constructor
+
+        Args:
+            json_loc (str): location of JSON folder
+            include_existing (bool): If False, files that already exist are not reported
+        """
+        self.json_loc = json_loc
+        self._seen = {}
+        self._lock = threading.Lock()
+        if not include_existing:
+            for filepath in self._list():
+                self.mark(filepath)
+
+    def poll(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Path of each file that is new or has changed, in a stable order
+        """
+        changed = []
+        with self._lock:
+            for filepath in self._list():
+                stat = self._stat(filepath)
+                if stat is not None and self._seen.get(filepath) != stat:
+                    self._seen[filepath] = stat
+                    changed.append(filepath)
+        return changed
+
+    def mark(self, filepath: str) -> None:
+        """
+        Marks the current version of a file as seen, e.g. after the cleaned file is
+        written back, so that it's not reported again
+
+        Args:
+            filepath (str): Path to the file
+        """
+        stat = self._stat(filepath)
+        if stat is not None:
+            with self._lock:
+                self._seen[filepath] = stat
+
+    def _list(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Path of each file watched
+        """
+        if not path.isdir(self.json_loc):
+            return []
+        return [filepath for filepath, _ in DocumentIO.walk(self.json_loc)
+                if filepath.endswith(self._EXTENSION)]
+
+    @staticmethod
+    def _stat(filepath: str) -> Optional[Tuple[int, int]]:
+        """
+        Returns:
+            Optional[Tuple[int, int]]: (mtime in ns, size), or None if it no longer exists
+        """
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
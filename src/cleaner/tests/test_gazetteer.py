@@ -0,0 +1,39 @@
+"""
+Run from src/cleaner:
+    python -m unittest discover tests
+"""
+import unittest
+
+from cleanup.geo.Gazetteer import Gazetteer
+from cleanup.geo.Geocode import Geocode
+
+
+class GazetteerTest(unittest.TestCase):
+    """
+    Fuzzy matches of the gazetteer, which are trusted without going to the network
+    """
+    def test_different_streets_do_not_match(self) -> None:
+        pairs = [
+            ('211 JURONG EAST ST 21', '211 JURONG WEST STREET 21'),
+            ('283 BUKIT BATOK EAST AVENUE 6', '283 BUKIT BATOK WEST AVENUE 6'),
+            ('2 LORONG 1A TOA PAYOH', '2 LORONG 1 TOA PAYOH'),
+            ('2 TOA PAYOH LORONG 1A', '2 TOA PAYOH LORONG 1'),
+            ('101 PUNGGOL FIELD', '101 PUNGGOL FIELD WALK'),
+            ('101 YISHUN RING ROAD', '101 YISHUN ROAD'),
+            ('12 BEDOK NORTH AVENUE 2', '12 BEDOK NORTH AVENUE 3')
+        ]
+        for known, address in pairs:
+            with self.subTest(address=address):
+                gazetteer = Gazetteer([(known, Geocode('', 1.3, 103.8, 0))])
+                self.assertEqual(gazetteer.lookup(address), (None, False))
+
+    def test_spelling_and_acronyms_match(self) -> None:
+        geocode = Geocode('', 1.35, 103.75, 650283)
+        gazetteer = Gazetteer([('283 BUKIT BATOK WEST AVENUE 6', geocode)])
+        self.assertEqual(gazetteer.lookup('283 BT BATOK WEST AVE 6'), (geocode, False))
+        self.assertEqual(gazetteer.lookup('283 BUKIT BATOKK WEST AVENUE 6'), (geocode, True))
+        self.assertEqual(gazetteer.lookup('284 BUKIT BATOKK WEST AVENUE 6'), (None, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Run from src/cleaner:
+    python -m unittest discover tests
+"""
+import os
+import tempfile
+import types
+from typing import Dict, List
+import unittest
+from unittest import mock
+
+from cleanup.geo.onemap import OneMapAuth as auth_module
+from cleanup.geo.onemap.OneMap import OneMap
+from cleanup.geo.onemap.OneMapAuth import OneMapAuth
+
+
+class OneMapAuthTest(unittest.TestCase):
+    """
+    Logins while OneMap is down, which back off instead of being retried on every query
+    """
+    def setUp(self) -> None:
+        self.folder = tempfile.mkdtemp()
+        OneMapAuth.set_service('http://localhost:9', {},
+                               os.path.join(self.folder, 'token.key'))
+        OneMapAuth.set_backoff(5.0, 20.0)
+        self.now = 1000.0
+        self.logins: List[float] = []
+        self.is_down = True
+        clock = types.SimpleNamespace(time=lambda: self.now)
+        self.patches = [mock.patch.object(auth_module, 'time', clock),
+                        mock.patch.object(OneMapAuth, '_login', self._login)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self) -> None:
+        for patch in reversed(self.patches):
+            patch.stop()
+        OneMapAuth.set_service(OneMap.BASE_URL)
+        OneMapAuth.set_backoff(5.0, 300.0)
+
+    def _login(self) -> Dict:
+        self.logins.append(self.now)
+        if self.is_down:
+            raise ConnectionError('Error in authentication!')
+        return {'access_token': 'token', 'expiry_timestamp': self.now + 3600}
+
+    def _try_token(self, times: int = 10) -> None:
+        for _ in range(times):
+            with self.assertRaises(ConnectionError):
+                OneMapAuth.get_token()
+
+    def test_failures_back_off_exponentially(self) -> None:
+        self._try_token()
+        self.assertEqual(self.logins, [1000.0])
+
+        # Doubled from 5 secs, up to 20 secs
+        for backoff in (5.0, 10.0, 20.0, 20.0):
+            before = len(self.logins)
+            self.now += backoff - 0.5
+            self._try_token()
+            self.assertEqual(len(self.logins), before)
+            self.now += 0.5
+            self._try_token()
+            self.assertEqual(len(self.logins), before + 1)
+        self.assertEqual(self.logins, [1000.0, 1005.0, 1015.0, 1035.0, 1055.0])
+
+    def test_success_resets_backoff(self) -> None:
+        self._try_token()
+        self.now += 5.0
+        self._try_token()
+        self.now += 10.0
+        self.is_down = False
+        self.assertEqual(OneMapAuth.get_token(), 'token')
+
+        # Once the token expires, a new failure backs off from 5 secs again
+        self.is_down = True
+        self.now += 3600.0
+        self._try_token()
+        self.now += 5.0
+        self._try_token()
+        self.assertEqual(self.logins, [1000.0, 1005.0, 1015.0, 4615.0, 4620.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Run from src/cleaner:
+    python -m unittest discover tests
+"""
+import unittest
+
+from cleanup.objects.PropertyProfile import PropertyProfile
+
+
+class PropertyProfileTest(unittest.TestCase):
+    """
+    Profiles built in parts, then merged
+    """
+    def test_merge_matches_single_pass(self) -> None:
+        values = [1, 2.5, None, 'a', 7, 130, -4, 3000, 12, True] + list(range(0, 900, 7))
+        single = PropertyProfile('x')
+        for value in values:
+            single.add(value)
+
+        # the second part has much wider bins than the first
+        first, second = PropertyProfile('x'), PropertyProfile('x')
+        for value in values[:5]:
+            first.add(value)
+        for value in values[5:]:
+            second.add(value)
+        first.merge(second)
+
+        expected, merged = single.to_dict(), first.to_dict()
+        for key in ('count', 'null_count', 'types', 'min', 'max', 'histogram'):
+            with self.subTest(key=key):
+                self.assertEqual(merged[key], expected[key])
+
+    def test_merge_into_empty(self) -> None:
+        other = PropertyProfile('x')
+        for value in (5, 6, 70):
+            other.add(value)
+        profile = PropertyProfile('x')
+        profile.merge(other)
+        self.assertEqual(profile.to_dict()['histogram'], other.to_dict()['histogram'])
+        self.assertEqual((profile.min_val, profile.max_val), (5, 70))
+
+
+if __name__ == '__main__':
+    unittest.main()
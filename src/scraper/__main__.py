@@ -1,6 +1,7 @@
 import os
 from random import random
 import re
+import tempfile
 import time
 from typing import List
 
@@ -17,6 +18,9 @@ SAFE_FOLDER_PATH_REGEX = re.compile(r'[\\/]')
 """ Regex used to detect portions of paths that needs to be
     sanitized into comma during serialisation """
 
+TEMP_PREFIX: str = '.~'
+""" Prefix of files that are still being written, which the cleaner ignores """
+
 
 def _get_file_path(town: str, flat_type: FlatType) -> str:
     """
@@ -117,14 +121,26 @@ def _serialize_blocks(town: str, flat_type: FlatType, blocks: List[Block]) -> No
     if not os.path.exists(json_folder):
         os.makedirs(json_folder)
 
-    with open(json_path, 'w') as file:
-        file.write('[')
-        for i, block in enumerate(blocks):
-            if i is not 0:
-                file.write(',\n')
-            file.write(block.to_json())
-        file.write(']\n')
-        file.close()
+    # Written to a hidden temporary file, then renamed, so that a file is only
+    # seen by the cleaner's watch mode once it's complete
+    fdesc, temp_path = tempfile.mkstemp(
+        prefix=TEMP_PREFIX + os.path.basename(json_path), suffix='.tmp', dir=json_folder)
+    try:
+        with os.fdopen(fdesc, 'w') as file:
+            file.write('[')
+            for i, block in enumerate(blocks):
+                if i is not 0:
+                    file.write(',\n')
+                file.write(block.to_json())
+            file.write(']\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, json_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
 
 if __name__ == '__main__':